@@ -0,0 +1,191 @@
+# analytics.py - Indicadores financeiros calculados de forma vetorizada (pandas/NumPy)
+#
+# Carrega clientes e pagamentos em dois DataFrames (uma consulta cada) e calcula:
+#   - receita recorrente esperada (MRR), valor recebido e taxa de cobrança por mês
+#   - faixas de atraso (aging) dos clientes ativos
+#   - churn mensal (clientes desativados)
+#   - retenção por coorte de matrícula
+# Os meses são representados como índice inteiro: ano * 12 + (mes - 1).
+
+from datetime import date
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import text
+
+FAIXAS_ATRASO = [
+    (1, 1, '1 mês'),
+    (2, 2, '2 meses'),
+    (3, 3, '3 meses'),
+    (4, 6, '4 a 6 meses'),
+    (7, 12, '7 a 12 meses'),
+    (13, np.inf, 'Mais de 12 meses'),
+]
+
+
+def indice_mes(datas):
+    """Converte uma Series de datas no índice inteiro do mês (NaN para datas ausentes)."""
+    datas = pd.to_datetime(datas)
+    return datas.dt.year * 12 + datas.dt.month - 1
+
+
+def rotulo_mes(indice):
+    return f'{int(indice) % 12 + 1:02d}/{int(indice) // 12}'
+
+
+def carregar_dados(conn):
+    """Lê clientes e pagamentos do banco (uma consulta para cada tabela)."""
+    clientes = pd.read_sql(
+        text('SELECT id, data_matricula, valor_mensalidade, dia_vencimento, ativo, data_desativacao FROM cliente'),
+        conn
+    )
+    pagamentos = pd.read_sql(
+        text('SELECT cliente_id, data_pagamento, valor_pago, mes_referencia, ano_referencia FROM pagamento'),
+        conn
+    )
+    # Valores gravados em centavos (dinheiro.Centavos); o relatório trabalha em reais
+    clientes['valor_mensalidade'] = clientes['valor_mensalidade'].round().astype('int64') / 100
+    pagamentos['valor_pago'] = pagamentos['valor_pago'].round().astype('int64') / 100
+    return preparar_dados(clientes, pagamentos)
+
+
+def preparar_dados(clientes, pagamentos):
+    """Adiciona as colunas derivadas (índices de mês) usadas pelos cálculos."""
+    clientes = clientes.copy()
+    clientes['ativo'] = clientes['ativo'].astype(bool)
+    clientes['mes_matricula'] = indice_mes(clientes['data_matricula'])
+    clientes['mes_desativacao'] = indice_mes(clientes['data_desativacao'])
+
+    pagamentos = pagamentos.copy()
+    pagamentos['mes_ref'] = pagamentos['ano_referencia'] * 12 + pagamentos['mes_referencia'] - 1
+    pagamentos['mes_pagamento'] = indice_mes(pagamentos['data_pagamento'])
+    return clientes, pagamentos
+
+
+def _fim_atividade(clientes, mes_atual):
+    """Mês (exclusivo) em que cada cliente deixou de ser ativo; inf para os ativos.
+
+    Clientes inativos sem data de desativação (anteriores ao registro da data)
+    contam como desativados no mês atual.
+    """
+    fim = clientes['mes_desativacao'].to_numpy(dtype=float)
+    fim = np.where(clientes['ativo'].to_numpy(), np.inf, np.where(np.isnan(fim), mes_atual, fim))
+    return fim
+
+
+def receita_mensal(clientes, pagamentos, meses=12, hoje=None):
+    """MRR esperado, valor recebido e taxa de cobrança dos últimos `meses` meses."""
+    hoje = hoje or date.today()
+    mes_atual = hoje.year * 12 + hoje.month - 1
+    indices = np.arange(mes_atual - meses + 1, mes_atual + 1)
+
+    inicio = clientes['mes_matricula'].to_numpy(dtype=float)[:, None]
+    fim = _fim_atividade(clientes, mes_atual)[:, None]
+    ativos = (inicio <= indices) & (fim > indices)  # matriz clientes x meses
+    valores = clientes['valor_mensalidade'].to_numpy(dtype=float)
+
+    recebido = pagamentos.groupby('mes_ref')['valor_pago'].sum().reindex(indices, fill_value=0.0)
+    resultado = pd.DataFrame({
+        'mes': [rotulo_mes(i) for i in indices],
+        'clientes_ativos': ativos.sum(axis=0),
+        'mrr': valores @ ativos,
+        'recebido': recebido.to_numpy(),
+    })
+    resultado['taxa_cobranca'] = np.where(
+        resultado['mrr'] > 0, resultado['recebido'] / resultado['mrr'].where(resultado['mrr'] > 0, 1), 0.0
+    )
+    return resultado
+
+
+def faixas_atraso(clientes, pagamentos, hoje=None):
+    """Quantidade de clientes ativos e valor devido por faixa de meses em atraso.
+
+    Mesma regra de Cliente.calcular_meses_atraso: contam os meses posteriores ao
+    do último pagamento (ou da matrícula) até o atual, este só após o vencimento,
+    sem pagamento com aquela referência.
+    """
+    hoje = hoje or date.today()
+    mes_atual = hoje.year * 12 + hoje.month - 1
+    ativos = clientes[clientes['ativo']]
+
+    ultimo_pagamento = pagamentos.groupby('cliente_id')['mes_pagamento'].max()
+    referencia = ultimo_pagamento.reindex(ativos['id']).to_numpy()
+    referencia = np.where(np.isnan(referencia), ativos['mes_matricula'].to_numpy(), referencia)
+
+    vencido_mes_atual = hoje.day >= np.minimum(ativos['dia_vencimento'].to_numpy(), 28)
+    limite = np.where(vencido_mes_atual, mes_atual, mes_atual - 1)
+
+    # Meses pagos dentro da janela (referencia, limite] de cada cliente
+    janela = pd.DataFrame({'cliente_id': ativos['id'].to_numpy(), 'referencia': referencia, 'limite': limite})
+    pagos = pagamentos[['cliente_id', 'mes_ref']].drop_duplicates().merge(janela, on='cliente_id')
+    pagos = pagos[(pagos['mes_ref'] > pagos['referencia']) & (pagos['mes_ref'] <= pagos['limite'])]
+    pagos_na_janela = pagos.groupby('cliente_id').size().reindex(ativos['id'], fill_value=0).to_numpy()
+
+    meses_atraso = np.clip(limite - referencia - pagos_na_janela, 0, None)
+    valor_devido = meses_atraso * ativos['valor_mensalidade'].to_numpy(dtype=float)
+
+    linhas = []
+    for minimo, maximo, rotulo in FAIXAS_ATRASO:
+        na_faixa = (meses_atraso >= minimo) & (meses_atraso <= maximo)
+        linhas.append({'faixa': rotulo, 'clientes': int(na_faixa.sum()), 'valor_devido': float(valor_devido[na_faixa].sum())})
+    return pd.DataFrame(linhas)
+
+
+def churn_mensal(clientes, meses=12, hoje=None):
+    """Clientes ativos no início de cada mês, desativações no mês e taxa de churn."""
+    hoje = hoje or date.today()
+    mes_atual = hoje.year * 12 + hoje.month - 1
+    indices = np.arange(mes_atual - meses + 1, mes_atual + 1)
+
+    inicio = clientes['mes_matricula'].to_numpy(dtype=float)[:, None]
+    fim = _fim_atividade(clientes, mes_atual)[:, None]
+    ativos_inicio = ((inicio < indices) & (fim >= indices)).sum(axis=0)
+    cancelamentos = (fim == indices).sum(axis=0)
+
+    resultado = pd.DataFrame({
+        'mes': [rotulo_mes(i) for i in indices],
+        'ativos_inicio': ativos_inicio,
+        'cancelamentos': cancelamentos,
+    })
+    resultado['taxa_churn'] = np.where(ativos_inicio > 0, cancelamentos / np.maximum(ativos_inicio, 1), 0.0)
+    return resultado
+
+
+def retencao_coortes(clientes, meses=12, hoje=None):
+    """Fração de cada coorte (mês de matrícula) ainda ativa N meses depois.
+
+    Linhas: coortes dos últimos `meses` meses; colunas: meses desde a matrícula.
+    Células futuras ficam vazias (NaN).
+    """
+    hoje = hoje or date.today()
+    mes_atual = hoje.year * 12 + hoje.month - 1
+    coortes = np.arange(mes_atual - meses + 1, mes_atual + 1)
+    deslocamentos = np.arange(meses)
+
+    recentes = clientes[clientes['mes_matricula'] >= coortes[0]]
+    fim = _fim_atividade(recentes, mes_atual)
+    matricula = recentes['mes_matricula'].to_numpy()
+    # Ativo no mês (matrícula + deslocamento): clientes x deslocamentos
+    ativos = fim[:, None] > (matricula[:, None] + deslocamentos)
+
+    tabela = pd.DataFrame(ativos, columns=deslocamentos)
+    tabela['coorte'] = matricula
+    retencao = tabela.groupby('coorte')[list(deslocamentos)].mean().reindex(coortes)
+    tamanho = tabela.groupby('coorte').size().reindex(coortes, fill_value=0)
+
+    # Oculta os meses que ainda não aconteceram para cada coorte
+    futuro = (coortes[:, None] + deslocamentos) > mes_atual
+    retencao = retencao.mask(futuro)
+    retencao.insert(0, 'clientes', tamanho.to_numpy())
+    retencao.index = [rotulo_mes(i) for i in coortes]
+    return retencao
+
+
+def relatorio_financeiro(clientes, pagamentos, meses=12, hoje=None):
+    """Todos os indicadores de uma vez, a partir dos DataFrames já carregados."""
+    return {
+        'receita': receita_mensal(clientes, pagamentos, meses, hoje),
+        'atraso': faixas_atraso(clientes, pagamentos, hoje),
+        'churn': churn_mensal(clientes, meses, hoje),
+        'coortes': retencao_coortes(clientes, meses, hoje),
+    }
@@ -1,29 +1,42 @@
 # app.py (versão reforçada)
-from flask import Flask, render_template, request, redirect, url_for, flash, jsonify, session, abort
+from flask import Flask, render_template, request, redirect, url_for, flash, jsonify, session, abort, g, Response, stream_with_context, has_request_context
 from flask_sqlalchemy import SQLAlchemy
-from sqlalchemy import func
-from werkzeug.security import generate_password_hash, check_password_hash
+from sqlalchemy import func, insert, update, delete, event, select, and_, or_
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import validates
 from functools import wraps
+from werkzeug.http import is_resource_modified
 from datetime import datetime, date, timedelta
-from dateutil.relativedelta import relativedelta
-import pymysql
 import random
 import re
 import os
 import calendar
 import secrets
+import hashlib
+import csv
+import io
+import json
+import click
+import threading
+import time
 from dotenv import load_dotenv
-from faker import Faker
 from flask_wtf import CSRFProtect
 from forms import CriarUsuarioForm  
 from forms import TrocarSenhaForm
+from cache import criar_cache
+from rate_limit import criar_rate_limiter
+from eventos import criar_barramento, PERDIDOS
+from instrumentacao import Instrumentacao
+from compressao import Compressao
+from estaticos import Estaticos
+from metricas import RegistroMetricas
+from senhas import criar_hasher, SobrecargaSenhas
+from dinheiro import Centavos, dinheiro, ZERO
 
 
 # Carrega variáveis do .env
 load_dotenv()
 
-# Configuração da aplicação
-pymysql.install_as_MySQLdb()
 
 # Configuração da aplicação
 import os
@@ -37,6 +50,22 @@ app.config['SECRET_KEY'] = os.getenv('SECRET_KEY', 'chave_padrao_para_dev')
 app.config['SQLALCHEMY_DATABASE_URI'] = os.getenv('DATABASE_URI')
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 
+# URIs 'mysql://' usam o PyMySQL no lugar do MySQLdb; com SQLite ele nem é importado
+if (app.config['SQLALCHEMY_DATABASE_URI'] or '').startswith('mysql'):
+    import pymysql
+    pymysql.install_as_MySQLdb()
+
+# Pool de conexões (MySQL). pool_recycle deve ficar abaixo do wait_timeout do servidor e
+# pool_size + max_overflow cobrir as threads de cada worker do gunicorn.
+if not (app.config['SQLALCHEMY_DATABASE_URI'] or '').startswith('sqlite'):
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {
+        'pool_size': int(os.getenv('DB_POOL_SIZE', '10')),
+        'max_overflow': int(os.getenv('DB_MAX_OVERFLOW', '5')),
+        'pool_timeout': int(os.getenv('DB_POOL_TIMEOUT', '30')),
+        'pool_recycle': int(os.getenv('DB_POOL_RECYCLE', '1800')),
+        'pool_pre_ping': os.getenv('DB_POOL_PRE_PING', '1') == '1',
+    }
+
 db = SQLAlchemy(app)
 
 
@@ -47,23 +76,112 @@ app.config.update(
     SESSION_COOKIE_SAMESITE='Lax'
 )
 
+# Cache dos agregados do dashboard ('memory' por processo ou 'sqlite' compartilhado entre workers).
+# As chaves levam a versão dos dados (VersaoDados): uma escrita em qualquer worker invalida todos.
+app.config.update(
+    CACHE_BACKEND=os.getenv('CACHE_BACKEND', 'memory'),
+    CACHE_PATH=os.getenv('CACHE_PATH'),
+    CACHE_TTL=int(os.getenv('CACHE_TTL', '60'))
+)
+
 # Inicializações
-fake = Faker('pt_BR')
 csrf = CSRFProtect(app)
+cache = criar_cache(app.config)
 
-# --- Limiter simples em memória (apenas para desenvolvimento) ---
-failed_logins = {}
+# --- Limite de tentativas de login ---
+# 'database' (tabela compartilhada por todos os workers, padrão) ou 'memory' (por processo: com
+# vários workers do gunicorn, cada um conta as falhas à parte e o limite efetivo é multiplicado)
 MAX_ATTEMPTS = 5
 LOCK_MINUTES = 15
+app.config.update(
+    RATE_LIMIT_BACKEND=os.getenv('RATE_LIMIT_BACKEND', 'database'),
+    RATE_LIMIT_MAX_ATTEMPTS=MAX_ATTEMPTS,
+    RATE_LIMIT_WINDOW=LOCK_MINUTES * 60,
+    RATE_LIMIT_MAX_KEYS=int(os.getenv('RATE_LIMIT_MAX_KEYS', '10000'))
+)
+rate_limiter = criar_rate_limiter(app.config, engine=lambda: db.engine)
+
+# Dashboard ao vivo (Server-Sent Events): 'memory' entrega os eventos só no próprio worker;
+# 'database' os repassa a todos os workers por uma tabela do banco (ver eventos.py).
+# Cada dashboard aberto ocupa uma thread do worker, parada enquanto não há eventos, e reconecta a cada
+# SSE_DURACAO segundos. No máximo SSE_MAX_CONEXOES por worker: por padrão, metade das threads do worker
+# (GUNICORN_THREADS_ATIVOS, ver gunicorn.conf.py); a outra metade fica para as demais páginas.
+THREADS_POR_WORKER = int(os.getenv('GUNICORN_THREADS_ATIVOS', '8'))
+app.config.update(
+    EVENTOS_BACKEND=os.getenv('EVENTOS_BACKEND', 'memory'),
+    EVENTOS_MAX_FILA=int(os.getenv('EVENTOS_MAX_FILA', '100')),
+    EVENTOS_INTERVALO=float(os.getenv('EVENTOS_INTERVALO', '0.5')),
+    SSE_MAX_CONEXOES=int(os.getenv('SSE_MAX_CONEXOES', str(max(1, THREADS_POR_WORKER // 2)))),
+    SSE_DURACAO=int(os.getenv('SSE_DURACAO', '300'))
+)
+barramento = criar_barramento(app.config, engine=lambda: db.engine)
 
-# Função para obter o usuário logado
-def get_current_user():
-    user_id = session.get('user_id')  # ou o campo que você usa para armazenar o ID do usuário na sessão
-    if user_id:
-        return Usuario.query.get(user_id)
-    return None
+# Sessão sem consulta ao banco: com SESSAO_STATELESS=1 a sessão (cookie assinado com a SECRET_KEY)
+# carrega id, papel, situação e versão do usuário, revalidados no banco a cada SESSAO_REVALIDAR_SEGUNDOS.
+# Logout, desativação e troca de senha incrementam Usuario.versao_sessao; as demais sessões do usuário
+# deixam de valer na próxima revalidação (no máximo SESSAO_REVALIDAR_SEGUNDOS depois).
+app.config.update(
+    SESSAO_STATELESS=os.getenv('SESSAO_STATELESS', '0') == '1',
+    SESSAO_REVALIDAR_SEGUNDOS=int(os.getenv('SESSAO_REVALIDAR_SEGUNDOS', '60'))
+)
 
-# Disponibiliza a função para todos os templates
+# Hash de senhas: método/custo configuráveis e verificação em pool limitado (ver senhas.py)
+app.config.update(
+    SENHA_HASH_METODO=os.getenv('SENHA_HASH_METODO', 'scrypt:32768:8:1'),
+    SENHA_WORKERS=int(os.getenv('SENHA_WORKERS', '0')),
+    SENHA_FILA=int(os.getenv('SENHA_FILA', '0')),
+    SENHA_TIMEOUT=float(os.getenv('SENHA_TIMEOUT', '10'))
+)
+hasher_senhas = criar_hasher(app.config)
+
+# Instrumentação: consultas/tempo de banco por requisição (Server-Timing + log) e perfil das lentas
+app.config.update(
+    INSTRUMENTACAO_JANELA=int(os.getenv('INSTRUMENTACAO_JANELA', '500')),
+    INSTRUMENTACAO_LIMITE_MS=float(os.getenv('INSTRUMENTACAO_LIMITE_MS', '500')),
+    INSTRUMENTACAO_PROFILE_DIR=os.getenv('INSTRUMENTACAO_PROFILE_DIR')
+)
+instrumentacao = Instrumentacao(app)
+
+# Compressão gzip/brotli das respostas de texto e estáticos versionados pelo hash (ver compressao.py e estaticos.py)
+app.config.update(
+    COMPRESSAO=os.getenv('COMPRESSAO', '1') == '1',
+    COMPRESSAO_MINIMO=int(os.getenv('COMPRESSAO_MINIMO', '1024')),
+    COMPRESSAO_NIVEL_GZIP=int(os.getenv('COMPRESSAO_NIVEL_GZIP', '6')),
+    COMPRESSAO_NIVEL_BROTLI=int(os.getenv('COMPRESSAO_NIVEL_BROTLI', '5')),
+    ESTATICOS_MAX_AGE=int(os.getenv('ESTATICOS_MAX_AGE', '31536000'))
+)
+compressao = Compressao(app)
+estaticos = Estaticos(app)
+
+# --- Métricas (formato Prometheus, expostas em /metrics) ---
+# METRICS_TOKEN é exigido como "Authorization: Bearer <token>"; sem ele, /metrics só responde a localhost
+app.config['METRICS_TOKEN'] = os.getenv('METRICS_TOKEN')
+metricas = RegistroMetricas()
+metrica_duracao = metricas.histograma(
+    'academia_requisicao_duracao_segundos', 'Duração das requisições por endpoint', rotulos=('endpoint', 'metodo')
+)
+metrica_logins = metricas.contador(
+    'academia_logins_total', 'Tentativas de login por resultado (sucesso, falha, bloqueado, sobrecarga)', rotulos=('resultado',)
+)
+metrica_bloqueios = metricas.contador(
+    'academia_login_bloqueios_total', 'Chaves bloqueadas pelo limite de tentativas de login'
+)
+metrica_pagamentos = metricas.contador(
+    'academia_pagamentos_registrados_total', 'Pagamentos registrados por origem (manual, importacao)',
+    rotulos=('origem',)
+)
+
+def _observar_requisicao(endpoint, metodo, status, total_ms, db_ms, consultas):
+    metrica_duracao.observar(total_ms / 1000, endpoint=endpoint, metodo=metodo)
+
+instrumentacao.ouvintes.append(_observar_requisicao)
+
+# Paginação da lista de clientes
+CLIENTES_POR_PAGINA = 50
+MAX_CLIENTES_POR_PAGINA = 200
+
+# Paginação do histórico de pagamentos (por cursor)
+PAGAMENTOS_POR_PAGINA = 24
 
 def _get_client_key():
     # Usa IP + username opcional para chave. Em produção considere cabeçalhos e proxy.
@@ -72,36 +190,23 @@ def _get_client_key():
     return f"{ip}:{username}"
 
 def check_rate_limit():
-    key = _get_client_key()
-    entry = failed_logins.get(key)
-    now = datetime.utcnow()
-    if entry:
-        locked_until = entry.get('locked_until')
-        if locked_until and now < locked_until:
-            return False, (locked_until - now).total_seconds()
-    return True, 0
+    return rate_limiter.check(_get_client_key())
 
 def record_failed_attempt():
-    key = _get_client_key()
-    now = datetime.utcnow()
-    entry = failed_logins.get(key)
-    if not entry:
-        failed_logins[key] = {'count': 1, 'first_attempt': now, 'locked_until': None}
-        return
-    entry['count'] += 1
-    # se passou janela (> LOCK_MINUTES) reset
-    window = timedelta(minutes=LOCK_MINUTES)
-    if now - entry['first_attempt'] > window:
-        # reset
-        failed_logins[key] = {'count': 1, 'first_attempt': now, 'locked_until': None}
-        return
-    if entry['count'] >= MAX_ATTEMPTS:
-        entry['locked_until'] = now + timedelta(minutes=LOCK_MINUTES)
+    return rate_limiter.record_failure(_get_client_key())
 
 def reset_failed_attempts():
-    key = _get_client_key()
-    if key in failed_logins:
-        del failed_logins[key]
+    rate_limiter.reset(_get_client_key())
+
+def normalizar_telefone(telefone):
+    """Mantém apenas os dígitos do telefone."""
+    return re.sub(r'\D', '', telefone or '')
+
+def somar_meses(data, meses):
+    """Soma (ou subtrai) meses a uma data, limitando o dia ao fim do mês (31/01 + 1 mês = 28/02)."""
+    indice = data.year * 12 + data.month - 1 + meses
+    ano, mes = indice // 12, indice % 12 + 1
+    return date(ano, mes, min(data.day, calendar.monthrange(ano, mes)[1]))
 
 # --- Modelos ---
 class Usuario(db.Model):
@@ -116,26 +221,48 @@ class Usuario(db.Model):
     ultimo_login = db.Column(db.DateTime)
     must_reset_password = db.Column(db.Boolean, default=False)  # força troca no primeiro login
     session_token = db.Column(db.String(128), nullable=True)  # token para validar sessão
+    versao_sessao = db.Column(db.Integer, default=0)  # incrementada para revogar as sessões abertas
 
     def __repr__(self):
         return f'<Usuario {self.username}>'
 
     def set_password(self, senha):
-        self.senha_hash = generate_password_hash(senha)
+        self.senha_hash = hasher_senhas.gerar(senha)
 
     def check_password(self, senha):
-        return check_password_hash(self.senha_hash, senha)
+        return hasher_senhas.verificar(self.senha_hash, senha)
+
+    def atualizar_hash_se_necessario(self, senha):
+        """Regrava o hash com o método/custo atual; chamar só depois de conferir a senha."""
+        if hasher_senhas.precisa_rehash(self.senha_hash):
+            self.set_password(senha)
+            return True
+        return False
+
+    def is_admin(self):
+        return self.tipo_permissao == 'admin'
+
+    def revogar_sessoes(self):
+        """Invalida as sessões abertas, inclusive as validadas só pela sessão assinada."""
+        self.versao_sessao = (self.versao_sessao or 0) + 1
+
+class UsuarioSessao:
+    """Usuário logado montado a partir da sessão assinada (modo SESSAO_STATELESS), sem ir ao banco."""
+
+    def __init__(self, claim):
+        self.id = claim['id']
+        self.username = claim['username']
+        self.nome_completo = claim['nome']
+        self.tipo_permissao = claim['papel']
+        self.ativo = claim['ativo']
+        self.versao_sessao = claim['versao']
 
     def is_admin(self):
         return self.tipo_permissao == 'admin'
 
+# Disponibiliza a função para todos os templates
 @app.context_processor
 def inject_user():
-    def get_current_user():
-        user_id = session.get('user_id')
-        if user_id:
-            return Usuario.query.get(user_id)
-        return None
     return dict(get_current_user=get_current_user)
 
 
@@ -143,15 +270,28 @@ class Cliente(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     nome = db.Column(db.String(100), nullable=False)
     telefone = db.Column(db.String(20), nullable=False)
+    telefone_normalizado = db.Column(db.String(20), index=True)  # apenas dígitos, para busca de duplicados
     data_matricula = db.Column(db.Date, nullable=False, default=date.today)
-    valor_mensalidade = db.Column(db.Float, nullable=False)
+    valor_mensalidade = db.Column(Centavos, nullable=False)  # Decimal em reais, gravado em centavos
     dia_vencimento = db.Column(db.Integer, nullable=False)  # dia do mês (1-31)
     ativo = db.Column(db.Boolean, default=True)
-    pagamentos = db.relationship('Pagamento', backref='cliente', lazy=True)
+    data_desativacao = db.Column(db.Date)  # preenchida ao desativar; usada no cálculo de churn
+    # 'dynamic': cliente.pagamentos é uma consulta, filtrada/paginada no banco em vez de carregar a lista toda
+    pagamentos = db.relationship('Pagamento', backref='cliente', lazy='dynamic')
+
+    __table_args__ = (
+        # Lista de clientes: filtro por ativo + busca/ordenação por nome
+        db.Index('ix_cliente_ativo_nome', 'ativo', 'nome'),
+    )
 
     def __repr__(self):
         return f'<Cliente {self.nome}>'
 
+    @validates('telefone')
+    def _sincronizar_telefone_normalizado(self, key, telefone):
+        self.telefone_normalizado = normalizar_telefone(telefone)
+        return telefone
+
     # (mantive suas funções de atraso/calculo — sem alteração funcional importante)
     def esta_em_atraso(self):
         hoje = date.today()
@@ -166,35 +306,16 @@ class Cliente(db.Model):
         return hoje > vencimento
 
     def calcular_meses_atraso(self):
-        hoje = date.today()
-        ultimo_pagamento = Pagamento.query.filter_by(cliente_id=self.id).order_by(Pagamento.data_pagamento.desc()).first()
-        data_referencia = self.data_matricula
-        if ultimo_pagamento:
-            data_referencia = ultimo_pagamento.data_pagamento
-        meses_atraso = 0
-        valor_devido = 0
-        data_verificacao = data_referencia + relativedelta(months=1)
-        while data_verificacao.year < hoje.year or (data_verificacao.year == hoje.year and data_verificacao.month <= hoje.month):
-            data_verificacao_ajustada = date(data_verificacao.year, data_verificacao.month, min(self.dia_vencimento, 28))
-            if data_verificacao.year == hoje.year and data_verificacao.month == hoje.month and hoje < data_verificacao_ajustada:
-                break
-            pagamento_existente = Pagamento.query.filter_by(
-                cliente_id=self.id,
-                mes_referencia=data_verificacao.month,
-                ano_referencia=data_verificacao.year
-            ).first()
-            if not pagamento_existente:
-                meses_atraso += 1
-                valor_devido += self.valor_mensalidade
-            data_verificacao += relativedelta(months=1)
-        return meses_atraso, valor_devido
+        if not self.ativo:
+            return calcular_meses_atraso_clientes([self])[self.id]
+        return atrasos_situacoes([self.id]).get(self.id, (0, 0))
 
     def proximo_vencimento(self):
         hoje = date.today()
         if hoje.day <= self.dia_vencimento:
             return date(hoje.year, hoje.month, self.dia_vencimento)
         else:
-            proximo_mes = hoje + relativedelta(months=1)
+            proximo_mes = somar_meses(hoje, 1)
             return date(proximo_mes.year, proximo_mes.month, self.dia_vencimento)
 
 
@@ -203,14 +324,117 @@ class Pagamento(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     cliente_id = db.Column(db.Integer, db.ForeignKey('cliente.id'), nullable=False)
     data_pagamento = db.Column(db.Date, nullable=False, default=date.today)
-    valor_pago = db.Column(db.Float, nullable=False)
+    valor_pago = db.Column(Centavos, nullable=False)
     mes_referencia = db.Column(db.Integer, nullable=False)
     ano_referencia = db.Column(db.Integer, nullable=False)
     observacoes = db.Column(db.Text)
 
+    __table_args__ = (
+        # Um pagamento por cliente e mês de referência; atende também as
+        # consultas de status e atraso por (cliente, ano, mês)
+        db.Index('ix_pagamento_cliente_referencia', 'cliente_id', 'ano_referencia', 'mes_referencia', unique=True),
+        # Último pagamento do cliente / histórico ordenado por data
+        db.Index('ix_pagamento_cliente_data', 'cliente_id', 'data_pagamento'),
+    )
+
     def __repr__(self):
         return f'<Pagamento {self.cliente.nome} - {self.mes_referencia}/{self.ano_referencia}>'
 
+class Mensalidade(db.Model):
+    """Cobrança materializada: uma linha por cliente e mês de referência."""
+    id = db.Column(db.Integer, primary_key=True)
+    cliente_id = db.Column(db.Integer, db.ForeignKey('cliente.id'), nullable=False)
+    ano_referencia = db.Column(db.Integer, nullable=False)
+    mes_referencia = db.Column(db.Integer, nullable=False)
+    competencia = db.Column(db.Date, nullable=False)  # primeiro dia do mês de referência
+    data_vencimento = db.Column(db.Date, nullable=False)
+    valor_devido = db.Column(Centavos, nullable=False)
+    valor_pago = db.Column(Centavos, nullable=False, default=0)
+    pagamento_id = db.Column(db.Integer, db.ForeignKey('pagamento.id'), nullable=True)
+
+    __table_args__ = (
+        db.Index('ix_mensalidade_cliente_referencia', 'cliente_id', 'ano_referencia', 'mes_referencia', unique=True),
+        # Clientes com algum pagamento / mês atual pago
+        db.Index('ix_mensalidade_cliente_pagamento', 'cliente_id', 'pagamento_id'),
+        # Mensalidades em aberto já vencidas (relatório de inadimplentes)
+        db.Index('ix_mensalidade_aberta', 'pagamento_id', 'data_vencimento'),
+    )
+
+    def __repr__(self):
+        return f'<Mensalidade {self.cliente_id} - {self.mes_referencia}/{self.ano_referencia}>'
+
+class SituacaoCliente(db.Model):
+    """Status e atraso de cada cliente, recalculados nas escritas e uma vez por dia."""
+    cliente_id = db.Column(db.Integer, db.ForeignKey('cliente.id'), primary_key=True)
+    status = db.Column(db.String(20), nullable=False)  # 'Em dia', 'Aguardando', 'Em atraso' ou 'Inativo'
+    meses_atraso = db.Column(db.Integer, nullable=False, default=0)
+    valor_devido = db.Column(Centavos, nullable=False, default=0)
+    calculado_em = db.Column(db.Date, nullable=False)  # dia usado no cálculo
+
+    __table_args__ = (
+        # Filtro por status (lista de clientes, dashboard)
+        db.Index('ix_situacao_status', 'status'),
+        # Inadimplentes (meses_atraso > 0)
+        db.Index('ix_situacao_meses_atraso', 'meses_atraso'),
+        # Situações calculadas antes de hoje (recálculo diário)
+        db.Index('ix_situacao_calculado_em', 'calculado_em'),
+    )
+
+    def __repr__(self):
+        return f'<SituacaoCliente {self.cliente_id} - {self.status}>'
+
+class ExecucaoAgendada(db.Model):
+    """Uma linha por tarefa agendada e dia: o worker que a inserir executa a tarefa, os demais desistem."""
+    tarefa = db.Column(db.String(50), primary_key=True)
+    dia = db.Column(db.Date, primary_key=True)
+    iniciada_em = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)  # UTC
+
+class VersaoDados(db.Model):
+    """Registro único com a versão dos dados de clientes/pagamentos (ETag da API, chaves do cache do dashboard)."""
+    id = db.Column(db.Integer, primary_key=True)
+    versao = db.Column(db.Integer, nullable=False, default=0)
+    atualizado_em = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)  # UTC
+
+# --- Invalidação do cache ---
+# Ouvintes na sessão deste `db` (não na classe Session): outras sessões do processo não são afetadas
+MODELOS_DO_DASHBOARD = (Cliente, Pagamento, Mensalidade, SituacaoCliente)
+
+@event.listens_for(db.session, 'after_flush')
+def _marcar_escrita_orm(session, flush_context):
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        if isinstance(obj, MODELOS_DO_DASHBOARD):
+            session.info['invalidar_dashboard'] = True
+            return
+
+@event.listens_for(db.session, 'do_orm_execute')
+def _marcar_escrita_em_lote(orm_execute_state):
+    # insert()/update() em lote não passam pelo flush
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        mapper = orm_execute_state.bind_mapper
+        if mapper is not None and mapper.class_ in MODELOS_DO_DASHBOARD:
+            orm_execute_state.session.info['invalidar_dashboard'] = True
+
+@event.listens_for(db.session, 'before_commit')
+def _incrementar_versao_dados(session):
+    # Na mesma transação da escrita: a versão nunca fica à frente (nem atrás) dos dados gravados
+    session.flush()
+    if session.info.get('invalidar_dashboard'):
+        session.execute(
+            update(VersaoDados)
+            .where(VersaoDados.id == 1)
+            .values(versao=VersaoDados.versao + 1, atualizado_em=datetime.utcnow())
+        )
+
+@event.listens_for(db.session, 'after_commit')
+def _invalidar_cache_dashboard(session):
+    if session.info.pop('invalidar_dashboard', False):
+        cache.delete_prefix('dashboard:')
+        avisar_dashboards()
+
+@event.listens_for(db.session, 'after_rollback')
+def _descartar_marcacao(session):
+    session.info.pop('invalidar_dashboard', None)
+
 # --- Helpers de segurança ---
 def password_strong_enough(password: str) -> (bool, str):
     """Regra mínima de senha: >=8 chars, maiúscula, minúscula, número, caractere especial."""
@@ -226,15 +450,57 @@ def password_strong_enough(password: str) -> (bool, str):
         return False, "A senha deve conter ao menos um caractere especial."
     return True, ""
 
+def carregar_usuario_sessao():
+    """Usuário referenciado pela sessão, buscado no banco no máximo uma vez por requisição."""
+    if '_usuario_sessao' not in g:
+        user_id = session.get('user_id')
+        g._usuario_sessao = db.session.get(Usuario, user_id) if user_id else None
+    return g._usuario_sessao
+
+def gravar_claim_sessao(usuario):
+    """Grava na sessão os dados do usuário, válidos sem consulta por SESSAO_REVALIDAR_SEGUNDOS."""
+    session['claim'] = {
+        'id': usuario.id,
+        'username': usuario.username,
+        'nome': usuario.nome_completo,
+        'papel': usuario.tipo_permissao,
+        'ativo': bool(usuario.ativo),
+        'versao': usuario.versao_sessao or 0,
+        'expira': time.time() + app.config['SESSAO_REVALIDAR_SEGUNDOS'],
+    }
+
+def usuario_sessao_valido():
+    """Usuário da sessão se o token (e a versão) conferem; None se a sessão não vale mais.
+
+    No modo SESSAO_STATELESS, enquanto a claim não expira o usuário vem dela
+    (UsuarioSessao); depois disso é conferido no banco e a claim é renovada.
+    """
+    if '_usuario_valido' in g:
+        return g._usuario_valido
+    usuario = None
+    claim = session.get('claim')
+    if (app.config['SESSAO_STATELESS'] and claim and claim.get('id') == session.get('user_id')
+            and claim.get('expira', 0) > time.time()):
+        usuario = UsuarioSessao(claim)
+    else:
+        u = carregar_usuario_sessao()
+        if (u and u.session_token == session.get('session_token')
+                and (claim is None or claim.get('versao') == (u.versao_sessao or 0))):
+            usuario = u
+            if app.config['SESSAO_STATELESS']:
+                gravar_claim_sessao(u)
+    g._usuario_valido = usuario
+    return usuario
+
 def login_required(f):
     @wraps(f)
     def decorated_function(*args, **kwargs):
         if 'user_id' not in session or 'session_token' not in session:
             flash('Você precisa fazer login para acessar esta página.', 'warning')
             return redirect(url_for('login'))
-        # Validar token de sessão contra DB
-        usuario = Usuario.query.get(session.get('user_id'))
-        if not usuario or usuario.session_token != session.get('session_token') or not usuario.ativo:
+        # Validar token de sessão (no banco ou pela claim assinada)
+        usuario = usuario_sessao_valido()
+        if not usuario or not usuario.ativo:
             # sessão inválida
             session.clear()
             flash('Sessão inválida. Faça login novamente.', 'warning')
@@ -248,65 +514,437 @@ def admin_required(f):
         if 'user_id' not in session or 'session_token' not in session:
             flash('Você precisa fazer login para acessar esta página.', 'warning')
             return redirect(url_for('login'))
-        usuario = Usuario.query.get(session.get('user_id'))
-        if not usuario or usuario.session_token != session.get('session_token') or not usuario.is_admin():
+        usuario = usuario_sessao_valido()
+        if not usuario or not usuario.is_admin():
             flash('Acesso negado. Esta área é restrita para administradores.', 'error')
             return redirect(url_for('dashboard'))
         return f(*args, **kwargs)
     return decorated_function
 
-def get_current_user():
+def get_current_user(do_banco=False):
+    """Usuário logado; `do_banco=True` garante o modelo Usuario (para alterá-lo)."""
     if 'user_id' in session and 'session_token' in session:
-        u = Usuario.query.get(session['user_id'])
-        if u and u.session_token == session.get('session_token'):
-            return u
+        u = usuario_sessao_valido()
+        if u and do_banco and not isinstance(u, Usuario):
+            u = carregar_usuario_sessao()
+        return u
     return None
 
-def calcular_status_cliente(cliente):
-    """Retorna o status do cliente: 'Em dia', 'Aguardando', 'Em atraso' ou 'Inativo'"""
-    from datetime import date
-    hoje = date.today()
+def calcular_atraso(data_referencia, dia_vencimento, valor_mensalidade, meses_pagos, hoje=None):
+    """Calcula (meses_atraso, valor_devido) em memória.
 
-    if not cliente.ativo:
-        return "Inativo"
+    `data_referencia` é a data do último pagamento (ou a data de matrícula) e
+    `meses_pagos` o conjunto de (ano, mes) de referência já pagos pelo cliente.
+    Percorre os meses seguintes à data de referência até o mês atual, contando
+    os que não foram pagos; o mês atual só conta depois do vencimento.
+    """
+    hoje = hoje or date.today()
+    meses_atraso = 0
+    valor_devido = 0
+    data_verificacao = somar_meses(data_referencia, 1)
+    while data_verificacao.year < hoje.year or (data_verificacao.year == hoje.year and data_verificacao.month <= hoje.month):
+        data_verificacao_ajustada = date(data_verificacao.year, data_verificacao.month, min(dia_vencimento, 28))
+        if data_verificacao.year == hoje.year and data_verificacao.month == hoje.month and hoje < data_verificacao_ajustada:
+            break
+        if (data_verificacao.year, data_verificacao.month) not in meses_pagos:
+            meses_atraso += 1
+            valor_devido += valor_mensalidade
+        data_verificacao = somar_meses(data_verificacao, 1)
+    return meses_atraso, valor_devido
+
+def calcular_meses_atraso_clientes(clientes, hoje=None):
+    """Retorna {cliente_id: (meses_atraso, valor_devido)} para vários clientes.
+
+    Carrega os meses pagos e a data do último pagamento de todos os clientes em
+    uma única consulta agrupada e faz o cálculo em memória.
+    """
+    clientes = list(clientes)
+    if not clientes:
+        return {}
+
+    meses_pagos = {cliente.id: set() for cliente in clientes}
+    ultimo_pagamento = {}
+    linhas = (
+        db.session.query(
+            Pagamento.cliente_id,
+            Pagamento.ano_referencia,
+            Pagamento.mes_referencia,
+            func.max(Pagamento.data_pagamento)
+        )
+        .filter(Pagamento.cliente_id.in_(meses_pagos.keys()))
+        .group_by(Pagamento.cliente_id, Pagamento.ano_referencia, Pagamento.mes_referencia)
+    )
+    for cliente_id, ano, mes, data_pagamento in linhas:
+        meses_pagos[cliente_id].add((ano, mes))
+        if cliente_id not in ultimo_pagamento or data_pagamento > ultimo_pagamento[cliente_id]:
+            ultimo_pagamento[cliente_id] = data_pagamento
+
+    return {
+        cliente.id: calcular_atraso(
+            ultimo_pagamento.get(cliente.id, cliente.data_matricula),
+            cliente.dia_vencimento,
+            cliente.valor_mensalidade,
+            meses_pagos[cliente.id],
+            hoje
+        )
+        for cliente in clientes
+    }
 
-    # Verifica se o cliente já fez algum pagamento
-    tem_pagamento = Pagamento.query.filter_by(cliente_id=cliente.id).first()
-    
-    # Se nunca pagou nada, está "Aguardando" (cliente novo)
-    if not tem_pagamento:
-        return "Aguardando"
+def _indice_mes(ano, mes):
+    return ano * 12 + mes - 1
 
-    # Verifica se pagou o mês atual
-    pagou_mes_atual = Pagamento.query.filter_by(
-        cliente_id=cliente.id,
-        mes_referencia=hoje.month,
-        ano_referencia=hoje.year
-    ).first()
+def _mes_do_indice(indice):
+    return indice // 12, indice % 12 + 1
+
+def _data_vencimento(ano, mes, dia_vencimento):
+    return date(ano, mes, min(dia_vencimento, 28))
 
-    if pagou_mes_atual:
-        return "Em dia"
+def sincronizar_mensalidades(cliente_ids=None, hoje=None):
+    """Gera as mensalidades que faltam e as vincula aos pagamentos existentes.
 
-    # Calcula a data de vencimento do mês atual
+    Para cada cliente ativo (ou apenas os de `cliente_ids`) garante uma linha
+    por mês, contígua, desde o mês da matrícula (ou do primeiro pagamento, se
+    anterior) até o mês atual ou o último mês já pago. Retorna quantas linhas
+    foram criadas.
+    """
+    hoje = hoje or date.today()
+    mes_atual = _indice_mes(hoje.year, hoje.month)
+
+    clientes_query = db.session.query(
+        Cliente.id, Cliente.data_matricula, Cliente.valor_mensalidade, Cliente.dia_vencimento
+    ).filter(Cliente.ativo == True)
+    faixas_query = db.session.query(
+        Mensalidade.cliente_id,
+        func.min(Mensalidade.ano_referencia * 12 + Mensalidade.mes_referencia - 1),
+        func.max(Mensalidade.ano_referencia * 12 + Mensalidade.mes_referencia - 1)
+    ).group_by(Mensalidade.cliente_id)
+    pagamentos_query = db.session.query(
+        Pagamento.cliente_id,
+        func.min(Pagamento.data_pagamento),
+        func.min(Pagamento.ano_referencia * 12 + Pagamento.mes_referencia - 1),
+        func.max(Pagamento.ano_referencia * 12 + Pagamento.mes_referencia - 1)
+    ).group_by(Pagamento.cliente_id)
+    if cliente_ids is not None:
+        cliente_ids = set(cliente_ids)
+        if not cliente_ids:
+            return 0
+        clientes_query = clientes_query.filter(Cliente.id.in_(cliente_ids))
+        faixas_query = faixas_query.filter(Mensalidade.cliente_id.in_(cliente_ids))
+        pagamentos_query = pagamentos_query.filter(Pagamento.cliente_id.in_(cliente_ids))
+
+    faixas = {cliente_id: (inicio, fim) for cliente_id, inicio, fim in faixas_query}
+    pagamentos = {cliente_id: resto for cliente_id, *resto in pagamentos_query}
+
+    novas = []
+    total = 0
     try:
-        import calendar
-        ultimo_dia_mes = calendar.monthrange(hoje.year, hoje.month)[1]
-        dia_vencimento_mes = min(cliente.dia_vencimento, ultimo_dia_mes)
-        vencimento_atual = date(hoje.year, hoje.month, dia_vencimento_mes)
-    except:
-        vencimento_atual = date(hoje.year, hoje.month, 28)
-
-    # Se já tem histórico de pagamentos mas não pagou este mês
-    # e o vencimento já passou, está em atraso
-    if hoje > vencimento_atual:
-        return "Em atraso"
-    
-    # Se o vencimento ainda não chegou mas já tem histórico de pagamentos
-    # tecnicamente ainda pode pagar no prazo, mas como já é cliente antigo
-    # que não pagou, considero em atraso (você pode ajustar essa lógica)
-    return "Em atraso"
+        for cliente_id, data_matricula, valor_mensalidade, dia_vencimento in clientes_query:
+            inicio = _indice_mes(data_matricula.year, data_matricula.month)
+            fim = mes_atual
+            if cliente_id in pagamentos:
+                primeira_data, primeira_ref, ultima_ref = pagamentos[cliente_id]
+                inicio = min(inicio, _indice_mes(primeira_data.year, primeira_data.month), primeira_ref)
+                fim = max(fim, ultima_ref)
+
+            if cliente_id in faixas:
+                existente_inicio, existente_fim = faixas[cliente_id]
+                indices = list(range(inicio, existente_inicio)) + list(range(existente_fim + 1, fim + 1))
+            else:
+                indices = range(inicio, fim + 1)
+
+            for indice in indices:
+                ano, mes = _mes_do_indice(indice)
+                novas.append({
+                    'cliente_id': cliente_id,
+                    'ano_referencia': ano,
+                    'mes_referencia': mes,
+                    'competencia': date(ano, mes, 1),
+                    'data_vencimento': _data_vencimento(ano, mes, dia_vencimento),
+                    'valor_devido': valor_mensalidade,
+                    'valor_pago': 0,
+                })
+            # Insere em blocos para limitar a memória na primeira geração
+            if len(novas) >= TAMANHO_LOTE_MENSALIDADES:
+                total += _inserir_mensalidades(novas)
+                novas = []
+
+        total += _inserir_mensalidades(novas)
+        vincular_pagamentos(cliente_ids)
+        db.session.commit()
+    except IntegrityError:
+        # Outro processo gerou as mesmas mensalidades ao mesmo tempo: as linhas dele
+        # ficam, mas os pagamentos e a situação ainda precisam ser atualizados aqui
+        db.session.rollback()
+        total = 0
+        vincular_pagamentos(cliente_ids)
+        db.session.commit()
+    atualizar_situacoes(cliente_ids, hoje=hoje)
+    return total
+
+TAMANHO_LOTE_MENSALIDADES = 5000
+
+def _inserir_mensalidades(novas):
+    if novas:
+        db.session.execute(insert(Mensalidade), novas)
+    return len(novas)
+
+def vincular_pagamentos(cliente_ids=None):
+    """Associa às mensalidades em aberto os pagamentos do mesmo mês de referência.
+
+    Um único UPDATE com subconsultas correlacionadas, sem trazer as linhas para o Python.
+    """
+    mesmo_mes = (
+        (Pagamento.cliente_id == Mensalidade.cliente_id)
+        & (Pagamento.ano_referencia == Mensalidade.ano_referencia)
+        & (Pagamento.mes_referencia == Mensalidade.mes_referencia)
+    )
+    vinculo = (
+        update(Mensalidade)
+        .where(Mensalidade.pagamento_id.is_(None), select(Pagamento.id).where(mesmo_mes).exists())
+        .values(
+            pagamento_id=select(Pagamento.id).where(mesmo_mes).scalar_subquery(),
+            valor_pago=select(Pagamento.valor_pago).where(mesmo_mes).scalar_subquery()
+        )
+        .execution_options(synchronize_session=False)
+    )
+    if cliente_ids is not None:
+        vinculo = vinculo.where(Mensalidade.cliente_id.in_(cliente_ids))
+    return db.session.execute(vinculo).rowcount
+
+def atualizar_mensalidades_abertas(cliente):
+    """Replica valor e dia de vencimento do cliente nas mensalidades ainda não pagas."""
+    abertas = Mensalidade.query.filter(
+        Mensalidade.cliente_id == cliente.id,
+        Mensalidade.pagamento_id.is_(None)
+    )
+    for mensalidade in abertas:
+        mensalidade.valor_devido = cliente.valor_mensalidade
+        mensalidade.data_vencimento = _data_vencimento(
+            mensalidade.ano_referencia, mensalidade.mes_referencia, cliente.dia_vencimento
+        )
+
+def atrasos_mensalidades(cliente_ids=None, hoje=None):
+    """Retorna {cliente_id: (meses_atraso, valor_devido)} dos clientes ativos em atraso.
+
+    Equivale a calcular_meses_atraso_clientes(), mas como uma única consulta
+    agregada sobre as mensalidades vencidas e não pagas posteriores ao mês do
+    último pagamento (ou da matrícula). As telas leem o resultado já gravado em
+    SituacaoCliente (ver atrasos_situacoes).
+    """
+    hoje = hoje or date.today()
+    ultimo_pagamento = (
+        db.session.query(
+            Pagamento.cliente_id.label('cliente_id'),
+            func.max(Pagamento.data_pagamento).label('data_pagamento')
+        )
+        .group_by(Pagamento.cliente_id)
+    )
+    if cliente_ids is not None:
+        ultimo_pagamento = ultimo_pagamento.filter(Pagamento.cliente_id.in_(set(cliente_ids)))
+    ultimo_pagamento = ultimo_pagamento.subquery()
+
+    atrasos = (
+        db.session.query(
+            Mensalidade.cliente_id,
+            func.count(Mensalidade.id),
+            func.sum(Mensalidade.valor_devido)
+        )
+        .join(Cliente, Cliente.id == Mensalidade.cliente_id)
+        .outerjoin(ultimo_pagamento, ultimo_pagamento.c.cliente_id == Mensalidade.cliente_id)
+        .filter(
+            Cliente.ativo == True,
+            Mensalidade.pagamento_id.is_(None),
+            Mensalidade.data_vencimento <= hoje,
+            Mensalidade.competencia > func.coalesce(ultimo_pagamento.c.data_pagamento, Cliente.data_matricula)
+        )
+        .group_by(Mensalidade.cliente_id)
+    )
+    if cliente_ids is not None:
+        atrasos = atrasos.filter(Mensalidade.cliente_id.in_(set(cliente_ids)))
+    return {cliente_id: (meses, valor) for cliente_id, meses, valor in atrasos}
+
+def _calcular_status(cliente_ids=None, hoje=None):
+    """Calcula {cliente_id: status} a partir das mensalidades, com consultas agrupadas.
+
+    'Inativo' para clientes desativados; 'Aguardando' para quem nunca pagou;
+    'Em dia' para quem pagou o mês atual; 'Em atraso' para os demais, mesmo que
+    o vencimento do mês ainda não tenha chegado. Sem `cliente_ids`, todos os clientes.
+    """
+    hoje = hoje or date.today()
+    ativos_query = db.session.query(Cliente.id, Cliente.ativo)
+    com_pagamento_query = (
+        db.session.query(Mensalidade.cliente_id)
+        .filter(Mensalidade.pagamento_id.isnot(None))
+        .group_by(Mensalidade.cliente_id)
+    )
+    pagos_mes_atual_query = db.session.query(Mensalidade.cliente_id).filter(
+        Mensalidade.ano_referencia == hoje.year,
+        Mensalidade.mes_referencia == hoje.month,
+        Mensalidade.pagamento_id.isnot(None)
+    )
+    if cliente_ids is not None:
+        ativos_query = ativos_query.filter(Cliente.id.in_(cliente_ids))
+        com_pagamento_query = com_pagamento_query.filter(Mensalidade.cliente_id.in_(cliente_ids))
+        pagos_mes_atual_query = pagos_mes_atual_query.filter(Mensalidade.cliente_id.in_(cliente_ids))
+
+    com_pagamento = {cliente_id for (cliente_id,) in com_pagamento_query}
+    pagos_mes_atual = {cliente_id for (cliente_id,) in pagos_mes_atual_query}
+
+    status = {}
+    for cliente_id, ativo in ativos_query:
+        if not ativo:
+            status[cliente_id] = "Inativo"
+        elif cliente_id not in com_pagamento:
+            status[cliente_id] = "Aguardando"
+        elif cliente_id in pagos_mes_atual:
+            status[cliente_id] = "Em dia"
+        else:
+            status[cliente_id] = "Em atraso"
+    return status
+
+TAMANHO_LOTE_SITUACOES = 5000
+
+def atualizar_situacoes(cliente_ids=None, hoje=None):
+    """Recalcula e grava a SituacaoCliente dos clientes informados (ou de todos).
+
+    Chamada após cada escrita em clientes/pagamentos (via sincronizar_mensalidades)
+    e uma vez por dia (comando atualizar-situacoes ou agendador), para que as
+    telas só leiam a tabela pelos índices.
+    """
+    hoje = hoje or date.today()
+    if cliente_ids is not None:
+        cliente_ids = set(cliente_ids)
+        if not cliente_ids:
+            return 0
+
+    status = _calcular_status(cliente_ids, hoje)
+    atrasos = atrasos_mensalidades(cliente_ids, hoje)
+    linhas = [
+        {
+            'cliente_id': cliente_id,
+            'status': situacao,
+            'meses_atraso': atrasos.get(cliente_id, (0, 0))[0],
+            'valor_devido': atrasos.get(cliente_id, (0, 0))[1] or 0,
+            'calculado_em': hoje,
+        }
+        for cliente_id, situacao in status.items()
+    ]
+
+    try:
+        remover = delete(SituacaoCliente)
+        if cliente_ids is not None:
+            remover = remover.where(SituacaoCliente.cliente_id.in_(cliente_ids))
+        db.session.execute(remover)
+        for inicio in range(0, len(linhas), TAMANHO_LOTE_SITUACOES):
+            db.session.execute(insert(SituacaoCliente), linhas[inicio:inicio + TAMANHO_LOTE_SITUACOES])
+        db.session.commit()
+    except IntegrityError:
+        # Outro processo gravou as mesmas situações ao mesmo tempo
+        db.session.rollback()
+        return 0
+    return len(linhas)
+
+def recalcular_situacoes(hoje=None):
+    """Rotina diária: gera as mensalidades que faltam e recalcula a situação de todos os clientes.
+
+    Roda pelo comando atualizar-situacoes (cron) ou pelo agendador, nunca nas
+    leituras. Retorna quantas mensalidades foram geradas.
+    """
+    return sincronizar_mensalidades(hoje=hoje or date.today())
+
+_situacoes_verificadas_em = None
+
+def verificar_situacoes():
+    """Avisa no log, uma vez por dia (por processo), se há situações calculadas antes de hoje.
+
+    As leituras não recalculam nada: até o cron ou o agendador rodar, as telas
+    mostram a última situação gravada.
+    """
+    global _situacoes_verificadas_em
+    hoje = date.today()
+    if _situacoes_verificadas_em == hoje:
+        return
+    _situacoes_verificadas_em = hoje
+    calculado_em = db.session.query(func.min(SituacaoCliente.calculado_em)).scalar()
+    if calculado_em is not None and calculado_em < hoje:
+        app.logger.warning(
+            'Situações dos clientes calculadas em %s. Agende `flask --app app atualizar-situacoes` '
+            'ou defina AGENDADOR_SITUACOES=1.', calculado_em.isoformat()
+        )
+
+def calcular_status_clientes(cliente_ids):
+    """Retorna {cliente_id: status} lido de SituacaoCliente ('Em dia', 'Aguardando', 'Em atraso' ou 'Inativo')."""
+    ids = set(cliente_ids)
+    if not ids:
+        return {}
+    verificar_situacoes()
+    status = dict(
+        db.session.query(SituacaoCliente.cliente_id, SituacaoCliente.status)
+        .filter(SituacaoCliente.cliente_id.in_(ids))
+    )
+    faltando = ids - status.keys()
+    if faltando:
+        # Clientes ainda sem situação gravada (ex.: banco migrado): calcula sem gravar
+        status.update(_calcular_status(faltando))
+    return status
+
+def atrasos_situacoes(cliente_ids=None):
+    """Retorna {cliente_id: (meses_atraso, valor_devido)} dos clientes em atraso, lido de SituacaoCliente."""
+    verificar_situacoes()
+    consulta = db.session.query(
+        SituacaoCliente.cliente_id, SituacaoCliente.meses_atraso, SituacaoCliente.valor_devido
+    ).filter(SituacaoCliente.meses_atraso > 0)
+    if cliente_ids is not None:
+        consulta = consulta.filter(SituacaoCliente.cliente_id.in_(set(cliente_ids)))
+    return {cliente_id: (meses, valor) for cliente_id, meses, valor in consulta}
+
+def filtro_status_sql(status):
+    """Expressão SQL para filtrar clientes por status direto no banco (antes da paginação)."""
+    verificar_situacoes()
+    if status == "Inativo":
+        return Cliente.ativo == False
+    if status in ("Aguardando", "Em dia", "Em atraso"):
+        return (Cliente.ativo == True) & Cliente.id.in_(
+            select(SituacaoCliente.cliente_id).where(SituacaoCliente.status == status)
+        )
+    return None
+
+def calcular_status_cliente(cliente):
+    """Retorna o status do cliente: 'Em dia', 'Aguardando', 'Em atraso' ou 'Inativo'"""
+    if not cliente.ativo:
+        return "Inativo"
+    return calcular_status_clientes([cliente.id]).get(cliente.id, "Aguardando")
+
+def ultimos_pagamentos(cliente_ids):
+    """Retorna {cliente_id: Pagamento} com o pagamento mais recente de cada cliente, em uma consulta."""
+    ids = set(cliente_ids)
+    if not ids:
+        return {}
+    recentes = (
+        db.session.query(
+            Pagamento.cliente_id.label('cliente_id'),
+            func.max(Pagamento.data_pagamento).label('data_pagamento')
+        )
+        .filter(Pagamento.cliente_id.in_(ids))
+        .group_by(Pagamento.cliente_id)
+        .subquery()
+    )
+    pagamentos = (
+        Pagamento.query
+        .join(recentes, (Pagamento.cliente_id == recentes.c.cliente_id)
+              & (Pagamento.data_pagamento == recentes.c.data_pagamento))
+        .order_by(Pagamento.id)
+        .all()
+    )
+    # Em caso de empate na data, fica o último registrado
+    return {pagamento.cliente_id: pagamento for pagamento in pagamentos}
 
 # --- Rotas de autenticação ---
+@app.errorhandler(SobrecargaSenhas)
+def sobrecarga_senhas(erro):
+    # Troca de senha/criação de usuário com a fila de hashes cheia
+    return 'Servidor ocupado. Tente novamente em alguns segundos.', 503, {'Retry-After': '2'}
+
 @app.route('/login', methods=['GET', 'POST'])
 @csrf.exempt  # Se você usa forms com token, REMOVA este decorator. Está aqui só para evitar erro se template não tiver token.
 def login():
@@ -317,6 +955,7 @@ def login():
         # rate limit check
         allowed, wait_seconds = check_rate_limit()
         if not allowed:
+            metrica_logins.inc(resultado='bloqueado')
             flash(f'Tentativas excedidas. Tente novamente em {int(wait_seconds // 60)+1} minutos.', 'error')
             return render_template('login.html')
 
@@ -328,9 +967,20 @@ def login():
             return render_template('login.html')
 
         usuario = Usuario.query.filter_by(username=username).first()
-        if usuario and usuario.ativo and usuario.check_password(senha):
+        try:
+            senha_correta = bool(usuario and usuario.ativo and usuario.check_password(senha))
+            if senha_correta:
+                # hash gerado com parâmetros antigos: regrava com os atuais
+                usuario.atualizar_hash_se_necessario(senha)
+        except SobrecargaSenhas:
+            metrica_logins.inc(resultado='sobrecarga')
+            flash('Muitos acessos ao mesmo tempo. Tente novamente em alguns segundos.', 'error')
+            return render_template('login.html'), 503, {'Retry-After': '2'}
+
+        if senha_correta:
             # reset rate limiter
             reset_failed_attempts()
+            metrica_logins.inc(resultado='sucesso')
 
             # criar token de sessão e salvar no db
             token = secrets.token_urlsafe(32)
@@ -342,6 +992,10 @@ def login():
             session.clear()
             session['user_id'] = usuario.id
             session['session_token'] = token
+            if app.config['SESSAO_STATELESS']:
+                gravar_claim_sessao(usuario)
+            g.pop('_usuario_sessao', None)
+            g.pop('_usuario_valido', None)
 
             flash(f'Bem-vindo, {usuario.nome_completo}!', 'success')
 
@@ -352,7 +1006,9 @@ def login():
             return redirect(url_for('dashboard'))
         else:
             # registrar tentativa falha
-            record_failed_attempt()
+            metrica_logins.inc(resultado='falha')
+            if record_failed_attempt():
+                metrica_bloqueios.inc()
             flash('Usuário ou senha inválidos.', 'error')
 
     return render_template('login.html')
@@ -360,11 +1016,12 @@ def login():
 @app.route('/logout')
 @login_required
 def logout():
-    usuario = get_current_user()
+    usuario = get_current_user(do_banco=True)
     nome = usuario.nome_completo if usuario else 'Usuário'
     # invalidar token no banco
     if usuario:
         usuario.session_token = None
+        usuario.revogar_sessoes()
         db.session.commit()
     session.clear()
     flash(f'Até logo, {nome}!', 'info')
@@ -373,7 +1030,7 @@ def logout():
 @app.route('/trocar_senha', methods=['GET', 'POST'])
 @login_required
 def trocar_senha():
-    usuario = get_current_user()
+    usuario = get_current_user(do_banco=True)
     if not usuario:
         flash('Usuário não encontrado.', 'error')
         return redirect(url_for('login'))
@@ -396,9 +1053,12 @@ def trocar_senha():
         usuario.set_password(nova_senha)
         usuario.must_reset_password = False
         usuario.session_token = secrets.token_urlsafe(32)
+        usuario.revogar_sessoes()
         db.session.commit()
 
         session['session_token'] = usuario.session_token
+        if app.config['SESSAO_STATELESS']:
+            gravar_claim_sessao(usuario)
         flash('Senha alterada com sucesso!', 'success')
         return redirect(url_for('dashboard'))
 
@@ -461,6 +1121,7 @@ def desativar_usuario(usuario_id):
         return redirect(url_for('gerenciar_usuarios'))
     usuario.ativo = False
     usuario.session_token = None
+    usuario.revogar_sessoes()
     db.session.commit()
     flash(f'Usuário {usuario.nome_completo} foi desativado.', 'success')
     return redirect(url_for('gerenciar_usuarios'))
@@ -479,23 +1140,14 @@ def ativar_usuario(usuario_id):
 @app.route('/cadastrar_cliente', methods=['GET', 'POST'])
 @login_required
 def cadastrar_cliente():
-    print("=== FUNÇÃO CADASTRAR_CLIENTE EXECUTADA ===")
     if request.method == 'POST':
-        print("=== MÉTODO POST DETECTADO ===")
-        
         nome = request.form.get('nome').strip()
         telefone = request.form.get('telefone').strip()
-        valor_mensalidade = float(request.form.get('valor_mensalidade'))
+        valor_mensalidade = dinheiro(request.form.get('valor_mensalidade'))
         dia_vencimento = int(request.form.get('dia_vencimento'))
 
-        # DEBUG: Mostrar dados recebidos
-        print(f"DEBUG - Dados recebidos:")
-        print(f"  Nome: '{nome}'")
-        print(f"  Telefone original: '{telefone}'")
-
         # Limpa o telefone removendo formatação para comparação
-        telefone_limpo = re.sub(r'\D', '', telefone)
-        print(f"  Telefone limpo: '{telefone_limpo}'")
+        telefone_limpo = normalizar_telefone(telefone)
         
         # Validação de telefone
         if len(telefone_limpo) < 10 or len(telefone_limpo) > 11:
@@ -503,30 +1155,19 @@ def cadastrar_cliente():
             return render_template('cadastrar_cliente.html')
         
         # Validação de valor
-        if valor_mensalidade < 0 or valor_mensalidade > 999.99:
+        if valor_mensalidade < 0 or valor_mensalidade > dinheiro('999.99'):
             flash('O valor da mensalidade deve estar entre R$ 0,00 e R$ 999,99.', 'error')
             return render_template('cadastrar_cliente.html')
 
-        # NOVA VALIDAÇÃO: Buscar TODOS os clientes ativos e comparar telefones
-        todos_clientes = Cliente.query.filter_by(ativo=True).all()
-        print(f"DEBUG - Total de clientes ativos: {len(todos_clientes)}")
-        
-        cliente_duplicado = None
-        for cliente in todos_clientes:
-            # Limpa o telefone do cliente existente
-            telefone_cliente_limpo = re.sub(r'\D', '', cliente.telefone)
-            print(f"  Comparando: '{telefone_limpo}' com '{telefone_cliente_limpo}' do cliente {cliente.nome}")
-            
-            if telefone_limpo == telefone_cliente_limpo:
-                cliente_duplicado = cliente
-                break
+        # Busca cliente ativo com o mesmo telefone pela coluna normalizada (indexada)
+        cliente_duplicado = Cliente.query.filter_by(
+            telefone_normalizado=telefone_limpo,
+            ativo=True
+        ).first()
         
         if cliente_duplicado:
-            print(f"DEBUG - Cliente duplicado encontrado: {cliente_duplicado.nome}")
             flash(f'Já existe um cliente ativo cadastrado com este telefone: {cliente_duplicado.nome}', 'error')
             return render_template('cadastrar_cliente.html')
-        else:
-            print("DEBUG - Nenhum cliente duplicado encontrado")
 
         # VALIDAÇÃO por nome (opcional)
         cliente_existente_nome = Cliente.query.filter(
@@ -537,8 +1178,6 @@ def cadastrar_cliente():
         if cliente_existente_nome:
             flash(f'Atenção: Já existe um cliente com nome similar: {cliente_existente_nome.nome}', 'warning')
 
-        print(f"DEBUG - Criando novo cliente...")
-        
         # Se passou nas validações, cria o cliente
         novo_cliente = Cliente(
             nome=nome,
@@ -546,22 +1185,93 @@ def cadastrar_cliente():
             valor_mensalidade=valor_mensalidade,
             dia_vencimento=dia_vencimento
         )
+        situacao_antes = iniciar_delta_dashboard()
         db.session.add(novo_cliente)
         db.session.commit()
-        
-        print(f"DEBUG - Cliente criado com ID: {novo_cliente.id}")
+        sincronizar_mensalidades([novo_cliente.id])
+        publicar_delta_dashboard(novo_cliente, situacao_antes, total_clientes=1, valor_esperado=valor_mensalidade)
+
         flash(f'Cliente {nome} cadastrado com sucesso!', 'success')
         return redirect(url_for('listar_clientes'))
 
     return render_template('cadastrar_cliente.html')
 
+def _cursor_pagamento(pagamento):
+    return f'{pagamento.data_pagamento.isoformat()}_{pagamento.id}'
+
+def _ler_cursor_pagamento(cursor):
+    """Converte 'AAAA-MM-DD_id' em (data, id); None se ausente ou inválido."""
+    try:
+        data, pagamento_id = cursor.split('_')
+        return date.fromisoformat(data), int(pagamento_id)
+    except (AttributeError, ValueError):
+        return None
+
+def pagina_pagamentos(cliente, apos=None, antes=None, por_pagina=PAGAMENTOS_POR_PAGINA):
+    """Uma página do histórico, do mais recente para o mais antigo, paginada por (data_pagamento, id).
+
+    `apos` traz os pagamentos seguintes (mais antigos) ao cursor e `antes` os
+    anteriores (mais recentes). O custo não depende de quantas páginas ficaram
+    para trás, ao contrário de OFFSET. Retorna (pagamentos, cursor_anterior, cursor_proximo).
+    """
+    consulta = cliente.pagamentos
+    if antes:
+        data, pagamento_id = antes
+        linhas = (
+            consulta.filter(or_(Pagamento.data_pagamento > data,
+                                and_(Pagamento.data_pagamento == data, Pagamento.id > pagamento_id)))
+            .order_by(Pagamento.data_pagamento, Pagamento.id)
+            .limit(por_pagina + 1)
+            .all()
+        )
+        mais_recentes = len(linhas) > por_pagina
+        pagamentos = linhas[:por_pagina][::-1]
+        mais_antigos = True
+    else:
+        if apos:
+            data, pagamento_id = apos
+            consulta = consulta.filter(or_(Pagamento.data_pagamento < data,
+                                           and_(Pagamento.data_pagamento == data, Pagamento.id < pagamento_id)))
+        linhas = consulta.order_by(Pagamento.data_pagamento.desc(), Pagamento.id.desc()).limit(por_pagina + 1).all()
+        mais_antigos = len(linhas) > por_pagina
+        pagamentos = linhas[:por_pagina]
+        mais_recentes = apos is not None
+
+    cursor_anterior = _cursor_pagamento(pagamentos[0]) if pagamentos and mais_recentes else None
+    cursor_proximo = _cursor_pagamento(pagamentos[-1]) if pagamentos and mais_antigos else None
+    return pagamentos, cursor_anterior, cursor_proximo
+
+def subtotais_por_ano(cliente_id):
+    """[(ano, quantidade, total)] dos pagamentos do cliente, agrupados no banco."""
+    ano = func.extract('year', Pagamento.data_pagamento).label('ano')
+    return (
+        db.session.query(ano, func.count(Pagamento.id), func.coalesce(func.sum(Pagamento.valor_pago), 0))
+        .filter(Pagamento.cliente_id == cliente_id)
+        .group_by(ano)
+        .order_by(ano.desc())
+        .all()
+    )
+
 @app.route('/historico_pagamento/<int:cliente_id>')
+@login_required
 def historico_pagamento(cliente_id):
-    """Exibe o histórico de pagamentos de um cliente."""
+    """Exibe o histórico de pagamentos de um cliente, paginado."""
     cliente = Cliente.query.get_or_404(cliente_id)
-    pagamentos = Pagamento.query.filter_by(cliente_id=cliente_id).order_by(Pagamento.data_pagamento.desc()).all()
-    
-    return render_template('historico_pagamento.html', cliente=cliente, pagamentos=pagamentos)
+    pagamentos, cursor_anterior, cursor_proximo = pagina_pagamentos(
+        cliente,
+        apos=_ler_cursor_pagamento(request.args.get('apos')),
+        antes=_ler_cursor_pagamento(request.args.get('antes')),
+    )
+    subtotais = [
+        {'ano': int(ano), 'quantidade': quantidade, 'total': total}
+        for ano, quantidade, total in subtotais_por_ano(cliente_id)
+    ]
+
+    return render_template('historico_pagamento.html', cliente=cliente, pagamentos=pagamentos,
+                           subtotais=subtotais,
+                           total_pagamentos=sum(s['quantidade'] for s in subtotais),
+                           cursor_anterior=cursor_anterior, cursor_proximo=cursor_proximo,
+                           current_user=get_current_user())
 
 # Rota para exibir o formulário de edição
 @app.route('/editar_cliente/<int:cliente_id>', methods=['GET'])
@@ -581,8 +1291,12 @@ def deletar_cliente(cliente_id):
     if not cliente.ativo:
         flash(f'O cliente {cliente.nome} já está inativo.', 'info')
     else:
+        situacao_antes = iniciar_delta_dashboard(cliente.id)
         cliente.ativo = False
+        cliente.data_desativacao = date.today()
         db.session.commit()
+        atualizar_situacoes([cliente.id])
+        publicar_delta_dashboard(cliente, situacao_antes, total_clientes=-1, valor_esperado=-cliente.valor_mensalidade)
         flash(f'Cliente {cliente.nome} foi desativado com sucesso!', 'success')
     
     return redirect(url_for('listar_clientes'))
@@ -591,8 +1305,16 @@ def deletar_cliente(cliente_id):
 @login_required
 def ativar_cliente(cliente_id):
     cliente = Cliente.query.get_or_404(cliente_id)
+    estava_ativo = cliente.ativo
+    situacao_antes = iniciar_delta_dashboard(cliente.id)
     cliente.ativo = True
+    cliente.data_desativacao = None
     db.session.commit()
+    sincronizar_mensalidades([cliente.id])
+    if estava_ativo:
+        publicar_delta_dashboard(cliente, situacao_antes)
+    else:
+        publicar_delta_dashboard(cliente, situacao_antes, total_clientes=1, valor_esperado=cliente.valor_mensalidade)
     flash(f'Cliente {cliente.nome} foi reativado com sucesso!', 'success')
     return redirect(url_for('listar_clientes', status='inativos'))
 
@@ -600,11 +1322,12 @@ def ativar_cliente(cliente_id):
 @app.route('/relatorio_inadimplentes')
 def relatorio_inadimplentes():
     """Relatório detalhado de inadimplentes"""
-    clientes = Cliente.query.filter_by(ativo=True).all()
+    atraso_por_cliente = atrasos_situacoes()
+    clientes = Cliente.query.filter(Cliente.id.in_(atraso_por_cliente.keys())).order_by(Cliente.id).all()
     inadimplentes = []
-    
+
     for cliente in clientes:
-        meses_atraso, valor_devido = cliente.calcular_meses_atraso()
+        meses_atraso, valor_devido = atraso_por_cliente[cliente.id]
         
         if meses_atraso > 0:
             dias_atraso = (date.today() - date(date.today().year, date.today().month, cliente.dia_vencimento)).days
@@ -627,7 +1350,7 @@ def registrar_pagamento_manual(cliente_id):
     cliente = Cliente.query.get_or_404(cliente_id)
     
     # Pega os dados do formulário
-    valor_pago = float(request.form.get('valor_pago'))
+    valor_pago = dinheiro(request.form.get('valor_pago'))
     data_pagamento = request.form.get('data_pagamento')
     
     if data_pagamento:
@@ -637,6 +1360,16 @@ def registrar_pagamento_manual(cliente_id):
     
     mes_ref = data_pagamento.month
     ano_ref = data_pagamento.year
+
+    aviso_duplicado = f'{cliente.nome} já possui pagamento registrado para {mes_ref:02d}/{ano_ref}.'
+    pagamento_existente = Pagamento.query.filter_by(
+        cliente_id=cliente.id,
+        mes_referencia=mes_ref,
+        ano_referencia=ano_ref
+    ).first()
+    if pagamento_existente:
+        flash(aviso_duplicado, 'warning')
+        return redirect(url_for('relatorio_inadimplentes'))
     
     # Cria o pagamento
     pagamento = Pagamento(
@@ -647,61 +1380,337 @@ def registrar_pagamento_manual(cliente_id):
         ano_referencia=ano_ref
     )
     
+    situacao_antes = iniciar_delta_dashboard(cliente.id)
     db.session.add(pagamento)
-    db.session.commit()
+    try:
+        db.session.commit()
+    except IntegrityError:
+        # Outro envio do mesmo mês passou pela verificação acima ao mesmo tempo
+        db.session.rollback()
+        flash(aviso_duplicado, 'warning')
+        return redirect(url_for('relatorio_inadimplentes'))
+    sincronizar_mensalidades([cliente.id])
+    metrica_pagamentos.inc(origem='manual')
+    hoje = date.today()
+    # O dashboard soma os pagamentos com referência no mês corrente
+    do_mes = (mes_ref, ano_ref) == (hoje.month, hoje.year)
+    publicar_delta_dashboard(cliente, situacao_antes, valor_recebido=valor_pago if do_mes else ZERO)
     
     flash(f'Pagamento registrado para {cliente.nome} com sucesso!', 'success')
     return redirect(url_for('relatorio_inadimplentes'))
 
+# --- Importação de pagamentos em lote ---
+TAMANHO_LOTE_IMPORTACAO = 1000
+
+def ler_linhas_importacao(conteudo, formato):
+    """Converte o conteúdo CSV (com cabeçalho) ou JSON (lista de objetos) em lista de dicts."""
+    if formato == 'json':
+        linhas = json.loads(conteudo)
+        if not isinstance(linhas, list):
+            raise ValueError('O JSON deve ser uma lista de pagamentos.')
+        return linhas
+    amostra = conteudo[:2048]
+    delimitador = ';' if amostra.count(';') > amostra.count(',') else ','
+    return list(csv.DictReader(io.StringIO(conteudo), delimiter=delimitador))
+
+def _validar_linha_importacao(linha):
+    """Normaliza uma linha da importação; levanta ValueError com a mensagem do erro."""
+    if not isinstance(linha, dict):
+        # JSON com itens que não são objetos (ex.: [1, 2])
+        raise ValueError('Linha inválida: esperado um objeto com os campos do pagamento.')
+    try:
+        cliente_id = int(linha.get('cliente_id'))
+    except (TypeError, ValueError):
+        raise ValueError('cliente_id inválido.')
+    try:
+        valor_pago = dinheiro(str(linha.get('valor_pago')))
+    except ValueError:
+        raise ValueError('valor_pago inválido.')
+    if valor_pago < 0:
+        raise ValueError('valor_pago não pode ser negativo.')
+    try:
+        data_pagamento = datetime.strptime(str(linha.get('data_pagamento')).strip(), '%Y-%m-%d').date()
+    except ValueError:
+        raise ValueError('data_pagamento deve estar no formato AAAA-MM-DD.')
+    try:
+        mes_ref = int(linha.get('mes_referencia') or data_pagamento.month)
+        ano_ref = int(linha.get('ano_referencia') or data_pagamento.year)
+    except (TypeError, ValueError):
+        raise ValueError('Mês/ano de referência inválido.')
+    if not 1 <= mes_ref <= 12 or not 2000 <= ano_ref <= 2100:
+        raise ValueError('Mês/ano de referência fora do intervalo.')
+    return {
+        'cliente_id': cliente_id,
+        'valor_pago': valor_pago,
+        'data_pagamento': data_pagamento,
+        'mes_referencia': mes_ref,
+        'ano_referencia': ano_ref,
+        'observacoes': str(linha['observacoes']) if linha.get('observacoes') else None,
+    }
+
+def _em_lotes(itens, tamanho):
+    for inicio in range(0, len(itens), tamanho):
+        yield itens[inicio:inicio + tamanho]
+
+def importar_pagamentos(linhas, tamanho_lote=TAMANHO_LOTE_IMPORTACAO):
+    """Valida e insere pagamentos em lote.
+
+    Rejeita clientes inexistentes, referências inválidas e meses já pagos (no
+    banco ou repetidos no próprio arquivo). As linhas válidas são inseridas com
+    INSERT em lote (executemany), um commit por lote. Retorna o relatório por linha.
+    """
+    resultado = []
+    validas = []
+    for numero, linha in enumerate(linhas, start=1):
+        try:
+            validas.append((numero, _validar_linha_importacao(linha)))
+        except ValueError as e:
+            resultado.append({'linha': numero, 'status': 'erro', 'mensagem': str(e)})
+
+    # Clientes e meses já pagos, carregados em poucas consultas
+    cliente_ids = sorted({dados['cliente_id'] for _, dados in validas})
+    clientes_existentes = set()
+    meses_pagos = set()
+    for ids in _em_lotes(cliente_ids, tamanho_lote):
+        clientes_existentes.update(
+            cliente_id for (cliente_id,) in db.session.query(Cliente.id).filter(Cliente.id.in_(ids))
+        )
+        meses_pagos.update(
+            tuple(referencia) for referencia in
+            db.session.query(Pagamento.cliente_id, Pagamento.ano_referencia, Pagamento.mes_referencia)
+            .filter(Pagamento.cliente_id.in_(ids))
+        )
+
+    a_inserir = []
+    for numero, dados in validas:
+        referencia = (dados['cliente_id'], dados['ano_referencia'], dados['mes_referencia'])
+        if dados['cliente_id'] not in clientes_existentes:
+            resultado.append({'linha': numero, 'status': 'erro', 'mensagem': 'Cliente não encontrado.'})
+        elif referencia in meses_pagos:
+            resultado.append({
+                'linha': numero, 'status': 'erro',
+                'mensagem': f"Pagamento de {dados['mes_referencia']:02d}/{dados['ano_referencia']} já registrado."
+            })
+        else:
+            meses_pagos.add(referencia)
+            a_inserir.append((numero, dados))
+
+    for lote in _em_lotes(a_inserir, tamanho_lote):
+        try:
+            db.session.execute(insert(Pagamento), [dados for _, dados in lote])
+            db.session.commit()
+            resultado.extend({'linha': numero, 'status': 'ok', 'mensagem': ''} for numero, _ in lote)
+        except IntegrityError:
+            # Algum mês foi pago por outra requisição no meio da importação: insere um a um
+            db.session.rollback()
+            for numero, dados in lote:
+                try:
+                    db.session.execute(insert(Pagamento), [dados])
+                    db.session.commit()
+                    resultado.append({'linha': numero, 'status': 'ok', 'mensagem': ''})
+                except IntegrityError:
+                    db.session.rollback()
+                    resultado.append({'linha': numero, 'status': 'erro', 'mensagem': 'Pagamento já registrado.'})
+
+    # Em lotes: cada chamada filtra por IN (cliente_ids), limitado pelo número de parâmetros do banco
+    for ids in _em_lotes(sorted({dados['cliente_id'] for _, dados in a_inserir}), tamanho_lote):
+        sincronizar_mensalidades(ids)
+    resultado.sort(key=lambda item: item['linha'])
+    importados = sum(1 for item in resultado if item['status'] == 'ok')
+    if importados:
+        metrica_pagamentos.inc(importados, origem='importacao')
+    return {
+        'importados': importados,
+        'rejeitados': sum(1 for item in resultado if item['status'] == 'erro'),
+        'linhas': resultado,
+    }
+
+@app.route('/importar_pagamentos', methods=['GET', 'POST'])
+@admin_required
+def importar_pagamentos_view():
+    """Importa pagamentos de um arquivo CSV/JSON enviado pelo formulário ou de um corpo JSON.
+
+    Clientes JSON precisam enviar o token CSRF no cabeçalho X-CSRFToken (o CSRFProtect vale para todas as rotas).
+    """
+    if request.method == 'GET':
+        return render_template('importar_pagamentos.html', relatorio=None, current_user=get_current_user())
+
+    try:
+        if request.is_json:
+            linhas = request.get_json()
+            if not isinstance(linhas, list):
+                raise ValueError('O JSON deve ser uma lista de pagamentos.')
+        else:
+            arquivo = request.files.get('arquivo')
+            if not arquivo or not arquivo.filename:
+                flash('Selecione um arquivo CSV ou JSON.', 'error')
+                return redirect(url_for('importar_pagamentos_view'))
+            formato = 'json' if arquivo.filename.lower().endswith('.json') else 'csv'
+            linhas = ler_linhas_importacao(arquivo.read().decode('utf-8-sig'), formato)
+    except (ValueError, UnicodeDecodeError) as e:
+        if request.is_json:
+            return jsonify({'erro': str(e)}), 400
+        flash(f'Arquivo inválido: {e}', 'error')
+        return redirect(url_for('importar_pagamentos_view'))
+
+    relatorio = importar_pagamentos(linhas)
+    if request.is_json:
+        return jsonify(relatorio)
+    flash(f"{relatorio['importados']} pagamentos importados, {relatorio['rejeitados']} rejeitados.",
+          'success' if not relatorio['rejeitados'] else 'warning')
+    return render_template('importar_pagamentos.html', relatorio=relatorio, current_user=get_current_user())
+
+@app.cli.command('importar-pagamentos')
+@click.argument('arquivo', type=click.Path(exists=True, dir_okay=False))
+def importar_pagamentos_command(arquivo):
+    """Importa pagamentos de um arquivo CSV ou JSON."""
+    formato = 'json' if arquivo.lower().endswith('.json') else 'csv'
+    with open(arquivo, encoding='utf-8-sig') as f:
+        linhas = ler_linhas_importacao(f.read(), formato)
+    relatorio = importar_pagamentos(linhas)
+    for item in relatorio['linhas']:
+        if item['status'] == 'erro':
+            print(f"  linha {item['linha']}: {item['mensagem']}")
+    print(f"✅ {relatorio['importados']} pagamentos importados, {relatorio['rejeitados']} rejeitados.")
+
+# --- Exportação (CSV em streaming) ---
+# CSV com ';', vírgula decimal e BOM UTF-8, que o Excel em pt-BR abre direto
+LINHAS_POR_LOTE_EXPORTACAO = 1000
+TAMANHO_BUFFER_EXPORTACAO = 64 * 1024
+
+def _formatar_valor(valor):
+    return f"{valor:.2f}".replace('.', ',') if valor is not None else ''
+
+def _csv_em_streaming(cabecalho, linhas):
+    """Gera o CSV em blocos; o cabeçalho sai antes de qualquer consulta ao banco."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, delimiter=';')
+    writer.writerow(cabecalho)
+    yield '\ufeff' + buffer.getvalue()
+    buffer.seek(0)
+    buffer.truncate()
+    for linha in linhas:
+        writer.writerow(linha)
+        if buffer.tell() >= TAMANHO_BUFFER_EXPORTACAO:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+def _resposta_csv(nome_arquivo, cabecalho, linhas):
+    return Response(
+        stream_with_context(_csv_em_streaming(cabecalho, linhas)),
+        mimetype='text/csv',
+        headers={'Content-Disposition': f'attachment; filename="{nome_arquivo}"'}
+    )
+
+def _linhas_em_lotes(consulta):
+    """Executa a consulta lendo do banco em blocos (cursor no servidor no MySQL)."""
+    return db.session.execute(consulta.execution_options(yield_per=LINHAS_POR_LOTE_EXPORTACAO))
+
+@app.route('/exportar/clientes.csv')
+@admin_required
+def exportar_clientes():
+    def linhas():
+        consulta = select(
+            Cliente.id, Cliente.nome, Cliente.telefone, Cliente.data_matricula,
+            Cliente.valor_mensalidade, Cliente.dia_vencimento, Cliente.ativo
+        ).order_by(Cliente.id)
+        for cliente_id, nome, telefone, data_matricula, valor, dia, ativo in _linhas_em_lotes(consulta):
+            yield (cliente_id, nome, telefone, data_matricula.isoformat(), _formatar_valor(valor), dia,
+                   'Sim' if ativo else 'Não')
+
+    return _resposta_csv(
+        f'clientes_{date.today().isoformat()}.csv',
+        ['ID', 'Nome', 'Telefone', 'Data de Matrícula', 'Mensalidade', 'Dia de Vencimento', 'Ativo'],
+        linhas()
+    )
+
+@app.route('/exportar/pagamentos.csv')
+@admin_required
+def exportar_pagamentos():
+    def linhas():
+        consulta = select(
+            Pagamento.id, Pagamento.cliente_id, Cliente.nome, Pagamento.data_pagamento,
+            Pagamento.valor_pago, Pagamento.mes_referencia, Pagamento.ano_referencia, Pagamento.observacoes
+        ).join(Cliente, Cliente.id == Pagamento.cliente_id).order_by(Pagamento.id)
+        for pagamento_id, cliente_id, nome, data_pagamento, valor, mes, ano, observacoes in _linhas_em_lotes(consulta):
+            yield (pagamento_id, cliente_id, nome, data_pagamento.isoformat(), _formatar_valor(valor),
+                   f'{mes:02d}/{ano}', observacoes or '')
+
+    return _resposta_csv(
+        f'pagamentos_{date.today().isoformat()}.csv',
+        ['ID', 'ID Cliente', 'Cliente', 'Data do Pagamento', 'Valor Pago', 'Referência', 'Observações'],
+        linhas()
+    )
+
+@app.route('/exportar/inadimplentes.csv')
+@admin_required
+def exportar_inadimplentes():
+    def linhas():
+        atraso_por_cliente = atrasos_situacoes()
+        consulta = select(
+            Cliente.id, Cliente.nome, Cliente.telefone, Cliente.dia_vencimento
+        ).where(Cliente.id.in_(atraso_por_cliente.keys())).order_by(Cliente.id)
+        for cliente_id, nome, telefone, dia in _linhas_em_lotes(consulta):
+            meses_atraso, valor_devido = atraso_por_cliente[cliente_id]
+            yield (cliente_id, nome, telefone, dia, meses_atraso, _formatar_valor(valor_devido))
+
+    return _resposta_csv(
+        f'inadimplentes_{date.today().isoformat()}.csv',
+        ['ID', 'Nome', 'Telefone', 'Dia de Vencimento', 'Meses em Atraso', 'Valor Devido'],
+        linhas()
+    )
+
 @app.route('/atualizar_cliente/<int:cliente_id>', methods=['POST'])
 @login_required
 def atualizar_cliente(cliente_id):
     cliente = Cliente.query.get_or_404(cliente_id)
     cliente.nome = request.form.get('nome')
     cliente.telefone = request.form.get('telefone')
-    cliente.valor_mensalidade = float(request.form.get('valor_mensalidade'))
+    cliente.valor_mensalidade = dinheiro(request.form.get('valor_mensalidade'))
     cliente.dia_vencimento = int(request.form.get('dia_vencimento'))
+    atualizar_mensalidades_abertas(cliente)
     db.session.commit()
+    atualizar_situacoes([cliente.id])
     flash(f'Cliente {cliente.nome} atualizado com sucesso!', 'success')
     return redirect(url_for('listar_clientes'))
 
-@app.route('/')
-@login_required
-def dashboard():
-    usuario_atual = get_current_user()
-
-    # Se for colaborador, redireciona para página de clientes
-    if not usuario_atual.is_admin():
-        return redirect(url_for('listar_clientes'))
-
-    hoje = date.today()
-    meses_pt = {1: 'Janeiro', 2: 'Fevereiro', 3: 'Março', 4: 'Abril', 5: 'Maio', 6: 'Junho',
-                7: 'Julho', 8: 'Agosto', 9: 'Setembro', 10: 'Outubro', 11: 'Novembro', 12: 'Dezembro'}
-    nome_mes = meses_pt.get(hoje.month, 'Mês Desconhecido')
+def _dados_cliente(cliente):
+    """Campos do cliente usados nas telas, em formato serializável para o cache."""
+    return {
+        'id': cliente.id,
+        'nome': cliente.nome,
+        'telefone': cliente.telefone,
+        'valor_mensalidade': cliente.valor_mensalidade,
+        'dia_vencimento': cliente.dia_vencimento,
+    }
 
-    # Lista apenas clientes ativos para mostrar no dashboard
-    clientes = Cliente.query.filter_by(ativo=True).all()
-    total_clientes = len(clientes)
-    clientes_pagos = []
+def calcular_dados_dashboard(hoje):
+    """Calcula stats e listas de pagos/atrasados do dashboard."""
+    # Lida antes dos agregados: uma escrita concorrente deixa a versão para trás, nunca à frente
+    versao = versao_dados().versao
+
+    # Totais dos clientes ativos calculados no banco
+    total_clientes, valor_total_esperado = db.session.query(
+        func.count(Cliente.id),
+        func.sum(Cliente.valor_mensalidade)
+    ).filter(Cliente.ativo == True).one()
+    valor_total_esperado = valor_total_esperado or 0
+
+    # Listas por status a partir das mensalidades materializadas
+    clientes_pagos = Cliente.query.filter(filtro_status_sql("Em dia")).order_by(Cliente.id).all()
+    atrasados = Cliente.query.filter(filtro_status_sql("Em atraso")).order_by(Cliente.id).all()
+    atraso_por_cliente = atrasos_situacoes(cliente.id for cliente in atrasados)
     clientes_atrasados = []
-    valor_total_esperado = 0
-
-    for cliente in clientes:
-        valor_total_esperado += cliente.valor_mensalidade
-
-        # Calcula status usando a função centralizada
-        status = calcular_status_cliente(cliente)
-
-        if status == "Em dia":
-            clientes_pagos.append(cliente)
-        elif status == "Em atraso":
-            meses_atraso, valor_devido = cliente.calcular_meses_atraso()
-            clientes_atrasados.append({
-                'cliente': cliente,
-                'meses_atraso': meses_atraso,
-                'valor_devido': valor_devido
-            })
-        # "Aguardando" não entra nem em pagos nem em atrasados
+    for cliente in atrasados:
+        meses_atraso, valor_devido = atraso_por_cliente.get(cliente.id, (0, 0))
+        clientes_atrasados.append({
+            'cliente': _dados_cliente(cliente),
+            'meses_atraso': meses_atraso,
+            'valor_devido': valor_devido
+        })
 
     # Calcula o valor recebido considerando todos os pagamentos do mês (clientes ativos ou não)
     valor_recebido = db.session.query(func.sum(Pagamento.valor_pago)).filter(
@@ -719,54 +1728,321 @@ def dashboard():
         'percentual_pagos': round((len(clientes_pagos) / total_clientes * 100) if total_clientes > 0 else 0, 1)
     }
 
+    return {
+        'stats': stats,
+        'clientes_pagos': [_dados_cliente(cliente) for cliente in clientes_pagos],
+        'clientes_atrasados': clientes_atrasados,
+        'versao': versao,
+    }
+
+def chave_dashboard(*partes):
+    """Chave de cache dos agregados ('dashboard:<versão dos dados>:...').
+
+    VersaoDados é incrementada na mesma transação de cada escrita, em qualquer
+    worker: as entradas calculadas antes dela deixam de ser encontradas por todos
+    os processos, mesmo com o cache em memória. O delete_prefix após o commit só
+    libera a memória mais cedo no worker que escreveu.
+    """
+    return ':'.join(['dashboard', str(versao_dados().versao), *map(str, partes)])
+
+def dados_dashboard(hoje):
+    """Agregados do dashboard em cache; invalidados a cada escrita em clientes/pagamentos."""
+    return cache.get_or_set(chave_dashboard(hoje.isoformat()), lambda: calcular_dados_dashboard(hoje))
+
+@app.route('/')
+@login_required
+def dashboard():
+    usuario_atual = get_current_user()
+
+    # Se for colaborador, redireciona para página de clientes
+    if not usuario_atual.is_admin():
+        return redirect(url_for('listar_clientes'))
+
+    hoje = date.today()
+    meses_pt = {1: 'Janeiro', 2: 'Fevereiro', 3: 'Março', 4: 'Abril', 5: 'Maio', 6: 'Junho',
+                7: 'Julho', 8: 'Agosto', 9: 'Setembro', 10: 'Outubro', 11: 'Novembro', 12: 'Dezembro'}
+    nome_mes = meses_pt.get(hoje.month, 'Mês Desconhecido')
+
+    dados = dados_dashboard(hoje)
+    stats = dados['stats']
+    clientes_pagos = dados['clientes_pagos']
+    clientes_atrasados = dados['clientes_atrasados']
+
     return render_template('dashboard.html',
                            current_user=usuario_atual,
                            stats=stats,
                            hoje=hoje,
                            nome_mes=nome_mes,
                            clientes_atrasados=clientes_atrasados,
-                           clientes_pagos=clientes_pagos)
+                           clientes_pagos=clientes_pagos,
+                           versao=dados['versao'])
+
+# --- Dashboard ao vivo (Server-Sent Events) ---
+# As rotas que mudam os indicadores publicam só a variação ('delta'): o navegador soma aos
+# números da tela, sem recalcular nada no servidor. Outras escritas (importação, edição,
+# recálculo diário) publicam 'estado' e cada stream reenvia os totais do cache.
+CANAL_DASHBOARD = 'dashboard'
+SSE_PING_SEGUNDOS = 15
+SSE_RETRY_MS = 3000
+SSE_RETRY_OCUPADO_MS = 10000
+
+vagas_sse = threading.BoundedSemaphore(app.config['SSE_MAX_CONEXOES'])
+
+def publicar_evento_dashboard(evento):
+    # Chamado depois do commit: uma falha ao publicar não pode desfazer a resposta da escrita
+    try:
+        barramento.publicar(CANAL_DASHBOARD, evento)
+    except Exception:
+        app.logger.exception('Falha ao publicar evento do dashboard')
 
+def avisar_dashboards():
+    """Escrita sem delta próprio: os dashboards abertos buscam os totais de novo.
 
+    Chamado no after_commit. Numa requisição, o aviso sai uma vez só, ao fim dela e fora do
+    commit; fora de requisições (CLI, agendador), na hora, pela conexão própria do barramento.
+    """
+    if has_request_context():
+        g._avisar_dashboards = True
+        return
+    publicar_evento_dashboard({'tipo': 'estado'})
+
+@app.teardown_request
+def _avisar_dashboards_ao_fim(erro):
+    # Requisições que publicam delta (iniciar_delta_dashboard) já avisaram os dashboards
+    if g.pop('_avisar_dashboards', False) and not g.get('_delta_dashboard'):
+        publicar_evento_dashboard({'tipo': 'estado'})
+
+def situacao_dashboard(cliente_id):
+    """Status do cliente como contado no dashboard ('Em dia', 'Em atraso'...); None se inativo."""
+    return (
+        db.session.query(SituacaoCliente.status)
+        .join(Cliente, Cliente.id == SituacaoCliente.cliente_id)
+        .filter(Cliente.id == cliente_id, Cliente.ativo == True)
+        .scalar()
+    )
 
-from flask import render_template, request
+def iniciar_delta_dashboard(cliente_id=None):
+    """Situação do cliente antes da escrita (None para cliente novo). A requisição passa a publicar um delta em vez de 'estado'."""
+    g._delta_dashboard = True
+    return situacao_dashboard(cliente_id) if cliente_id is not None else None
+
+def publicar_delta_dashboard(cliente, situacao_antes, total_clientes=0, valor_esperado=ZERO, valor_recebido=ZERO):
+    """Publica a variação dos indicadores causada pela escrita no cliente, já gravada."""
+    situacao_depois = situacao_dashboard(cliente.id)
+    pagos = (situacao_depois == 'Em dia') - (situacao_antes == 'Em dia')
+    atrasados = (situacao_depois == 'Em atraso') - (situacao_antes == 'Em atraso')
+    if not (pagos or atrasados or total_clientes or valor_esperado or valor_recebido):
+        return
+    evento = {
+        'tipo': 'delta',
+        'versao': versao_dados().versao,
+        'dia': date.today().isoformat(),
+        'total_clientes': total_clientes,
+        'clientes_pagos': pagos,
+        'clientes_atrasados': atrasados,
+        'valor_esperado': str(valor_esperado),
+        'valor_recebido': str(valor_recebido),
+    }
+    if pagos > 0:
+        evento['cliente_pago'] = {'id': cliente.id, 'nome': cliente.nome}
+    publicar_evento_dashboard(evento)
 
-@app.route('/todos_clientes')
-@login_required
-def listar_clientes():
-    search_query = request.args.get('q', '').strip()
-    status_filter = request.args.get('status', 'todos')  # 'todos', 'Em dia', 'Aguardando', 'Em atraso', 'inativos'
+def _evento_sse(tipo, dados, id_evento):
+    return f'event: {tipo}\nid: {id_evento}\ndata: {app.json.dumps(dados)}\n\n'
 
+def _estado_dashboard_sse():
+    """(versao, evento 'estado' com os totais atuais do cache)"""
     hoje = date.today()
-    clientes_query = Cliente.query
+    dados = dados_dashboard(hoje)
+    estado = {'versao': dados['versao'], 'dia': hoje.isoformat(), 'stats': dados['stats']}
+    # Devolve a conexão ao pool: o stream fica parado esperando eventos
+    db.session.close()
+    return dados['versao'], _evento_sse('estado', estado, dados['versao'])
+
+@app.route('/dashboard/eventos')
+@admin_required
+def dashboard_eventos():
+    """Stream SSE com as variações dos indicadores do dashboard."""
+    # Reconexões trazem Last-Event-ID (versão dos dados já exibida); a primeira, ?versao= da página
+    versao_cliente = request.headers.get('Last-Event-ID') or request.args.get('versao', '')
+    duracao = app.config['SSE_DURACAO']
+
+    def gerar():
+        # Vaga e assinatura só dentro do gerador: se ele nem começar, não há o que liberar
+        if not vagas_sse.acquire(blocking=False):
+            # Sem vaga neste worker: os totais atuais (se mudaram) e nova tentativa depois de `retry`,
+            # talvez em outro worker. Até conseguir vaga, o dashboard se atualiza a cada tentativa.
+            yield f'retry: {SSE_RETRY_OCUPADO_MS}\n\n'
+            versao, estado = _estado_dashboard_sse()
+            if str(versao) != versao_cliente:
+                yield estado
+            return
+        try:
+            with barramento.assinar(CANAL_DASHBOARD) as assinatura:
+                yield f'retry: {SSE_RETRY_MS}\n\n'
+                versao, estado = _estado_dashboard_sse()
+                if str(versao) != versao_cliente:
+                    yield estado
+                fim = time.monotonic() + duracao
+                while (restante := fim - time.monotonic()) > 0:
+                    evento = assinatura.proximo(timeout=min(SSE_PING_SEGUNDOS, restante))
+                    if evento is None:
+                        # Comentário SSE: mantém proxies abertos e revela conexões fechadas
+                        yield ': ping\n\n'
+                    elif evento is PERDIDOS or evento['tipo'] == 'estado':
+                        # Vários avisos já enfileirados viram um único envio dos totais
+                        while assinatura.proximo(timeout=0) is not None:
+                            pass
+                        yield _estado_dashboard_sse()[1]
+                    else:
+                        yield _evento_sse(evento['tipo'], evento, evento['versao'])
+        finally:
+            vagas_sse.release()
+
+    resposta = Response(stream_with_context(gerar()), mimetype='text/event-stream')
+    resposta.headers['Cache-Control'] = 'no-cache'
+    resposta.headers['X-Accel-Buffering'] = 'no'  # nginx: não segurar os eventos em buffer
+    return resposta
+
+
+
+@app.route('/cache_stats')
+@admin_required
+def cache_stats():
+    """Contadores de acertos/falhas do cache (para acompanhar a efetividade)."""
+    return jsonify(cache.stats())
+
+
+@app.route('/desempenho')
+@admin_required
+def desempenho():
+    """Percentis de tempo e consultas por endpoint nas últimas requisições de cada um"""
+    return render_template('desempenho.html',
+                           current_user=get_current_user(),
+                           endpoints=instrumentacao.estatisticas.resumo(),
+                           janela=instrumentacao.estatisticas.janela,
+                           limite_ms=instrumentacao.limite_ms,
+                           perfis_ativos=bool(instrumentacao.profile_dir),
+                           cache_stats=cache.stats())
+
+
+def _contagem_clientes_metricas():
+    """Clientes ativos e em atraso (em cache junto com o dashboard; invalidado nas escritas)"""
+    def calcular():
+        ativos = db.session.query(func.count(Cliente.id)).filter(Cliente.ativo == True).scalar()
+        em_atraso = db.session.query(func.count(Cliente.id)).filter(filtro_status_sql("Em atraso")).scalar()
+        return {'ativos': ativos, 'em_atraso': em_atraso}
+    return cache.get_or_set(chave_dashboard('metricas', date.today().isoformat()), calcular)
+
+def _conexoes_pool():
+    pool = db.engine.pool
+    em_uso = pool.checkedout() if hasattr(pool, 'checkedout') else 0
+    # overflow() começa em -pool_size e cresce a cada conexão aberta; só o excedente é overflow
+    excedentes = max(0, pool.overflow()) if hasattr(pool, 'overflow') else 0
+    return {('em_uso',): em_uso, ('overflow',): excedentes}
+
+metricas.medidor('academia_db_pool_conexoes', 'Conexões do pool do SQLAlchemy (em uso e overflow)',
+                 _conexoes_pool, rotulos=('estado',))
+metricas.medidor('academia_clientes_ativos', 'Clientes ativos',
+                 lambda: _contagem_clientes_metricas()['ativos'])
+metricas.medidor('academia_clientes_em_atraso', 'Clientes ativos com mensalidade em atraso',
+                 lambda: _contagem_clientes_metricas()['em_atraso'])
+
+ENDERECOS_LOCAIS = ('127.0.0.1', '::1')
+
+@app.route('/metrics')
+def metrics():
+    """Métricas no formato texto do Prometheus (por processo/worker)"""
+    token = app.config.get('METRICS_TOKEN')
+    if token:
+        if not secrets.compare_digest(request.headers.get('Authorization', ''), f'Bearer {token}'):
+            abort(401)
+    elif request.remote_addr not in ENDERECOS_LOCAIS:
+        abort(403)
+    return Response(metricas.exportar(), mimetype=None, content_type=RegistroMetricas.CONTENT_TYPE)
+
+
+@app.route('/relatorio_financeiro')
+@admin_required
+def relatorio_financeiro():
+    """MRR, taxa de cobrança, faixas de atraso, churn e retenção por coorte"""
+    # Importado aqui para que pandas só seja carregado quando o relatório for usado
+    from analytics import carregar_dados, relatorio_financeiro as calcular_relatorio
+
+    meses = request.args.get('meses', 12, type=int)
+    meses = min(max(meses, 1), 36)
+    hoje = date.today()
+
+    def calcular():
+        with db.engine.connect() as conn:
+            clientes, pagamentos = carregar_dados(conn)
+        return calcular_relatorio(clientes, pagamentos, meses=meses, hoje=hoje)
+
+    relatorio = cache.get_or_set(chave_dashboard('financeiro', hoje.isoformat(), meses), calcular)
+    coortes = [
+        {
+            'coorte': coorte,
+            'clientes': int(linha['clientes']),
+            'retencao': [None if valor != valor else valor for valor in linha.drop('clientes')],
+        }
+        for coorte, linha in relatorio['coortes'].iterrows()
+    ]
+    return render_template('relatorio_financeiro.html',
+                           current_user=get_current_user(),
+                           receita=relatorio['receita'].to_dict('records'),
+                           atraso=relatorio['atraso'].to_dict('records'),
+                           churn=relatorio['churn'].to_dict('records'),
+                           coortes=coortes,
+                           meses=meses)
 
+
+from flask import render_template, request
+
+def consulta_clientes(search_query='', status_filter='todos'):
+    """Clientes filtrados por status e busca por nome, ordenados por nome (lista HTML e API)."""
     # Seleciona clientes conforme status_filter
     if status_filter == 'inativos':
-        clientes = clientes_query.filter_by(ativo=False).all()
+        clientes_query = Cliente.query.filter(Cliente.ativo == False)
     else:
-        clientes = clientes_query.filter_by(ativo=True).all()
+        clientes_query = Cliente.query.filter(Cliente.ativo == True)
+        # Filtro de status aplicado no banco, antes da paginação
+        filtro_status = filtro_status_sql(status_filter)
+        if filtro_status is not None:
+            clientes_query = clientes_query.filter(filtro_status)
 
-    clientes_info = []
-    for cliente in clientes:
-        # Filtro de busca por nome
-        if search_query and search_query.lower() not in cliente.nome.lower():
-            continue
+    # Filtro de busca por nome
+    if search_query:
+        clientes_query = clientes_query.filter(Cliente.nome.icontains(search_query, autoescape=True))
 
-        # Último pagamento do cliente
-        ultimo_pagamento = Pagamento.query.filter_by(
-            cliente_id=cliente.id
-        ).order_by(Pagamento.data_pagamento.desc()).first()
+    return clientes_query.order_by(Cliente.nome, Cliente.id)
 
-        # Status calculado usando a função centralizada
-        status = calcular_status_cliente(cliente)
+@app.route('/todos_clientes')
+@login_required
+def listar_clientes():
+    search_query = request.args.get('q', '').strip()
+    status_filter = request.args.get('status', 'todos')  # 'todos', 'Em dia', 'Aguardando', 'Em atraso', 'inativos'
+    page = request.args.get('page', 1, type=int)
+    per_page = request.args.get('per_page', CLIENTES_POR_PAGINA, type=int)
+
+    pagination = consulta_clientes(search_query, status_filter).paginate(
+        page=page,
+        per_page=per_page,
+        max_per_page=MAX_CLIENTES_POR_PAGINA,
+        error_out=False
+    )
+    clientes = pagination.items
 
-        # Aplica filtro pelo status (exceto "todos" ou "inativos")
-        if status_filter not in ['todos', 'inativos'] and status != status_filter:
-            continue
+    # Status e último pagamento calculados em lote apenas para a página atual
+    cliente_ids = [cliente.id for cliente in clientes]
+    status_clientes = calcular_status_clientes(cliente_ids)
+    ultimo_pagamento_por_cliente = ultimos_pagamentos(cliente_ids)
 
+    clientes_info = []
+    for cliente in clientes:
+        status = status_clientes[cliente.id]
         clientes_info.append({
             'cliente': cliente,
-            'ultimo_pagamento': ultimo_pagamento,
+            'ultimo_pagamento': ultimo_pagamento_por_cliente.get(cliente.id),
             'status': status,
             'pagou_mes_atual': status == "Em dia"
         })
@@ -774,6 +2050,7 @@ def listar_clientes():
     return render_template(
         'listar_clientes.html',
         clientes_info=clientes_info,
+        pagination=pagination,
         search_query=search_query,
         status_filter=status_filter,
         current_user=get_current_user()
@@ -782,6 +2059,200 @@ def listar_clientes():
 
 
 
+# --- API JSON (v1) ---
+# Para os tablets da recepção, que consultam as mesmas telas o dia todo. Toda resposta traz
+# ETag derivado de VersaoDados (e da data, pois o status muda na virada do dia): com
+# If-None-Match atual a resposta é 304, sem calcular nada além da versão.
+# `campos=id,nome,status` limita os campos devolvidos. Valores monetários vão como string ("100.00").
+
+class ErroApi(Exception):
+    def __init__(self, mensagem, status=400):
+        super().__init__(mensagem)
+        self.mensagem = mensagem
+        self.status = status
+
+@app.errorhandler(ErroApi)
+def erro_api(erro):
+    return jsonify({'erro': erro.mensagem}), erro.status
+
+def _usuario_api():
+    if 'user_id' not in session or 'session_token' not in session:
+        return None
+    usuario = usuario_sessao_valido()
+    return usuario if usuario and usuario.ativo else None
+
+def api_login_required(f):
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        if not _usuario_api():
+            raise ErroApi('Não autenticado.', 401)
+        return f(*args, **kwargs)
+    return decorated_function
+
+def api_admin_required(f):
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        usuario = _usuario_api()
+        if not usuario:
+            raise ErroApi('Não autenticado.', 401)
+        if not usuario.is_admin():
+            raise ErroApi('Acesso restrito a administradores.', 403)
+        return f(*args, **kwargs)
+    return decorated_function
+
+def versao_dados():
+    """(versao, atualizado_em) atuais; cria o registro único na primeira leitura."""
+    linha = db.session.query(VersaoDados.versao, VersaoDados.atualizado_em).filter(VersaoDados.id == 1).first()
+    if linha is None:
+        db.session.add(VersaoDados(id=1, versao=0, atualizado_em=datetime.utcnow()))
+        try:
+            db.session.commit()
+        except IntegrityError:
+            db.session.rollback()  # outro worker criou ao mesmo tempo
+        linha = db.session.query(VersaoDados.versao, VersaoDados.atualizado_em).filter(VersaoDados.id == 1).one()
+    return linha
+
+def campos_pedidos(permitidos):
+    """Campos de `?campos=` validados contra `permitidos` (todos, se ausente)."""
+    parametro = request.args.get('campos')
+    if not parametro:
+        return list(permitidos)
+    campos = [campo.strip() for campo in parametro.split(',') if campo.strip()]
+    invalidos = [campo for campo in campos if campo not in permitidos]
+    if invalidos:
+        raise ErroApi(f"Campos inválidos: {', '.join(invalidos)}. Disponíveis: {', '.join(permitidos)}.")
+    return campos
+
+def resposta_condicional(gerar):
+    """JSON de `gerar()` com ETag; 304 sem chamar `gerar` se o cliente já tem a versão atual.
+
+    Sem Last-Modified: com resolução de um segundo, uma escrita no mesmo segundo da leitura
+    anterior ainda responderia 304 a um If-Modified-Since. O ETag muda a cada escrita.
+    """
+    versao = versao_dados().versao
+    # A data entra no ETag: o status dos clientes muda na virada do dia
+    etag = hashlib.sha1(f'{versao}|{date.today().isoformat()}|{request.full_path}'.encode()).hexdigest()[:24]
+
+    if is_resource_modified(request.environ, etag=etag):
+        resposta = jsonify(gerar())
+    else:
+        resposta = Response(status=304)
+    resposta.set_etag(etag, weak=True)
+    resposta.headers['Cache-Control'] = 'private, no-cache'
+    resposta.vary.add('Cookie')
+    return resposta
+
+def _data_iso(valor):
+    return valor.isoformat() if valor else None
+
+CAMPOS_API_CLIENTE = ('id', 'nome', 'telefone', 'valor_mensalidade', 'dia_vencimento', 'data_matricula',
+                      'ativo', 'status', 'ultimo_pagamento')
+CAMPOS_API_PAGAMENTO = ('id', 'data_pagamento', 'valor_pago', 'mes_referencia', 'ano_referencia', 'observacoes')
+CAMPOS_API_DASHBOARD = ('stats', 'clientes_pagos', 'clientes_atrasados')
+
+def _clientes_api(clientes, campos):
+    """Serializa os clientes; status e último pagamento só são consultados se pedidos."""
+    ids = [cliente.id for cliente in clientes]
+    status = calcular_status_clientes(ids) if 'status' in campos else {}
+    ultimos = ultimos_pagamentos(ids) if 'ultimo_pagamento' in campos else {}
+    itens = []
+    for cliente in clientes:
+        dados = {
+            'id': cliente.id,
+            'nome': cliente.nome,
+            'telefone': cliente.telefone,
+            'valor_mensalidade': cliente.valor_mensalidade,
+            'dia_vencimento': cliente.dia_vencimento,
+            'data_matricula': _data_iso(cliente.data_matricula),
+            'ativo': bool(cliente.ativo),
+            'status': status.get(cliente.id, 'Inativo' if not cliente.ativo else 'Aguardando'),
+            'ultimo_pagamento': _data_iso(ultimos[cliente.id].data_pagamento) if cliente.id in ultimos else None,
+        }
+        itens.append({campo: dados[campo] for campo in campos})
+    return itens
+
+@app.route('/api/v1/clientes')
+@api_login_required
+def api_clientes():
+    """Lista de clientes (mesmos filtros de /todos_clientes: q, status, pagina, por_pagina)."""
+    campos = campos_pedidos(CAMPOS_API_CLIENTE)
+    pagina = request.args.get('pagina', 1, type=int)
+    por_pagina = request.args.get('por_pagina', CLIENTES_POR_PAGINA, type=int)
+
+    def gerar():
+        paginacao = consulta_clientes(
+            request.args.get('q', '').strip(), request.args.get('status', 'todos')
+        ).paginate(page=pagina, per_page=por_pagina, max_per_page=MAX_CLIENTES_POR_PAGINA, error_out=False)
+        return {
+            'clientes': _clientes_api(paginacao.items, campos),
+            'pagina': paginacao.page,
+            'por_pagina': paginacao.per_page,
+            'total': paginacao.total,
+            'paginas': paginacao.pages,
+        }
+    return resposta_condicional(gerar)
+
+@app.route('/api/v1/clientes/<int:cliente_id>')
+@api_login_required
+def api_cliente(cliente_id):
+    """Um cliente com status, meses em atraso e valor devido."""
+    campos = campos_pedidos(CAMPOS_API_CLIENTE + ('meses_atraso', 'valor_devido'))
+
+    def gerar():
+        cliente = db.session.get(Cliente, cliente_id)
+        if cliente is None:
+            raise ErroApi('Cliente não encontrado.', 404)
+        dados = _clientes_api([cliente], [c for c in campos if c in CAMPOS_API_CLIENTE])[0]
+        if 'meses_atraso' in campos or 'valor_devido' in campos:
+            meses_atraso, valor_devido = cliente.calcular_meses_atraso()
+            dados['meses_atraso'] = meses_atraso
+            dados['valor_devido'] = dinheiro(valor_devido)
+        return {campo: dados[campo] for campo in campos}
+    return resposta_condicional(gerar)
+
+@app.route('/api/v1/clientes/<int:cliente_id>/pagamentos')
+@api_login_required
+def api_pagamentos_cliente(cliente_id):
+    """Histórico de pagamentos do cliente, do mais recente ao mais antigo (cursores `apos`/`antes`)."""
+    campos = campos_pedidos(CAMPOS_API_PAGAMENTO)
+    por_pagina = min(max(request.args.get('por_pagina', PAGAMENTOS_POR_PAGINA, type=int), 1), MAX_CLIENTES_POR_PAGINA)
+
+    def gerar():
+        cliente = db.session.get(Cliente, cliente_id)
+        if cliente is None:
+            raise ErroApi('Cliente não encontrado.', 404)
+        pagamentos, cursor_anterior, cursor_proximo = pagina_pagamentos(
+            cliente,
+            apos=_ler_cursor_pagamento(request.args.get('apos')),
+            antes=_ler_cursor_pagamento(request.args.get('antes')),
+            por_pagina=por_pagina,
+        )
+        itens = []
+        for pagamento in pagamentos:
+            dados = {
+                'id': pagamento.id,
+                'data_pagamento': _data_iso(pagamento.data_pagamento),
+                'valor_pago': pagamento.valor_pago,
+                'mes_referencia': pagamento.mes_referencia,
+                'ano_referencia': pagamento.ano_referencia,
+                'observacoes': pagamento.observacoes,
+            }
+            itens.append({campo: dados[campo] for campo in campos})
+        return {'pagamentos': itens, 'cursor_anterior': cursor_anterior, 'cursor_proximo': cursor_proximo}
+    return resposta_condicional(gerar)
+
+@app.route('/api/v1/dashboard')
+@api_admin_required
+def api_dashboard():
+    """Indicadores do dashboard e listas de clientes pagos/em atraso do mês."""
+    campos = campos_pedidos(CAMPOS_API_DASHBOARD)
+
+    def gerar():
+        dados = dados_dashboard(date.today())
+        return {campo: dados[campo] for campo in campos}
+    return resposta_condicional(gerar)
+
+
 # --- Utilitários de inicialização ---
 def criar_usuario_admin_inicial():
     """Cria o primeiro usuário administrador se não existir nenhum, com senha forte gerada."""
@@ -806,11 +2277,108 @@ def criar_usuario_admin_inicial():
         print("   Senha temporária (alterar no primeiro login):", admin_password)
         print("   ⚠️  IMPORTANTE: Altere a senha após o primeiro login!")
 
+def preencher_telefones_normalizados(tamanho_lote=500):
+    """Preenche telefone_normalizado dos clientes cadastrados antes da coluna existir."""
+    total = 0
+    while True:
+        lote = (
+            Cliente.query
+            .filter(Cliente.telefone_normalizado.is_(None))
+            .order_by(Cliente.id)
+            .limit(tamanho_lote)
+            .all()
+        )
+        if not lote:
+            break
+        for cliente in lote:
+            cliente.telefone_normalizado = normalizar_telefone(cliente.telefone)
+        db.session.commit()
+        total += len(lote)
+    return total
+
+def inicializar_banco():
+    """Cria as tabelas que faltam e o administrador inicial (se não houver usuários)."""
+    db.create_all()
+    criar_usuario_admin_inicial()
+    versao_dados()
+
+@app.cli.command('inicializar-banco')
+def inicializar_banco_command():
+    """Cria as tabelas e o administrador inicial; rodar antes de subir o servidor."""
+    inicializar_banco()
+    print("✅ Banco inicializado.")
+
+@app.cli.command('normalizar-telefones')
+def normalizar_telefones_command():
+    """Preenche a coluna telefone_normalizado dos clientes existentes."""
+    total = preencher_telefones_normalizados()
+    print(f"✅ {total} telefones normalizados.")
+
+@app.cli.command('gerar-mensalidades')
+def gerar_mensalidades_command():
+    """Gera as mensalidades do mês corrente (para rodar via cron na virada do mês)."""
+    total = sincronizar_mensalidades()
+    print(f"✅ {total} mensalidades geradas.")
+
+@app.cli.command('atualizar-situacoes')
+def atualizar_situacoes_command():
+    """Recalcula status e atraso de todos os clientes (para rodar via cron logo após a meia-noite)."""
+    total = recalcular_situacoes()
+    print(f"✅ Situações dos clientes atualizadas ({total} mensalidades geradas).")
+
+@app.cli.command('inicializar-dados')
+def inicializar_dados_command():
+    """Gera clientes e pagamentos de exemplo (só em banco sem clientes; requer o Faker)."""
+    inicializar_dados()
+
+def _segundos_ate_proxima_execucao(agora, minuto_do_dia):
+    proxima = agora.replace(hour=minuto_do_dia // 60, minute=minuto_do_dia % 60, second=0, microsecond=0)
+    if proxima <= agora:
+        proxima += timedelta(days=1)
+    return (proxima - agora).total_seconds()
+
+def iniciar_agendador_situacoes(minuto_do_dia=5):
+    """Thread que recalcula as situações todo dia, `minuto_do_dia` minutos após a meia-noite.
+
+    Alternativa ao cron; habilitada com AGENDADOR_SITUACOES=1. Cada worker tem a
+    sua thread, mas só o que reservar o dia em ExecucaoAgendada faz o recálculo.
+    """
+    def executar():
+        while not _parar_agendador.wait(_segundos_ate_proxima_execucao(datetime.now(), minuto_do_dia)):
+            with app.app_context():
+                try:
+                    if reservar_execucao('situacoes', date.today()):
+                        recalcular_situacoes()
+                except Exception:
+                    app.logger.exception('Falha ao recalcular as situações dos clientes')
+                finally:
+                    db.session.remove()
+
+    thread = threading.Thread(target=executar, name='agendador-situacoes', daemon=True)
+    thread.start()
+    return thread
+
+_parar_agendador = threading.Event()
+
+def reservar_execucao(tarefa, dia):
+    """True se este processo reservou a execução de `tarefa` em `dia`; False se outro já o fez."""
+    db.session.add(ExecucaoAgendada(tarefa=tarefa, dia=dia))
+    try:
+        db.session.commit()
+    except IntegrityError:
+        db.session.rollback()  # outro worker reservou primeiro
+        return False
+    return True
+
 def inicializar_dados():
     """Gera dados de exemplo"""
     if Cliente.query.count() > 0:
         return
 
+    # Faker só é necessário aqui; importá-lo no topo custava ~50 ms em todo boot
+    from faker import Faker
+    fake = Faker('pt_BR')
+
     print("⏳ Gerando clientes de exemplo...")
     clientes = []
     hoje = date.today()
@@ -820,7 +2388,7 @@ def inicializar_dados():
         telefone = f"({random.randint(11, 99)}) 9{random.randint(1000, 9999)}-{random.randint(1000, 9999)}"
         valor_mensalidade = round(random.uniform(70.0, 150.0), 2)
         dia_vencimento = random.randint(1, 28)
-        data_matricula = hoje - relativedelta(months=random.randint(1, 12))
+        data_matricula = somar_meses(hoje, -random.randint(1, 12))
         cliente = Cliente(
             nome=nome,
             telefone=telefone,
@@ -854,7 +2422,7 @@ def inicializar_dados():
         telefone="(81) 99999-1000",
         valor_mensalidade=95.0,
         dia_vencimento=aguardando_vencimento,
-        data_matricula=hoje - relativedelta(months=3)
+        data_matricula=somar_meses(hoje, -3)
     )
     db.session.add(aguardando_1)
 
@@ -863,29 +2431,51 @@ def inicializar_dados():
         telefone="(81) 99999-2000",
         valor_mensalidade=105.0,
         dia_vencimento=aguardando_vencimento + 2,
-        data_matricula=hoje - relativedelta(months=1)
+        data_matricula=somar_meses(hoje, -1)
     )
     db.session.add(aguardando_2)
 
     db.session.commit()
+    sincronizar_mensalidades()
     print("✅ Dados de exemplo gerados!")
 
 # --- Inicialização do app ---
 
-if __name__ == '__main__':
-    print("📦 Iniciando app.py via Docker CMD...")
-    with app.app_context():
-        db.create_all()
-        criar_usuario_admin_inicial()
-        
+# Opções cujo backend 'memory' só enxerga o próprio processo
+BACKENDS_COMPARTILHADOS = ('RATE_LIMIT_BACKEND', 'EVENTOS_BACKEND')
 
+def avisar_backends_por_processo():
+    """Avisa no log quando um backend 'memory' roda com vários workers (GUNICORN_WORKERS_ATIVOS, ver gunicorn.conf.py)."""
+    workers = int(os.getenv('GUNICORN_WORKERS_ATIVOS', '1'))
+    if workers <= 1:
+        return
+    for opcao in BACKENDS_COMPARTILHADOS:
+        if app.config.get(opcao) == 'memory':
+            app.logger.warning(
+                "%s=memory com %d workers: cada worker só enxerga o próprio processo. Use %s=database.",
+                opcao, workers, opcao
+            )
+
+def create_app():
+    """Prepara o processo do servidor WSGI e retorna o `app` do módulo (ver wsgi.py).
+
+    Não é uma fábrica: configuração, rotas, backends e ouvintes da sessão são
+    montados uma única vez, na importação deste módulo, e chamar de novo
+    devolve o mesmo objeto. Aqui fica só o que é do processo servidor (o
+    agendador e os avisos de configuração); tabelas e administrador inicial
+    vêm do comando `flask --app app inicializar-banco`.
+    """
+    if os.getenv('AGENDADOR_SITUACOES', '0') == '1':
+        iniciar_agendador_situacoes(int(os.getenv('AGENDADOR_SITUACOES_MINUTO', '5')))
+    avisar_backends_por_processo()
+    return app
+
+if __name__ == '__main__':
+    # Servidor de desenvolvimento (um processo). Em produção: gunicorn -c gunicorn.conf.py wsgi:app
     print("🚀 Sistema da Academia iniciado!")
     print("📱 Acesse: http://localhost:5000")
-    
-    # Para Docker, precisa bind em todas as interfaces
-    print("🚀 Flask prestes a iniciar...")
     app.run(
         host='0.0.0.0',  # Importante para Docker
-        port=5000,
+        port=int(os.getenv('PORT', '5000')),
         debug=(os.getenv('FLASK_DEBUG', '0') == '1')
     )
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+# bench_analytics.py - Mede o relatório financeiro vetorizado em uma base grande
+#
+# Uso: python benchmarks/bench_analytics.py [--clientes 50000] [--pagamentos 1000000]
+#
+# Gera clientes e pagamentos sintéticos diretamente em DataFrames, mede o tempo
+# de cada indicador de analytics.py e confere as faixas de atraso contra o
+# cálculo por cliente de app.calcular_atraso em uma amostra.
+
+import argparse
+import os
+import sys
+import time
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BASE_DIR)
+
+os.environ.setdefault('DATABASE_URI', 'sqlite://')
+
+import analytics
+from app import calcular_atraso
+
+
+def gerar_dados(total_clientes, total_pagamentos, meses=60, seed=42):
+    """Clientes com até `meses` meses de matrícula e pagamentos em meses distintos"""
+    rng = np.random.default_rng(seed)
+    hoje = date.today()
+    mes_atual = hoje.year * 12 + hoje.month - 1
+
+    mes_matricula = mes_atual - rng.integers(0, meses, total_clientes)
+    ativo = rng.random(total_clientes) > 0.15
+    mes_desativacao = np.minimum(mes_matricula + rng.integers(0, meses, total_clientes), mes_atual)
+
+    def para_datas(indices, dias):
+        return pd.to_datetime({'year': indices // 12, 'month': indices % 12 + 1, 'day': dias})
+
+    clientes = pd.DataFrame({
+        'id': np.arange(1, total_clientes + 1),
+        'data_matricula': para_datas(mes_matricula, rng.integers(1, 29, total_clientes)),
+        'valor_mensalidade': rng.choice([80.0, 100.0, 120.0, 150.0], total_clientes),
+        'dia_vencimento': rng.integers(1, 29, total_clientes),
+        'ativo': ativo,
+    })
+    clientes['data_desativacao'] = para_datas(mes_desativacao, 1)
+    clientes.loc[ativo, 'data_desativacao'] = pd.NaT
+
+    # Todos os pares (cliente, mês) desde a matrícula; cada um é pago com a probabilidade
+    # necessária para chegar perto de `total_pagamentos`
+    meses_cliente = mes_atual - mes_matricula + 1
+    cliente = np.repeat(np.arange(total_clientes), meses_cliente)
+    primeiro_par = np.repeat(np.cumsum(meses_cliente) - meses_cliente, meses_cliente)
+    mes_ref = mes_matricula[cliente] + np.arange(len(cliente)) - primeiro_par
+    pago = rng.random(len(cliente)) < min(1.0, total_pagamentos / len(cliente))
+    pagamentos = pd.DataFrame({'cliente_id': cliente[pago] + 1, 'mes_ref': mes_ref[pago]})
+    pagamentos['data_pagamento'] = para_datas(
+        pagamentos['mes_ref'].to_numpy(), rng.integers(1, 29, len(pagamentos))
+    )
+    pagamentos['valor_pago'] = clientes['valor_mensalidade'].to_numpy()[pagamentos['cliente_id'].to_numpy() - 1]
+    pagamentos['mes_referencia'] = pagamentos['mes_ref'] % 12 + 1
+    pagamentos['ano_referencia'] = pagamentos['mes_ref'] // 12
+    return clientes, pagamentos.drop(columns='mes_ref')
+
+
+def medir(nome, funcao, *args, **kwargs):
+    inicio = time.perf_counter()
+    resultado = funcao(*args, **kwargs)
+    print(f'- {nome}: {(time.perf_counter() - inicio) * 1000:.1f} ms')
+    return resultado
+
+
+def conferir_atraso(clientes, pagamentos, amostra, hoje):
+    """Compara o cálculo vetorizado com calcular_atraso (por cliente) em uma amostra"""
+    ids = clientes.loc[clientes['ativo'], 'id'].sample(min(amostra, int(clientes['ativo'].sum())), random_state=1)
+    sub_clientes = clientes[clientes['id'].isin(ids)]
+    sub_pagamentos = pagamentos[pagamentos['cliente_id'].isin(ids)]
+
+    esperado = {rotulo: [0, 0.0] for _, _, rotulo in analytics.FAIXAS_ATRASO}
+    inicio = time.perf_counter()
+    for cliente in sub_clientes.itertuples():
+        do_cliente = sub_pagamentos[sub_pagamentos['cliente_id'] == cliente.id]
+        referencia = do_cliente['data_pagamento'].max() if len(do_cliente) else cliente.data_matricula
+        meses_pagos = set(zip(do_cliente['ano_referencia'], do_cliente['mes_referencia']))
+        meses, valor = calcular_atraso(referencia.date(), cliente.dia_vencimento, cliente.valor_mensalidade, meses_pagos, hoje)
+        for minimo, maximo, rotulo in analytics.FAIXAS_ATRASO:
+            if minimo <= meses <= maximo:
+                esperado[rotulo][0] += 1
+                esperado[rotulo][1] += valor
+    por_cliente_ms = (time.perf_counter() - inicio) * 1000 / len(sub_clientes)
+
+    obtido = analytics.faixas_atraso(sub_clientes, sub_pagamentos, hoje)
+    iguais = all(
+        esperado[linha.faixa][0] == linha.clientes and abs(esperado[linha.faixa][1] - linha.valor_devido) < 0.01
+        for linha in obtido.itertuples()
+    )
+    print(f'- conferência com calcular_atraso ({len(sub_clientes)} clientes): {"OK" if iguais else "DIVERGENTE"}'
+          f' ({por_cliente_ms:.3f} ms/cliente no cálculo por cliente)')
+    return iguais
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Mede os indicadores financeiros vetorizados')
+    parser.add_argument('--clientes', type=int, default=50000)
+    parser.add_argument('--pagamentos', type=int, default=1000000)
+    parser.add_argument('--meses', type=int, default=12, help='meses exibidos no relatório')
+    parser.add_argument('--amostra', type=int, default=500, help='clientes conferidos contra calcular_atraso')
+    args = parser.parse_args()
+
+    hoje = date.today()
+    inicio = time.perf_counter()
+    clientes, pagamentos = gerar_dados(args.clientes, args.pagamentos)
+    print(f'Dados: {len(clientes)} clientes, {len(pagamentos)} pagamentos '
+          f'(gerados em {time.perf_counter() - inicio:.1f} s)')
+
+    clientes, pagamentos = medir('preparar_dados', analytics.preparar_dados, clientes, pagamentos)
+    medir('receita_mensal', analytics.receita_mensal, clientes, pagamentos, args.meses, hoje)
+    medir('faixas_atraso', analytics.faixas_atraso, clientes, pagamentos, hoje)
+    medir('churn_mensal', analytics.churn_mensal, clientes, args.meses, hoje)
+    medir('retencao_coortes', analytics.retencao_coortes, clientes, args.meses, hoje)
+    medir('relatorio_financeiro (total)', analytics.relatorio_financeiro, clientes, pagamentos, args.meses, hoje)
+
+    if not conferir_atraso(clientes, pagamentos, args.amostra, hoje):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
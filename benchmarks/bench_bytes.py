@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+# bench_bytes.py - Bytes transferidos por visualização de página (HTML + CSS/fontes), com e sem compressão
+#
+# Uso: python benchmarks/bench_bytes.py [--clientes 200]
+#
+# Simula um navegador com o test client do Flask, logado como administrador
+# (/login é pedida sem sessão). Para cada página, conta cabeçalhos + corpo de:
+#   - primeira visita: o HTML e os recursos locais que ele carrega (<link>,
+#     <script>, <img> e as url() dos CSS; das fontes, só as .woff2, que é o que um
+#     navegador atual baixa, e só as do estilo de ícone usado na página)
+#   - visita repetida: o HTML de novo; recursos com Cache-Control immutable não
+#     são pedidos, os demais são revalidados com If-None-Match
+# Recursos de outros domínios (CDN) aparecem na lista, mas não entram na soma.
+
+import argparse
+import os
+import posixpath
+import re
+import sys
+import tempfile
+from urllib.parse import urlsplit
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BASE_DIR)
+
+if not os.getenv('DATABASE_URI'):
+    os.environ['DATABASE_URI'] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench_bytes.db')}"
+
+from app import app, db, Usuario
+from dados_sinteticos import gerar_base
+
+# (rota, logado)
+PAGINAS = [('/login', False), ('/', True), ('/todos_clientes', True), ('/relatorio_inadimplentes', True)]
+
+MODOS = {'sem compressão': 'identity', 'com compressão': 'gzip, deflate, br'}
+
+_RECURSO_HTML = re.compile(r'<(?:link|script|img)\b[^>]*?\b(?:href|src)="([^"]+)"')
+_URL_CSS = re.compile(r'''url\(\s*['"]?([^'")?#]+)''')
+
+# O navegador só baixa a fonte de um @font-face quando algum texto a usa
+FONTES_POR_CLASSE = {'fa-solid-900': 'fas', 'fa-regular-400': 'far', 'fa-brands-400': 'fab'}
+
+
+def cliente_logado():
+    """Test client com a sessão de um administrador de benchmark"""
+    usuario = Usuario.query.filter_by(username='bench').first()
+    if usuario is None:
+        usuario = Usuario(username='bench', nome_completo='Benchmark', email='bench@academia.com',
+                          tipo_permissao='admin')
+        usuario.set_password('Bench@12345')
+        db.session.add(usuario)
+    usuario.session_token = 'bench'
+    db.session.commit()
+
+    cliente = app.test_client()
+    with cliente.session_transaction() as sessao:
+        sessao['user_id'] = usuario.id
+        sessao['session_token'] = 'bench'
+    return cliente
+
+
+def bytes_resposta(resposta):
+    """Linha de status + cabeçalhos + corpo, como trafegaria em HTTP/1.1"""
+    cabecalhos = sum(len(f'{nome}: {valor}\r\n') for nome, valor in resposta.headers.items())
+    return len(f'HTTP/1.1 {resposta.status}\r\n') + cabecalhos + 2 + len(resposta.get_data())
+
+
+def recursos(html):
+    """(locais, externos) referenciados pelo HTML"""
+    locais, externos = [], []
+    for url in _RECURSO_HTML.findall(html):
+        partes = urlsplit(url)
+        if partes.netloc:
+            externos.append(url)
+        elif partes.path.startswith('/') and not url.startswith('data:'):
+            locais.append(partes.path)
+    return locais, externos
+
+
+def fonte_usada(url, html):
+    nome = posixpath.basename(url).rsplit('.', 1)[0]
+    classe = FONTES_POR_CLASSE.get(nome)
+    return classe is None or re.search(rf'class="[^"]*\b{classe}\b', html) is not None
+
+
+def visitar(cliente, pagina, aceita, cache_navegador):
+    """Bytes de uma visita; `cache_navegador` ({url: etag ou None se immutable}) é atualizado."""
+    total_html = total_recursos = 0
+    resposta = cliente.get(pagina, headers={'Accept-Encoding': aceita})
+    if resposta.status_code != 200:
+        raise RuntimeError(f'{pagina} respondeu {resposta.status_code}')
+    total_html += bytes_resposta(resposta)
+    # O test client não descomprime: o HTML é pedido de novo sem compressão só para achar os recursos
+    html = cliente.get(pagina, headers={'Accept-Encoding': 'identity'}).get_data(as_text=True)
+    locais, externos = recursos(html)
+
+    pendentes = list(locais)
+    vistos = set()
+    while pendentes:
+        url = pendentes.pop(0)
+        if url in vistos:
+            continue
+        vistos.add(url)
+        if url in cache_navegador and cache_navegador[url] is None:
+            continue  # immutable: nem é pedido
+        cabecalhos = {'Accept-Encoding': aceita}
+        if cache_navegador.get(url):
+            cabecalhos['If-None-Match'] = cache_navegador[url]
+        resposta = cliente.get(url, headers=cabecalhos)
+        total_recursos += bytes_resposta(resposta)
+        if resposta.status_code == 200:
+            imutavel = 'immutable' in resposta.headers.get('Cache-Control', '')
+            cache_navegador[url] = None if imutavel else resposta.headers.get('ETag', '')
+        if url.endswith('.css'):
+            css = cliente.get(url, headers={'Accept-Encoding': 'identity'}).get_data(as_text=True)
+            for relativa in _URL_CSS.findall(css):
+                if relativa.endswith('.woff2') and '://' not in relativa and fonte_usada(relativa, html):
+                    pendentes.append(posixpath.normpath(posixpath.join(posixpath.dirname(url), relativa)))
+    return total_html, total_recursos, externos
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Bytes transferidos por visualização de página')
+    parser.add_argument('--clientes', type=int, default=200, help='clientes na base sintética')
+    args = parser.parse_args()
+
+    with app.app_context():
+        db.create_all()
+        gerar_base(args.clientes, meses=12)
+        clientes = {True: cliente_logado(), False: app.test_client()}
+
+        externos_vistos = set()
+        print(f"{'página':26s} {'modo':15s} {'1ª: HTML':>10s} {'recursos':>10s} {'total':>10s} {'repetida':>10s}")
+        for pagina, logado in PAGINAS:
+            for modo, aceita in MODOS.items():
+                cache_navegador = {}
+                html, recursos_bytes, externos = visitar(clientes[logado], pagina, aceita, cache_navegador)
+                html_rep, recursos_rep, _ = visitar(clientes[logado], pagina, aceita, cache_navegador)
+                externos_vistos.update(externos)
+                print(f'{pagina:26s} {modo:15s} {html:10,d} {recursos_bytes:10,d} {html + recursos_bytes:10,d} '
+                      f'{html_rep + recursos_rep:10,d}')
+
+        if externos_vistos:
+            print('\nRecursos externos (não somados):')
+            for url in sorted(externos_vistos):
+                print(f'- {url}')
+
+
+if __name__ == '__main__':
+    main()
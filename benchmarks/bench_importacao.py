@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+# bench_importacao.py - Tempo de importação do app.py (boot do worker), medido com python -X importtime
+#
+# Uso: python benchmarks/bench_importacao.py [--execucoes 10] [--orcamento-ms 650] [--top 10]
+#
+# Importa o app em processos novos (como um worker do gunicorn recém-criado) e
+# mostra a mediana do tempo total de importação, os pacotes mais caros e se
+# dependências que só servem a comandos específicos (Faker, pandas, PyMySQL com
+# SQLite...) foram carregadas. Sai com código 1 se a mediana passar do orçamento
+# ou se alguma dessas dependências for importada.
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Carregadas sob demanda: dados de exemplo, relatório financeiro e driver do MySQL
+NAO_IMPORTAR = ('faker', 'pandas', 'numpy', 'pymysql', 'dateutil')
+
+
+def medir_importacao(modulo, env):
+    """Retorna {modulo: (proprio_us, acumulado_us, profundidade)} de uma importação em processo novo."""
+    processo = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {modulo}'],
+        cwd=BASE_DIR, env=env, capture_output=True, text=True, check=True
+    )
+    tempos = {}
+    for linha in processo.stderr.splitlines():
+        if not linha.startswith('import time:') or 'self [us]' in linha:
+            continue
+        proprio, acumulado, nome = linha[len('import time:'):].split('|')
+        profundidade = (len(nome) - len(nome.lstrip())) // 2
+        tempos[nome.strip()] = (int(proprio), int(acumulado), profundidade)
+    return tempos
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Tempo de importação do app (python -X importtime)')
+    parser.add_argument('--modulo', default='app', help='módulo importado (ex.: app, wsgi)')
+    parser.add_argument('--execucoes', type=int, default=10)
+    parser.add_argument('--orcamento-ms', type=float, default=650, help='mediana máxima aceita, em ms')
+    parser.add_argument('--top', type=int, default=10, help='pacotes de primeiro nível exibidos')
+    args = parser.parse_args()
+
+    env = dict(os.environ)
+    env.setdefault('DATABASE_URI', f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench_importacao.db')}")
+    env.pop('AGENDADOR_SITUACOES', None)
+
+    medir_importacao(args.modulo, env)  # aquecimento: gera os .pyc
+    execucoes = [medir_importacao(args.modulo, env) for _ in range(args.execucoes)]
+    totais = [tempos[args.modulo][1] / 1000 for tempos in execucoes]
+    mediana = statistics.median(totais)
+
+    # Pacotes importados diretamente pelo processo (profundidade 1), pela mediana do acumulado
+    pacotes = {}
+    for tempos in execucoes:
+        for nome, (_, acumulado, profundidade) in tempos.items():
+            if profundidade == 1:
+                pacotes.setdefault(nome, []).append(acumulado / 1000)
+    mais_caros = sorted(((statistics.median(v), nome) for nome, v in pacotes.items()), reverse=True)
+
+    print(f'import {args.modulo}: mediana {mediana:.1f} ms, mín {min(totais):.1f} ms, '
+          f'máx {max(totais):.1f} ms ({args.execucoes} execuções)')
+    print(f'\n{"pacote":32s} {"acumulado":>10s}')
+    for tempo, nome in mais_caros[:args.top]:
+        print(f'{nome:32s} {tempo:8.1f}ms')
+
+    falhas = []
+    importados = sorted({nome.split('.')[0] for nome in execucoes[0]} & set(NAO_IMPORTAR))
+    if importados:
+        falhas.append(f'dependências carregadas na importação: {", ".join(importados)}')
+    if mediana > args.orcamento_ms:
+        falhas.append(f'mediana {mediana:.1f} ms acima do orçamento de {args.orcamento_ms:.0f} ms')
+    if falhas:
+        print('\nFalhou:')
+        for falha in falhas:
+            print(f'- {falha}')
+        sys.exit(1)
+    print(f'\nDentro do orçamento de {args.orcamento_ms:.0f} ms.')
+
+
+if __name__ == '__main__':
+    main()
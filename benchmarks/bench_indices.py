@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+# bench_indices.py - Compara planos de consulta e tempos com e sem os índices
+#
+# Uso: python benchmarks/bench_indices.py [--clientes 5000] [--meses 24]
+#
+# Gera um banco SQLite temporário com dados sintéticos, executa as consultas
+# mais frequentes do sistema sem os índices e depois com eles, mostrando o
+# EXPLAIN QUERY PLAN e o tempo médio de cada consulta.
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import date
+
+from dateutil.relativedelta import relativedelta
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BASE_DIR)
+
+DB_FILE = os.path.join(tempfile.mkdtemp(), 'bench_indices.db')
+os.environ['DATABASE_URI'] = f'sqlite:///{DB_FILE}'
+
+from sqlalchemy import insert, text
+
+from app import app, db, Cliente, Pagamento
+
+INDICES = [indice for model in (Cliente, Pagamento) for indice in model.__table__.indexes]
+
+
+def gerar_dados(total_clientes, meses):
+    """Insere clientes e pagamentos sintéticos em lote"""
+    hoje = date.today()
+    clientes = [
+        {
+            'id': i,
+            'nome': f'Cliente {random.randint(0, 10 ** 6):07d}',
+            'telefone': f'(81) 9{i:08d}',
+            'data_matricula': hoje - relativedelta(months=meses),
+            'valor_mensalidade': 100.0,
+            'dia_vencimento': random.randint(1, 28),
+            'ativo': random.random() > 0.1,
+        }
+        for i in range(1, total_clientes + 1)
+    ]
+    db.session.execute(insert(Cliente), clientes)
+
+    pagamentos = []
+    for cliente in clientes:
+        for n in range(meses):
+            if random.random() < 0.85:
+                referencia = hoje - relativedelta(months=n)
+                pagamentos.append({
+                    'cliente_id': cliente['id'],
+                    'data_pagamento': referencia.replace(day=min(cliente['dia_vencimento'], 28)),
+                    'valor_pago': 100.0,
+                    'mes_referencia': referencia.month,
+                    'ano_referencia': referencia.year,
+                })
+    db.session.execute(insert(Pagamento), pagamentos)
+    db.session.commit()
+    return len(clientes), len(pagamentos)
+
+
+def consultas(cliente_ids):
+    """Consultas quentes do sistema, parametrizadas por cliente"""
+    hoje = date.today()
+    return {
+        'pagamento do mês (status)': (
+            'SELECT id FROM pagamento WHERE cliente_id = :cid AND mes_referencia = :mes AND ano_referencia = :ano LIMIT 1',
+            [{'cid': cid, 'mes': hoje.month, 'ano': hoje.year} for cid in cliente_ids],
+        ),
+        'último pagamento': (
+            'SELECT id, data_pagamento FROM pagamento WHERE cliente_id = :cid ORDER BY data_pagamento DESC LIMIT 1',
+            [{'cid': cid} for cid in cliente_ids],
+        ),
+        'lista de clientes ativos': (
+            'SELECT id, nome FROM cliente WHERE ativo = 1 ORDER BY nome LIMIT 50',
+            [{}] * 20,
+        ),
+    }
+
+
+def medir(titulo, cliente_ids):
+    print(f'\n=== {titulo} ===')
+    with db.engine.connect() as conn:
+        for nome, (sql, parametros) in consultas(cliente_ids).items():
+            plano = conn.execute(text(f'EXPLAIN QUERY PLAN {sql}'), parametros[0]).fetchall()
+            inicio = time.perf_counter()
+            for params in parametros:
+                conn.execute(text(sql), params).fetchall()
+            media_ms = (time.perf_counter() - inicio) / len(parametros) * 1000
+            print(f'- {nome}: {media_ms:.3f} ms/consulta')
+            for linha in plano:
+                print(f'    {linha[-1]}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compara consultas com e sem índices')
+    parser.add_argument('--clientes', type=int, default=5000)
+    parser.add_argument('--meses', type=int, default=24)
+    parser.add_argument('--amostra', type=int, default=200, help='clientes consultados por medição')
+    args = parser.parse_args()
+
+    random.seed(42)
+    with app.app_context():
+        db.create_all()
+        total_clientes, total_pagamentos = gerar_dados(args.clientes, args.meses)
+        print(f'Banco: {DB_FILE} ({total_clientes} clientes, {total_pagamentos} pagamentos)')
+        cliente_ids = random.sample(range(1, total_clientes + 1), min(args.amostra, total_clientes))
+
+        for indice in INDICES:
+            indice.drop(bind=db.engine)
+        medir('Sem índices', cliente_ids)
+
+        for indice in INDICES:
+            indice.create(bind=db.engine)
+        with db.engine.connect() as conn:
+            conn.execute(text('ANALYZE'))
+        medir('Com índices', cliente_ids)
+
+    os.remove(DB_FILE)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+# bench_rotas.py - Latência, consultas por requisição e memória das rotas principais
+#
+# Uso: python benchmarks/bench_rotas.py [--escalas 1000,10000] [--meses 36] [--repeticoes 30]
+#                                       [--saida resultado.json] [--comparar baseline.json]
+#
+# Para cada escala, completa a base sintética (dados_sinteticos.gerar_base) e
+# chama /, /todos_clientes, /relatorio_inadimplentes e /login com o test client
+# do Flask, logado como administrador. Mostra p50/p95/p99, consultas SQL por
+# requisição e o pico de memória (RSS) do processo. Com --comparar, falha
+# (código 1) se o p95 de alguma rota piorar além da tolerância.
+
+import argparse
+import json
+import os
+import resource
+import sys
+import tempfile
+import time
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BASE_DIR)
+
+if not os.getenv('DATABASE_URI'):
+    DB_FILE = os.path.join(tempfile.mkdtemp(), 'bench_rotas.db')
+    os.environ['DATABASE_URI'] = f'sqlite:///{DB_FILE}'
+else:
+    DB_FILE = None
+
+from sqlalchemy import event
+
+from app import app, db, cache, Usuario
+from dados_sinteticos import gerar_base
+
+# (rota, logado): /login é medida sem sessão, pois redireciona quem já está logado
+ROTAS = [('/', True), ('/todos_clientes', True), ('/relatorio_inadimplentes', True), ('/login', False)]
+
+
+def percentil(valores, p):
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(round(p / 100 * (len(ordenados) - 1))))]
+
+
+def pico_rss_mb():
+    # ru_maxrss é em KB no Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def cliente_logado():
+    """Test client com a sessão de um administrador de benchmark"""
+    usuario = Usuario.query.filter_by(username='bench').first()
+    if usuario is None:
+        usuario = Usuario(username='bench', nome_completo='Benchmark', email='bench@academia.com',
+                          tipo_permissao='admin')
+        usuario.set_password('Bench@12345')
+        db.session.add(usuario)
+    usuario.session_token = 'bench'
+    db.session.commit()
+
+    cliente = app.test_client()
+    with cliente.session_transaction() as sessao:
+        sessao['user_id'] = usuario.id
+        sessao['session_token'] = 'bench'
+    return cliente
+
+
+def medir_rota(cliente, rota, repeticoes, usar_cache, contador):
+    tempos, consultas = [], []
+    for _ in range(repeticoes):
+        if not usar_cache:
+            cache.clear()
+        contador[0] = 0
+        inicio = time.perf_counter()
+        resposta = cliente.get(rota)
+        tempos.append((time.perf_counter() - inicio) * 1000)
+        consultas.append(contador[0])
+        if resposta.status_code != 200:
+            raise RuntimeError(f'{rota} respondeu {resposta.status_code}')
+    return {
+        'p50_ms': round(percentil(tempos, 50), 2),
+        'p95_ms': round(percentil(tempos, 95), 2),
+        'p99_ms': round(percentil(tempos, 99), 2),
+        'consultas': max(consultas),
+        'pico_rss_mb': round(pico_rss_mb(), 1),
+    }
+
+
+def comparar(resultados, baseline, tolerancia):
+    """Lista as rotas cujo p95 piorou mais que `tolerancia` em relação à baseline"""
+    regressoes = []
+    for escala, rotas in resultados.items():
+        for rota, atual in rotas.items():
+            anterior = baseline.get(escala, {}).get(rota)
+            if anterior and atual['p95_ms'] > anterior['p95_ms'] * (1 + tolerancia):
+                regressoes.append(f"{escala} clientes {rota}: p95 {anterior['p95_ms']} -> {atual['p95_ms']} ms")
+            if anterior and atual['consultas'] > anterior['consultas']:
+                regressoes.append(f"{escala} clientes {rota}: consultas {anterior['consultas']} -> {atual['consultas']}")
+    return regressoes
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark das rotas principais')
+    parser.add_argument('--escalas', default='1000,10000', help='totais de clientes, ex.: 1000,10000,100000')
+    parser.add_argument('--meses', type=int, default=36, help='meses de histórico de pagamentos')
+    parser.add_argument('--repeticoes', type=int, default=30)
+    parser.add_argument('--cache', action='store_true', help='mantém o cache do dashboard entre requisições')
+    parser.add_argument('--saida', help='grava os resultados em JSON')
+    parser.add_argument('--comparar', help='JSON de uma execução anterior para detectar regressões')
+    parser.add_argument('--tolerancia', type=float, default=0.2, help='piora aceita no p95 (0.2 = 20%%)')
+    args = parser.parse_args()
+
+    contador = [0]
+    resultados = {}
+    with app.app_context():
+        db.create_all()
+        event.listen(db.engine, 'before_cursor_execute', lambda *a: contador.__setitem__(0, contador[0] + 1))
+        clientes = {True: cliente_logado(), False: app.test_client()}
+
+        for escala in [int(e) for e in args.escalas.split(',')]:
+            inicio = time.perf_counter()
+            novos_clientes, novos_pagamentos = gerar_base(escala, meses=args.meses)
+            print(f'\n=== {escala} clientes (+{novos_clientes} clientes, +{novos_pagamentos} pagamentos '
+                  f'em {time.perf_counter() - inicio:.1f} s) ===')
+            print(f"{'rota':28s} {'p50':>9s} {'p95':>9s} {'p99':>9s} {'consultas':>10s} {'pico RSS':>10s}")
+            resultados[str(escala)] = {}
+            for rota, logado in ROTAS:
+                medir_rota(clientes[logado], rota, 2, args.cache, contador)  # aquecimento
+                r = medir_rota(clientes[logado], rota, args.repeticoes, args.cache, contador)
+                resultados[str(escala)][rota] = r
+                print(f"{rota:28s} {r['p50_ms']:7.1f}ms {r['p95_ms']:7.1f}ms {r['p99_ms']:7.1f}ms "
+                      f"{r['consultas']:10d} {r['pico_rss_mb']:8.1f}MB")
+
+    if args.saida:
+        with open(args.saida, 'w') as arquivo:
+            json.dump(resultados, arquivo, indent=2)
+    if DB_FILE:
+        os.remove(DB_FILE)
+
+    if args.comparar:
+        with open(args.comparar) as arquivo:
+            regressoes = comparar(resultados, json.load(arquivo), args.tolerancia)
+        if regressoes:
+            print('\nRegressões:')
+            for linha in regressoes:
+                print(f'- {linha}')
+            sys.exit(1)
+        print('\nSem regressões em relação à baseline.')
+
+
+if __name__ == '__main__':
+    main()
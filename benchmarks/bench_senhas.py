@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+# bench_senhas.py - Logins por segundo para cada método/custo de hash de senha
+#
+# Uso: python benchmarks/bench_senhas.py [--metodos scrypt:32768:8:1,scrypt:16384:8:1,pbkdf2:sha256:600000]
+#                                        [--logins 200] [--concorrencia 8] [--workers 0]
+#
+# Para cada método, grava a senha do usuário de teste com ele e dispara POSTs
+# no /login com o test client do Flask, em várias threads ao mesmo tempo.
+# Mostra logins/s, p50/p95 e o tempo de um hash isolado.
+
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BASE_DIR)
+
+if not os.getenv('DATABASE_URI'):
+    os.environ['DATABASE_URI'] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench_senhas.db')}"
+
+from app import app, db, inicializar_banco, Usuario
+import app as aplicacao
+from senhas import HasherSenhas
+
+USUARIO = 'bench'
+SENHA = 'Bench@12345'
+
+
+def preparar_usuario(metodo):
+    usuario = Usuario.query.filter_by(username=USUARIO).first()
+    if usuario is None:
+        usuario = Usuario(username=USUARIO, nome_completo='Benchmark', email='bench@academia.com',
+                          tipo_permissao='admin')
+        db.session.add(usuario)
+    usuario.senha_hash = aplicacao.hasher_senhas.gerar(SENHA)
+    db.session.commit()
+
+
+def medir(total, concorrencia):
+    def trabalhador(indice):
+        cliente = app.test_client()
+        tempos = []
+        for _ in range(indice, total, concorrencia):
+            inicio = time.perf_counter()
+            resposta = cliente.post('/login', data={'username': USUARIO, 'senha': SENHA})
+            tempos.append(time.perf_counter() - inicio)
+            if resposta.status_code != 302:
+                raise RuntimeError(f'/login respondeu {resposta.status_code}')
+            cliente.get('/logout')
+        return tempos
+
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(concorrencia) as executor:
+        tempos = [t for lista in executor.map(trabalhador, range(concorrencia)) for t in lista]
+    duracao = time.perf_counter() - inicio
+    tempos.sort()
+    return {
+        'logins_s': len(tempos) / duracao,
+        'p50_ms': statistics.median(tempos) * 1000,
+        'p95_ms': tempos[int(len(tempos) * 0.95) - 1] * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Logins por segundo por método de hash de senha')
+    parser.add_argument('--metodos', default='scrypt:32768:8:1,scrypt:16384:8:1,scrypt:8192:8:1,'
+                                             'pbkdf2:sha256:600000,pbkdf2:sha256:100000')
+    parser.add_argument('--logins', type=int, default=200)
+    parser.add_argument('--concorrencia', type=int, default=8)
+    parser.add_argument('--workers', type=int, default=0, help='tamanho do pool de hashes (0 = CPUs)')
+    args = parser.parse_args()
+
+    app.config['WTF_CSRF_ENABLED'] = False
+    with app.app_context():
+        inicializar_banco()
+        print(f'{args.logins} logins, concorrência {args.concorrencia}, {os.cpu_count()} CPUs')
+        print(f"{'método':24s} {'hash':>9s} {'logins/s':>9s} {'p50':>9s} {'p95':>9s}")
+        for metodo in args.metodos.split(','):
+            aplicacao.hasher_senhas = HasherSenhas(metodo, workers=args.workers or None, timeout=60)
+            preparar_usuario(metodo)
+            inicio = time.perf_counter()
+            aplicacao.hasher_senhas.gerar(SENHA)
+            hash_ms = (time.perf_counter() - inicio) * 1000
+            medir(args.concorrencia, args.concorrencia)  # aquecimento
+            r = medir(args.logins, args.concorrencia)
+            print(f"{metodo:24s} {hash_ms:7.1f}ms {r['logins_s']:9.1f} {r['p50_ms']:7.1f}ms {r['p95_ms']:7.1f}ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+# bench_servidor.py - Requisições por segundo: servidor de desenvolvimento x gunicorn
+#
+# Uso: python benchmarks/bench_servidor.py [--requisicoes 2000] [--concorrencia 16]
+#                                          [--servidores dev,gunicorn] [--clientes 500]
+#
+# Cria um banco SQLite temporário (ou usa DATABASE_URI, se definido) com um
+# usuário de teste e clientes sintéticos, sobe cada servidor em um subprocesso,
+# faz login em cada thread e dispara requisições nas páginas mais acessadas.
+
+import argparse
+import http.cookiejar
+import os
+import re
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BASE_DIR)
+
+if not os.getenv('DATABASE_URI'):
+    os.environ['DATABASE_URI'] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench_servidor.db')}"
+
+USUARIO = 'bench'
+SENHA = 'Bench@12345'
+PORTA = 5057
+
+
+def preparar_banco(total_clientes):
+    from app import app, db, inicializar_banco, Usuario
+    from dados_sinteticos import gerar_base
+
+    with app.app_context():
+        inicializar_banco()
+        if not Usuario.query.filter_by(username=USUARIO).first():
+            usuario = Usuario(username=USUARIO, nome_completo='Benchmark', email='bench@academia.com',
+                              tipo_permissao='admin')
+            usuario.set_password(SENHA)
+            db.session.add(usuario)
+            db.session.commit()
+        gerar_base(total_clientes)
+
+
+def comando_servidor(nome):
+    if nome == 'dev':
+        return [sys.executable, 'app.py']
+    if nome == 'gunicorn':
+        return [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', '--access-logfile', '/dev/null', 'wsgi:app']
+    raise ValueError(f'Servidor desconhecido: {nome}')
+
+
+def aguardar_porta(porta, timeout=30):
+    limite = time.monotonic() + timeout
+    while time.monotonic() < limite:
+        try:
+            with socket.create_connection(('127.0.0.1', porta), timeout=1):
+                return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f'Servidor não respondeu na porta {porta}')
+
+
+def sessao_logada(base_url):
+    """Abre uma sessão (cookies) e faz login com o usuário de teste"""
+    opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()))
+    pagina = opener.open(f'{base_url}/login').read().decode()
+    token = re.search(r'name="csrf_token" value="([^"]+)"', pagina).group(1)
+    dados = urllib.parse.urlencode({'csrf_token': token, 'username': USUARIO, 'senha': SENHA}).encode()
+    resposta = opener.open(f'{base_url}/login', dados)
+    resposta.read()
+    if urllib.parse.urlparse(resposta.geturl()).path == '/login':
+        raise RuntimeError('Falha no login do usuário de teste')
+    return opener
+
+
+def disparar(base_url, caminhos, total, concorrencia):
+    sessoes = [sessao_logada(base_url) for _ in range(concorrencia)]
+
+    def trabalhador(indice):
+        opener = sessoes[indice]
+        tempos = []
+        for n in range(indice, total, concorrencia):
+            inicio = time.perf_counter()
+            opener.open(base_url + caminhos[n % len(caminhos)]).read()
+            tempos.append(time.perf_counter() - inicio)
+        return tempos
+
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(concorrencia) as executor:
+        tempos = [t for lista in executor.map(trabalhador, range(concorrencia)) for t in lista]
+    duracao = time.perf_counter() - inicio
+    tempos.sort()
+    return {
+        'rps': len(tempos) / duracao,
+        'p50_ms': statistics.median(tempos) * 1000,
+        'p95_ms': tempos[int(len(tempos) * 0.95) - 1] * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compara o servidor de desenvolvimento com o gunicorn')
+    parser.add_argument('--requisicoes', type=int, default=2000)
+    parser.add_argument('--concorrencia', type=int, default=16)
+    parser.add_argument('--servidores', default='dev,gunicorn')
+    parser.add_argument('--clientes', type=int, default=500)
+    parser.add_argument('--caminhos', default='/,/todos_clientes,/login')
+    args = parser.parse_args()
+
+    preparar_banco(args.clientes)
+    caminhos = args.caminhos.split(',')
+    base_url = f'http://127.0.0.1:{PORTA}'
+    # Sem FLASK_DEBUG o cookie de sessão não é marcado como Secure (o teste é em HTTP)
+    env = dict(os.environ, PORT=str(PORTA))
+    env.pop('FLASK_DEBUG', None)
+
+    resultados = {}
+    for nome in args.servidores.split(','):
+        processo = subprocess.Popen(comando_servidor(nome), cwd=BASE_DIR, env=env,
+                                    stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        try:
+            aguardar_porta(PORTA)
+            disparar(base_url, caminhos, args.concorrencia * 5, args.concorrencia)  # aquecimento
+            resultados[nome] = disparar(base_url, caminhos, args.requisicoes, args.concorrencia)
+        finally:
+            processo.terminate()
+            processo.wait(timeout=30)
+
+    print(f'{args.requisicoes} requisições, concorrência {args.concorrencia}, caminhos {caminhos}')
+    for nome, r in resultados.items():
+        print(f"- {nome:9s} {r['rps']:8.1f} req/s   p50 {r['p50_ms']:7.1f} ms   p95 {r['p95_ms']:7.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
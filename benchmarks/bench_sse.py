@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+# bench_sse.py - Custo dos dashboards abertos via SSE: CPU e consultas parados, latência de entrega
+#
+# Uso: python benchmarks/bench_sse.py [--conexoes 50] [--ocioso 10] [--pagamentos 20] [--backend memory]
+#
+# Abre N streams /dashboard/eventos (test client do Flask, uma thread por
+# conexão, como no gthread do gunicorn), mede CPU do processo e consultas SQL
+# durante o período ocioso e depois registra pagamentos, medindo quanto tempo
+# cada delta leva para chegar a todas as conexões.
+
+import argparse
+import os
+import queue
+import re
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from datetime import date
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BASE_DIR)
+
+if not os.getenv('DATABASE_URI'):
+    os.environ['DATABASE_URI'] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench_sse.db')}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Custo dos dashboards abertos via SSE')
+    parser.add_argument('--conexoes', type=int, default=50)
+    parser.add_argument('--ocioso', type=float, default=10, help='segundos parados medindo CPU e consultas')
+    parser.add_argument('--pagamentos', type=int, default=20)
+    parser.add_argument('--backend', default='memory', help="EVENTOS_BACKEND ('memory' ou 'database')")
+    args = parser.parse_args()
+
+    os.environ['EVENTOS_BACKEND'] = args.backend
+    os.environ['SSE_MAX_CONEXOES'] = str(args.conexoes)
+    from sqlalchemy import event
+    from app import app, db, Cliente, barramento
+    from dados_sinteticos import gerar_base
+    from bench_rotas import cliente_logado
+
+    app.config['WTF_CSRF_ENABLED'] = False
+    with app.app_context():
+        db.create_all()
+        gerar_base(max(args.pagamentos * 2, 200), meses=6)
+        admin = cliente_logado()
+        versao = re.search(r'var versaoBase = (\d+);', admin.get('/').get_data(as_text=True)).group(1)
+        # Clientes sem pagamento no mês corrente, para cada POST gerar um delta
+        hoje = date.today()
+        pagos = {c for c, in db.session.execute(db.text(
+            'SELECT cliente_id FROM pagamento WHERE mes_referencia = :m AND ano_referencia = :a'
+        ), {'m': hoje.month, 'a': hoje.year})}
+        alvos = [c.id for c in Cliente.query.filter(Cliente.ativo == True).order_by(Cliente.id) if c.id not in pagos]
+        alvos = alvos[:args.pagamentos]
+
+    consultas = [0]
+    with app.app_context():
+        event.listen(db.engine, 'before_cursor_execute', lambda *a: consultas.__setitem__(0, consultas[0] + 1))
+
+    chegadas = queue.Queue()
+    cookie = admin.get_cookie('session')
+
+    def conexao():
+        cliente = app.test_client()
+        cliente.set_cookie('session', cookie.value)
+        resposta = cliente.get(f'/dashboard/eventos?versao={versao}', buffered=False)
+        for pedaco in resposta.response:
+            if pedaco.startswith(b'event: delta'):
+                chegadas.put(time.perf_counter())
+        resposta.close()
+
+    for _ in range(args.conexoes):
+        threading.Thread(target=conexao, daemon=True).start()
+    while barramento.assinantes() < args.conexoes:
+        time.sleep(0.05)
+
+    consultas[0] = 0
+    cpu_inicio, inicio = time.process_time(), time.perf_counter()
+    time.sleep(args.ocioso)
+    cpu_ms = (time.process_time() - cpu_inicio) * 1000
+    duracao = time.perf_counter() - inicio
+    print(f'{args.conexoes} dashboards abertos ({args.backend}), {duracao:.0f} s parados: '
+          f'CPU {cpu_ms:.1f} ms ({cpu_ms / duracao / 10:.2f}% de um núcleo), {consultas[0]} consultas')
+
+    latencias = []
+    for cliente_id in alvos:
+        enviado = time.perf_counter()
+        admin.post(f'/registrar_pagamento_manual/{cliente_id}',
+                   data={'valor_pago': '100.00', 'data_pagamento': hoje.isoformat()})
+        recebidos = [chegadas.get(timeout=10) for _ in range(args.conexoes)]
+        latencias.append((max(recebidos) - enviado) * 1000)
+    if latencias:
+        latencias.sort()
+        print(f'{len(latencias)} pagamentos: entrega a todas as conexões (POST incluso) '
+              f'p50 {statistics.median(latencias):.1f} ms, máx {latencias[-1]:.1f} ms')
+    print(barramento.stats())
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+# dados_sinteticos.py - Gerador de base sintética para benchmarks
+#
+# Insere clientes e anos de pagamentos em lote (INSERT com vários registros),
+# em blocos de clientes para manter a memória limitada mesmo com 100k clientes.
+# Importe depois de definir DATABASE_URI e use dentro de app.app_context().
+
+import random
+from datetime import date
+
+from sqlalchemy import func, insert
+
+from app import db, sincronizar_mensalidades, Cliente, Pagamento
+
+VALORES_MENSALIDADE = [80.0, 90.0, 100.0, 120.0, 150.0]
+
+
+def _mes_anterior(ano, mes, n):
+    indice = ano * 12 + mes - 1 - n
+    return indice // 12, indice % 12 + 1
+
+
+def gerar_base(total_clientes, meses=36, taxa_pagamento=0.9, taxa_inativos=0.1,
+               clientes_por_lote=2000, seed=42):
+    """Completa a base até `total_clientes` clientes; retorna (clientes, pagamentos) inseridos.
+
+    Cada cliente tem até `meses` meses de matrícula e paga cada mês com
+    probabilidade `taxa_pagamento`; os meses mais recentes têm mais falhas,
+    para que existam clientes em atraso. Chamadas sucessivas com totais
+    maiores só inserem a diferença (1k -> 10k -> 100k).
+    """
+    rng = random.Random(seed + total_clientes)
+    hoje = date.today()
+    existentes = db.session.query(func.count(Cliente.id)).scalar()
+    proximo_id = (db.session.query(func.max(Cliente.id)).scalar() or 0) + 1
+    inseridos_clientes = inseridos_pagamentos = 0
+
+    for inicio in range(existentes, total_clientes, clientes_por_lote):
+        quantidade = min(clientes_por_lote, total_clientes - inicio)
+        clientes, pagamentos = [], []
+        for cliente_id in range(proximo_id, proximo_id + quantidade):
+            meses_matricula = rng.randint(0, meses - 1)
+            ano, mes = _mes_anterior(hoje.year, hoje.month, meses_matricula)
+            dia_vencimento = rng.randint(1, 28)
+            valor = rng.choice(VALORES_MENSALIDADE)
+            clientes.append({
+                'id': cliente_id,
+                'nome': f'Cliente {cliente_id:06d}',
+                'telefone': f'(81) 9{cliente_id:08d}',
+                'telefone_normalizado': f'819{cliente_id:08d}',
+                'data_matricula': date(ano, mes, rng.randint(1, 28)),
+                'valor_mensalidade': valor,
+                'dia_vencimento': dia_vencimento,
+                'ativo': rng.random() >= taxa_inativos,
+            })
+            for n in range(meses_matricula, -1, -1):
+                # Chance de pagar cai nos 3 meses mais recentes
+                if rng.random() >= (taxa_pagamento if n >= 3 else taxa_pagamento - 0.2):
+                    continue
+                ano_ref, mes_ref = _mes_anterior(hoje.year, hoje.month, n)
+                data_pagamento = date(ano_ref, mes_ref, max(1, min(dia_vencimento + rng.randint(-3, 3), 28)))
+                if data_pagamento > hoje:
+                    continue
+                pagamentos.append({
+                    'cliente_id': cliente_id,
+                    'data_pagamento': data_pagamento,
+                    'valor_pago': valor,
+                    'mes_referencia': mes_ref,
+                    'ano_referencia': ano_ref,
+                })
+        db.session.execute(insert(Cliente), clientes)
+        if pagamentos:
+            db.session.execute(insert(Pagamento), pagamentos)
+        db.session.commit()
+        proximo_id += quantidade
+        inseridos_clientes += len(clientes)
+        inseridos_pagamentos += len(pagamentos)
+
+    if inseridos_clientes:
+        sincronizar_mensalidades()
+    return inseridos_clientes, inseridos_pagamentos
@@ -0,0 +1,181 @@
+# cache.py - Cache com expiração (TTL) para agregados caros do sistema
+#
+# Dois backends com a mesma interface:
+#   - MemoryCache: LRU em memória, por processo (padrão)
+#   - SQLiteCache: arquivo SQLite compartilhado entre os workers da mesma máquina
+# Outros backends (Redis, memcached...) só precisam implementar get/set/delete_prefix/clear.
+
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+class CacheBackend:
+    """Interface comum dos backends, com contadores de acertos e falhas."""
+    nome = 'base'
+
+    def __init__(self, ttl=60):
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._lock_contadores = threading.Lock()
+
+    def get(self, chave):
+        valor = self._get(chave)
+        with self._lock_contadores:
+            if valor is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return valor
+
+    def set(self, chave, valor, ttl=None):
+        self._set(chave, valor, self.ttl if ttl is None else ttl)
+
+    def get_or_set(self, chave, calcular, ttl=None):
+        valor = self.get(chave)
+        if valor is None:
+            valor = calcular()
+            self.set(chave, valor, ttl)
+        return valor
+
+    def stats(self):
+        with self._lock_contadores:
+            hits, misses = self.hits, self.misses
+        total = hits + misses
+        return {
+            'backend': self.nome,
+            'hits': hits,
+            'misses': misses,
+            'hit_rate': round(hits / total, 3) if total else 0.0,
+            'size': self.size(),
+        }
+
+    def _get(self, chave):
+        raise NotImplementedError
+
+    def _set(self, chave, valor, ttl):
+        raise NotImplementedError
+
+    def delete_prefix(self, prefixo):
+        raise NotImplementedError
+
+    def clear(self):
+        raise NotImplementedError
+
+    def size(self):
+        raise NotImplementedError
+
+
+class MemoryCache(CacheBackend):
+    """LRU em memória com TTL por entrada. Thread-safe."""
+    nome = 'memory'
+
+    def __init__(self, ttl=60, max_entries=256):
+        super().__init__(ttl)
+        self.max_entries = max_entries
+        self._dados = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _get(self, chave):
+        with self._lock:
+            item = self._dados.get(chave)
+            if item is None:
+                return None
+            expira, valor = item
+            if expira <= time.monotonic():
+                del self._dados[chave]
+                return None
+            self._dados.move_to_end(chave)
+            return valor
+
+    def _set(self, chave, valor, ttl):
+        with self._lock:
+            self._dados[chave] = (time.monotonic() + ttl, valor)
+            self._dados.move_to_end(chave)
+            while len(self._dados) > self.max_entries:
+                self._dados.popitem(last=False)
+
+    def delete_prefix(self, prefixo):
+        with self._lock:
+            for chave in [c for c in self._dados if c.startswith(prefixo)]:
+                del self._dados[chave]
+
+    def clear(self):
+        with self._lock:
+            self._dados.clear()
+
+    def size(self):
+        return len(self._dados)
+
+
+class SQLiteCache(CacheBackend):
+    """Cache em arquivo SQLite, compartilhado entre processos. Valores serializados com pickle."""
+    nome = 'sqlite'
+
+    # Segundos entre as limpezas das entradas expiradas (por processo); até lá, _get já as ignora
+    INTERVALO_LIMPEZA = 60
+
+    def __init__(self, path, ttl=60):
+        super().__init__(ttl)
+        self.path = path
+        self._local = threading.local()
+        self._ultima_limpeza = 0
+        with self._conexao() as conn:
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS cache ('
+                'chave TEXT PRIMARY KEY, valor BLOB NOT NULL, expira REAL NOT NULL)'
+            )
+
+    def _conexao(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            self._local.conn = conn
+        return conn
+
+    def _get(self, chave):
+        linha = self._conexao().execute(
+            'SELECT valor FROM cache WHERE chave = ? AND expira > ?', (chave, time.time())
+        ).fetchone()
+        return pickle.loads(linha[0]) if linha else None
+
+    def _set(self, chave, valor, ttl):
+        conn = self._conexao()
+        agora = time.time()
+        conn.execute(
+            'INSERT OR REPLACE INTO cache (chave, valor, expira) VALUES (?, ?, ?)',
+            (chave, pickle.dumps(valor, protocol=pickle.HIGHEST_PROTOCOL), agora + ttl)
+        )
+        if agora - self._ultima_limpeza >= self.INTERVALO_LIMPEZA:
+            self._ultima_limpeza = agora
+            conn.execute('DELETE FROM cache WHERE expira <= ?', (agora,))
+
+    def delete_prefix(self, prefixo):
+        self._conexao().execute(
+            'DELETE FROM cache WHERE substr(chave, 1, ?) = ?', (len(prefixo), prefixo)
+        )
+
+    def clear(self):
+        self._conexao().execute('DELETE FROM cache')
+
+    def size(self):
+        return self._conexao().execute(
+            'SELECT COUNT(*) FROM cache WHERE expira > ?', (time.time(),)
+        ).fetchone()[0]
+
+
+def criar_cache(config):
+    """Instancia o backend configurado em CACHE_BACKEND ('memory' ou 'sqlite')."""
+    backend = config.get('CACHE_BACKEND', 'memory')
+    ttl = int(config.get('CACHE_TTL', 60))
+    if backend == 'sqlite':
+        path = config.get('CACHE_PATH') or os.path.join(os.getcwd(), 'cache.sqlite3')
+        return SQLiteCache(path, ttl=ttl)
+    if backend == 'memory':
+        return MemoryCache(ttl=ttl, max_entries=int(config.get('CACHE_MAX_ENTRIES', 256)))
+    raise ValueError(f'CACHE_BACKEND desconhecido: {backend}')
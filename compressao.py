@@ -0,0 +1,81 @@
+# compressao.py - Compressão gzip/brotli das respostas de texto (HTML, JSON, CSS...)
+#
+# As páginas e a API são texto bem repetitivo: comprimidas, trafegam uma fração
+# dos bytes. O hook after_request comprime a resposta quando:
+#   - o cliente aceita 'br' (brotli, se o pacote estiver instalado) ou 'gzip'
+#   - o tipo é de texto (TIPOS_COMPRIMIVEIS) e o corpo passa de COMPRESSAO_MINIMO bytes
+#   - o status é 200 e a resposta não é streaming (CSV, arquivos) nem já codificada
+# Abaixo do mínimo o ganho não compensa o cabeçalho extra e a CPU.
+#
+# Configuração (app.config):
+#   COMPRESSAO              liga/desliga (desligue se o proxy na frente já comprime)
+#   COMPRESSAO_MINIMO       tamanho mínimo do corpo, em bytes (padrão 1024)
+#   COMPRESSAO_NIVEL_GZIP   1-9 (padrão 6)
+#   COMPRESSAO_NIVEL_BROTLI 0-11 (padrão 5; níveis altos são lentos demais por requisição)
+
+import gzip
+
+from flask import request
+
+try:
+    import brotli
+except ImportError:  # opcional: sem ele, só gzip
+    brotli = None
+
+TIPOS_COMPRIMIVEIS = frozenset((
+    'text/html', 'text/css', 'text/plain', 'text/javascript',
+    'application/javascript', 'application/json', 'image/svg+xml',
+))
+
+
+def escolher_codificacao(aceitas):
+    """'br', 'gzip' ou None, conforme o Accept-Encoding (werkzeug.datastructures.Accept)."""
+    if brotli is not None and aceitas['br']:
+        return 'br'
+    if aceitas['gzip']:
+        return 'gzip'
+    return None
+
+
+def comprimir(dados, codificacao, nivel_gzip=6, nivel_brotli=5):
+    if codificacao == 'br':
+        return brotli.compress(dados, quality=nivel_brotli)
+    # mtime=0: mesmo corpo, mesmos bytes (não muda a cada requisição)
+    return gzip.compress(dados, compresslevel=nivel_gzip, mtime=0)
+
+
+class Compressao:
+    """Registra o hook de compressão na aplicação."""
+
+    def __init__(self, app=None):
+        self.minimo = 1024
+        self.nivel_gzip = 6
+        self.nivel_brotli = 5
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.minimo = int(app.config.get('COMPRESSAO_MINIMO', 1024))
+        self.nivel_gzip = int(app.config.get('COMPRESSAO_NIVEL_GZIP', 6))
+        self.nivel_brotli = int(app.config.get('COMPRESSAO_NIVEL_BROTLI', 5))
+        if app.config.get('COMPRESSAO', True):
+            app.after_request(self._comprimir_resposta)
+        app.extensions['compressao'] = self
+
+    def _comprimir_resposta(self, response):
+        if (response.status_code != 200 or response.direct_passthrough or response.is_streamed
+                or 'Content-Encoding' in response.headers or response.mimetype not in TIPOS_COMPRIMIVEIS
+                or response.cache_control.no_transform):
+            return response
+        dados = response.get_data()
+        if len(dados) < self.minimo:
+            return response
+
+        # O corpo depende do Accept-Encoding: caches intermediários devem separar as versões
+        response.vary.add('Accept-Encoding')
+        codificacao = escolher_codificacao(request.accept_encodings)
+        if codificacao is None:
+            return response
+        response.set_data(comprimir(dados, codificacao, self.nivel_gzip, self.nivel_brotli))
+        response.headers['Content-Encoding'] = codificacao
+        return response
@@ -0,0 +1,53 @@
+# dinheiro.py - Valores monetários exatos: Decimal com 2 casas na aplicação, centavos inteiros no banco
+#
+# Float acumula erro de arredondamento (0.1 + 0.2 != 0.3) e os totais somados
+# em Python ou no banco saíam com centavos de diferença. Aqui:
+#   - `dinheiro(valor)` normaliza qualquer entrada (str com vírgula ou ponto, int,
+#     float, Decimal) para Decimal com 2 casas, arredondando meio centavo para cima
+#   - `Centavos` é o tipo de coluna: grava inteiros (centavos) e devolve Decimal;
+#     SUM/COALESCE sobre a coluna também voltam como Decimal, somados exatamente no banco
+
+from decimal import ROUND_HALF_UP, Decimal, InvalidOperation
+
+from sqlalchemy import Integer
+from sqlalchemy.types import TypeDecorator
+
+CENTAVO = Decimal('0.01')
+ZERO = Decimal('0.00')
+
+
+def dinheiro(valor):
+    """Converte `valor` (em reais) para Decimal com 2 casas; ValueError se não for um número."""
+    if isinstance(valor, float):
+        # repr dá o menor decimal que representa o float (99.99 -> '99.99', não 99.9899...)
+        valor = repr(valor)
+    if isinstance(valor, str):
+        valor = valor.strip().replace(',', '.')
+    try:
+        resultado = Decimal(valor).quantize(CENTAVO, rounding=ROUND_HALF_UP)
+    except (InvalidOperation, TypeError):
+        raise ValueError(f'Valor monetário inválido: {valor!r}') from None
+    if not resultado.is_finite():
+        raise ValueError(f'Valor monetário inválido: {valor!r}')
+    return resultado
+
+
+def para_centavos(valor):
+    return int(dinheiro(valor) * 100)
+
+
+def de_centavos(centavos):
+    return (Decimal(int(centavos)) / 100).quantize(CENTAVO)
+
+
+class Centavos(TypeDecorator):
+    """Coluna monetária guardada como inteiro de centavos; lida como Decimal em reais."""
+    impl = Integer
+    cache_ok = True
+
+    def process_bind_param(self, valor, dialect):
+        return None if valor is None else para_centavos(valor)
+
+    def process_result_value(self, valor, dialect):
+        # round(): bancos migrados de FLOAT no SQLite podem devolver 9999.0
+        return None if valor is None else de_centavos(round(valor))
@@ -0,0 +1,157 @@
+# estaticos.py - Arquivos estáticos com impressão digital (hash do conteúdo) e cache permanente
+#
+# Os templates chamam `estatico('css/base.css')`, que devolve
+# /static/v/<hash>/css/base.css, com o hash do conteúdo do arquivo. Como a URL
+# muda sempre que o arquivo muda, o navegador pode guardá-lo "para sempre"
+# (Cache-Control: immutable) e as visitas seguintes só baixam o HTML.
+#
+# Na inicialização, todos os arquivos de static/ são lidos para a memória e as
+# url(...) relativas dos CSS (ex.: fontes do Font Awesome) são reescritas para as
+# URLs com hash dos arquivos apontados. Os arquivos de texto são comprimidos com
+# o nível máximo (gzip e brotli) no primeiro pedido de cada codificação, e não na
+# importação: o brotli 11 é lento e atrasaria o boot de cada worker.
+# Uma URL com hash antigo (HTML em cache de antes do deploy) recebe o conteúdo
+# atual com Cache-Control: no-cache, para não fixar a versão errada no cache.
+#
+# Configuração (app.config):
+#   ESTATICOS_MAX_AGE     segundos de cache das URLs com hash (padrão 1 ano)
+#   ESTATICOS_RECARREGAR  relê static/ quando algum arquivo muda (padrão: ligado com app.debug)
+
+import hashlib
+import mimetypes
+import os
+import posixpath
+import re
+import threading
+
+from flask import Response, abort, request, url_for
+
+from compressao import TIPOS_COMPRIMIVEIS, comprimir, escolher_codificacao
+
+_URL_CSS = re.compile(r'''url\(\s*(['"]?)([^'")]+)\1\s*\)''')
+
+
+class Estaticos:
+    """Serve static/ a partir da memória, com URLs versionadas pelo hash do conteúdo."""
+
+    def __init__(self, app=None):
+        self.diretorio = None
+        self.max_age = 31536000
+        self.recarregar = False
+        self.minimo_compressao = 1024
+        self._arquivos = {}
+        self._assinatura = None
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.diretorio = app.static_folder
+        self.max_age = int(app.config.get('ESTATICOS_MAX_AGE', 31536000))
+        recarregar = app.config.get('ESTATICOS_RECARREGAR')
+        self.recarregar = app.debug if recarregar is None else bool(recarregar)
+        self.minimo_compressao = int(app.config.get('COMPRESSAO_MINIMO', 1024))
+        self._carregar()
+
+        app.add_url_rule(f'{app.static_url_path}/v/<versao>/<path:caminho>',
+                         endpoint='estatico_versionado', view_func=self.servir)
+        app.jinja_env.globals['estatico'] = self.url
+        app.extensions['estaticos'] = self
+
+    def _listar(self):
+        """{caminho relativo com '/': caminho absoluto} dos arquivos de static/"""
+        arquivos = {}
+        for raiz, _, nomes in os.walk(self.diretorio):
+            for nome in nomes:
+                absoluto = os.path.join(raiz, nome)
+                arquivos[os.path.relpath(absoluto, self.diretorio).replace(os.sep, '/')] = absoluto
+        return arquivos
+
+    def _assinatura_atual(self, arquivos):
+        return tuple(sorted((caminho, os.stat(absoluto).st_mtime_ns) for caminho, absoluto in arquivos.items()))
+
+    def _carregar(self):
+        listados = self._listar() if os.path.isdir(self.diretorio or '') else {}
+        conteudos = {}
+        for caminho, absoluto in listados.items():
+            with open(absoluto, 'rb') as arquivo:
+                conteudos[caminho] = arquivo.read()
+
+        # CSS por último: suas url() apontam para os hashes dos demais arquivos
+        carregados = {}
+        for caminho in sorted(conteudos, key=lambda c: (c.endswith('.css'), c)):
+            dados = conteudos[caminho]
+            if caminho.endswith('.css'):
+                dados = self._reescrever_css(caminho, dados, carregados)
+            carregados[caminho] = self._preparar(caminho, dados)
+        self._arquivos = carregados
+        self._assinatura = self._assinatura_atual(listados)
+
+    def _reescrever_css(self, caminho, dados, carregados):
+        pasta = posixpath.dirname(caminho)
+
+        def substituir(encontrado):
+            alvo = encontrado.group(2).strip()
+            if alvo.startswith(('data:', '/', '#')) or '://' in alvo:
+                return encontrado.group(0)
+            # '?#iefix' e '#fontawesome' (fontes antigas) ficam fora do nome do arquivo
+            nome, sufixo = re.match(r'([^?#]*)(.*)', alvo).groups()
+            destino = posixpath.normpath(posixpath.join(pasta, nome))
+            if destino not in carregados:
+                return encontrado.group(0)
+            # Relativa entre as duas URLs com hash: continua valendo se o app estiver sob um prefixo.
+            # O hash do próprio CSS ainda não existe, mas só o número de níveis importa ('_').
+            origem = posixpath.join('v', '_', pasta)
+            relativa = posixpath.relpath(posixpath.join('v', carregados[destino]['hash'], destino), origem)
+            return f'url({relativa}{sufixo})'
+
+        return _URL_CSS.sub(substituir, dados.decode('utf-8')).encode('utf-8')
+
+    def _preparar(self, caminho, dados):
+        tipo = mimetypes.guess_type(caminho)[0] or 'application/octet-stream'
+        return {
+            'hash': hashlib.sha256(dados).hexdigest()[:12],
+            'tipo': tipo,
+            'corpos': {None: dados},
+            'comprimivel': tipo in TIPOS_COMPRIMIVEIS and len(dados) >= self.minimo_compressao,
+        }
+
+    def _corpo(self, arquivo, codificacao):
+        corpos = arquivo['corpos']
+        if codificacao not in corpos:
+            # Corridas só repetem o trabalho: o resultado é o mesmo
+            corpos[codificacao] = comprimir(corpos[None], codificacao, nivel_gzip=9, nivel_brotli=11)
+        return corpos[codificacao]
+
+    def _atualizar_se_mudou(self):
+        if not self.recarregar:
+            return
+        with self._lock:
+            if self._assinatura_atual(self._listar()) != self._assinatura:
+                self._carregar()
+
+    def url(self, caminho):
+        """URL versionada de static/<caminho> (função `estatico` dos templates)."""
+        self._atualizar_se_mudou()
+        arquivo = self._arquivos.get(caminho)
+        if arquivo is None:
+            raise ValueError(f'Arquivo estático não encontrado: {caminho}')
+        return url_for('estatico_versionado', versao=arquivo['hash'], caminho=caminho)
+
+    def servir(self, versao, caminho):
+        arquivo = self._arquivos.get(caminho)
+        if arquivo is None:
+            abort(404)
+        codificacao = escolher_codificacao(request.accept_encodings) if arquivo['comprimivel'] else None
+
+        resposta = Response(self._corpo(arquivo, codificacao), mimetype=arquivo['tipo'])
+        if arquivo['comprimivel']:
+            resposta.vary.add('Accept-Encoding')
+        if codificacao:
+            resposta.headers['Content-Encoding'] = codificacao
+        if versao == arquivo['hash']:
+            resposta.headers['Cache-Control'] = f'public, max-age={self.max_age}, immutable'
+        else:
+            resposta.headers['Cache-Control'] = 'no-cache'
+        resposta.set_etag(f"{arquivo['hash']}-{codificacao}" if codificacao else arquivo['hash'])
+        return resposta.make_conditional(request)
@@ -0,0 +1,248 @@
+# eventos.py - Publicação/assinatura de eventos entre requisições (ex.: dashboard ao vivo via SSE)
+#
+# Dois barramentos com a mesma interface:
+#   - MemoryBarramento: entrega direta aos assinantes do próprio processo (padrão)
+#   - DatabaseBarramento: eventos gravados em uma tabela do banco da aplicação e lidos
+#     por uma thread de cada processo, para que todos os workers recebam
+# Outros backends (Redis pub/sub...) só precisam implementar _publicar e chamar
+# _distribuir ao receber um evento.
+#
+# Cada assinante tem uma fila limitada. Publicar nunca bloqueia: se a fila de um
+# assinante lento enche, os eventos pendentes dele são descartados e ele recebe
+# PERDIDOS no lugar, para buscar o estado completo de novo em vez de acumular memória.
+
+import json
+import logging
+import threading
+import time
+from collections import deque
+
+from sqlalchemy import Column, Float, Index, Integer, MetaData, String, Table, Text, delete, func, insert, select
+
+logger = logging.getLogger('academia.eventos')
+
+# Devolvido por Assinatura.proximo() quando eventos foram descartados por fila cheia
+PERDIDOS = object()
+
+
+class Assinatura:
+    """Fila limitada dos eventos de um canal para um assinante. Use com `with` para cancelar ao sair."""
+
+    def __init__(self, barramento, canal, max_fila, ultimo_id=0):
+        self.barramento = barramento
+        self.canal = canal
+        self.max_fila = max_fila
+        # Id do último evento entregue (barramentos com id): nada igual ou anterior é entregue de novo
+        self.ultimo_id = ultimo_id
+        self._fila = deque()
+        self._perdeu_eventos = False
+        self._condicao = threading.Condition()
+
+    def _entregar(self, evento, id_evento=None):
+        # Chamado por quem publica: só enfileira, nunca espera o assinante
+        with self._condicao:
+            if id_evento is not None:
+                if id_evento <= self.ultimo_id:
+                    return True
+                self.ultimo_id = id_evento
+            if self._perdeu_eventos:
+                return False
+            if len(self._fila) >= self.max_fila:
+                self._fila.clear()
+                self._perdeu_eventos = True
+            else:
+                self._fila.append(evento)
+            self._condicao.notify()
+            return not self._perdeu_eventos
+
+    def proximo(self, timeout):
+        """Próximo evento, PERDIDOS se houve descarte, ou None se nada chegou em `timeout` segundos."""
+        with self._condicao:
+            if not self._fila and not self._perdeu_eventos:
+                self._condicao.wait(timeout)
+            if self._perdeu_eventos:
+                self._perdeu_eventos = False
+                return PERDIDOS
+            return self._fila.popleft() if self._fila else None
+
+    def cancelar(self):
+        self.barramento._remover(self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.cancelar()
+
+
+class Barramento:
+    """Interface comum dos barramentos, com contadores de eventos e descartes."""
+    nome = 'base'
+
+    def __init__(self, max_fila=100):
+        self.max_fila = max_fila
+        self.publicados = 0
+        self.descartes = 0
+        self._assinantes = {}
+        self._lock = threading.Lock()
+
+    def assinar(self, canal, max_fila=None):
+        assinatura = Assinatura(self, canal, max_fila or self.max_fila, self._ultimo_id())
+        with self._lock:
+            self._assinantes.setdefault(canal, set()).add(assinatura)
+        self._assinante_adicionado()
+        return assinatura
+
+    def _remover(self, assinatura):
+        with self._lock:
+            assinantes = self._assinantes.get(assinatura.canal)
+            if assinantes is not None:
+                assinantes.discard(assinatura)
+                if not assinantes:
+                    del self._assinantes[assinatura.canal]
+
+    def publicar(self, canal, evento):
+        """Publica `evento` (dict serializável em JSON) para os assinantes do canal."""
+        self.publicados += 1
+        self._publicar(canal, evento)
+
+    def _distribuir(self, canal, evento, id_evento=None):
+        with self._lock:
+            assinantes = list(self._assinantes.get(canal, ()))
+        for assinatura in assinantes:
+            if not assinatura._entregar(evento, id_evento):
+                self.descartes += 1
+
+    def assinantes(self):
+        with self._lock:
+            return sum(len(assinantes) for assinantes in self._assinantes.values())
+
+    def stats(self):
+        return {
+            'backend': self.nome,
+            'assinantes': self.assinantes(),
+            'publicados': self.publicados,
+            'descartes': self.descartes,
+        }
+
+    def _ultimo_id(self):
+        """Id do último evento já distribuído (0 em barramentos sem id)"""
+        return 0
+
+    def _assinante_adicionado(self):
+        pass
+
+    def _publicar(self, canal, evento):
+        raise NotImplementedError
+
+
+class MemoryBarramento(Barramento):
+    """Entrega no próprio processo, sem threads. Thread-safe."""
+    nome = 'memory'
+
+    def _publicar(self, canal, evento):
+        self._distribuir(canal, evento)
+
+
+metadata = MetaData()
+
+eventos = Table(
+    'evento', metadata,
+    Column('id', Integer, primary_key=True),
+    Column('canal', String(50), nullable=False),
+    Column('dados', Text, nullable=False),
+    Column('momento', Float, nullable=False),
+    Index('ix_evento_momento', 'momento'),
+)
+
+
+class DatabaseBarramento(Barramento):
+    """Eventos gravados no banco e lidos por uma thread de cada processo, visíveis para todos os workers.
+
+    A thread só é criada no primeiro assinante (depois do fork do gunicorn) e só
+    consulta o banco, a cada `intervalo` segundos, enquanto houver assinantes.
+    Cada leitura busca só os ids depois do último lido, e cada assinante guarda o
+    último id recebido: nenhum evento é entregue duas vezes. Um INSERT que termine
+    depois de outro com id maior se perde; o dashboard se corrige no próximo 'estado'.
+    `engine` pode ser um Engine ou uma função que o retorna, como no rate limiter.
+    Publicar usa uma conexão própria do engine, em transação separada da sessão do ORM.
+    """
+    nome = 'database'
+
+    def __init__(self, engine, max_fila=100, intervalo=0.5, retencao=60):
+        super().__init__(max_fila)
+        self._engine = engine
+        self.intervalo = intervalo
+        self.retencao = retencao
+        self._tabela_criada = False
+        self._thread = None
+        self._tem_assinantes = threading.Event()
+        self._lido_ate = 0
+
+    @property
+    def engine(self):
+        engine = self._engine() if callable(self._engine) else self._engine
+        if not self._tabela_criada:
+            metadata.create_all(engine, checkfirst=True)
+            self._tabela_criada = True
+        return engine
+
+    def _publicar(self, canal, evento):
+        agora = time.time()
+        with self.engine.begin() as conn:
+            conn.execute(insert(eventos).values(canal=canal, dados=json.dumps(evento), momento=agora))
+            # Eventos antigos já foram lidos por todos os processos
+            conn.execute(delete(eventos).where(eventos.c.momento <= agora - self.retencao))
+
+    def _ultimo_id(self):
+        # Assinantes novos só recebem o que a thread ler depois de agora
+        return self._lido_ate
+
+    def _assinante_adicionado(self):
+        self._tem_assinantes.set()
+        with self._lock:
+            if self._thread is None:
+                # Resolvido aqui, no contexto da requisição: a thread não tem contexto da aplicação
+                engine = self.engine
+                # Parte do último evento existente: assinantes novos só recebem o que vier depois
+                with engine.connect() as conn:
+                    self._lido_ate = conn.execute(select(func.max(eventos.c.id))).scalar() or 0
+                self._thread = threading.Thread(target=self._ler_eventos, args=(engine,), name='eventos', daemon=True)
+                self._thread.start()
+
+    def _ler_eventos(self, engine):
+        falhando = False
+        while True:
+            # Sem ninguém ouvindo, nenhuma consulta; acorda no próximo assinar()
+            self._tem_assinantes.clear()
+            if not self.assinantes():
+                self._tem_assinantes.wait()
+            try:
+                with engine.connect() as conn:
+                    linhas = conn.execute(
+                        select(eventos.c.id, eventos.c.canal, eventos.c.dados)
+                        .where(eventos.c.id > self._lido_ate)
+                        .order_by(eventos.c.id)
+                    ).all()
+                falhando = False
+            except Exception:
+                # Banco indisponível: registra a primeira falha e tenta de novo no próximo intervalo
+                if not falhando:
+                    logger.exception('Falha ao ler eventos do banco')
+                falhando = True
+                linhas = []
+            for id_evento, canal, dados in linhas:
+                self._lido_ate = id_evento
+                self._distribuir(canal, json.loads(dados), id_evento)
+            time.sleep(self.intervalo)
+
+
+def criar_barramento(config, engine=None):
+    """Instancia o barramento configurado em EVENTOS_BACKEND ('memory' ou 'database')."""
+    backend = config.get('EVENTOS_BACKEND', 'memory')
+    max_fila = int(config.get('EVENTOS_MAX_FILA', 100))
+    if backend == 'database':
+        return DatabaseBarramento(engine, max_fila, intervalo=float(config.get('EVENTOS_INTERVALO', 0.5)))
+    if backend == 'memory':
+        return MemoryBarramento(max_fila)
+    raise ValueError(f'EVENTOS_BACKEND desconhecido: {backend}')
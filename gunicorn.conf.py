@@ -0,0 +1,34 @@
+# gunicorn.conf.py - Configuração do servidor de produção
+#
+# Workers (processos) x threads por worker, ajustáveis por variáveis de ambiente.
+# Cada thread pode segurar uma conexão do pool: mantenha
+# GUNICORN_THREADS <= DB_POOL_SIZE + DB_MAX_OVERFLOW (ver app.py).
+#
+# Orçamento de threads: cada dashboard ao vivo aberto (SSE, /dashboard/eventos) segura uma thread
+# pelo tempo da conexão, sem conexão do banco. Por padrão até metade das threads de cada worker vai
+# para eles (SSE_MAX_CONEXOES = GUNICORN_THREADS // 2); a outra metade atende as demais páginas.
+# Dashboards simultâneos ~ workers x threads / 2 (ex.: 3 workers x 8 threads = 12). Para mais
+# dashboards, aumente GUNICORN_THREADS (e o pool, se preciso) ou defina SSE_MAX_CONEXOES.
+
+import multiprocessing
+import os
+
+bind = os.getenv('GUNICORN_BIND', f"0.0.0.0:{os.getenv('PORT', '5000')}")
+workers = int(os.getenv('GUNICORN_WORKERS', min(multiprocessing.cpu_count() * 2 + 1, 8)))
+threads = int(os.getenv('GUNICORN_THREADS', '8'))
+worker_class = 'gthread'
+timeout = int(os.getenv('GUNICORN_TIMEOUT', '60'))
+graceful_timeout = 30
+keepalive = 5
+# Recicla os workers periodicamente para conter vazamentos de memória
+max_requests = int(os.getenv('GUNICORN_MAX_REQUESTS', '2000'))
+max_requests_jitter = 200
+accesslog = '-'
+errorlog = '-'
+
+
+def on_starting(server):
+    # Herdados pelos workers: create_app() avisa se algum backend por processo ('memory') roda com
+    # vários workers, e app.py dimensiona SSE_MAX_CONEXOES pelas threads
+    os.environ['GUNICORN_WORKERS_ATIVOS'] = str(server.cfg.workers)
+    os.environ['GUNICORN_THREADS_ATIVOS'] = str(server.cfg.threads)
@@ -0,0 +1,221 @@
+# instrumentacao.py - Métricas por requisição: consultas SQL, tempo de banco e tempo total
+#
+# Para cada requisição:
+#   - conta as consultas e soma o tempo gasto no banco (eventos do SQLAlchemy)
+#   - devolve os tempos no cabeçalho Server-Timing (visível no DevTools do navegador), exceto
+#     nas respostas em streaming, medidas até o fim do corpo (ao fechar a resposta)
+#   - registra uma linha de log em JSON no logger 'academia.requisicoes'
+#   - guarda as últimas N medições de cada endpoint para os percentis da página de desempenho
+#   - opcionalmente grava um perfil cProfile das requisições acima do limite de lentidão
+#
+# Configuração (app.config):
+#   INSTRUMENTACAO_JANELA       medições guardadas por endpoint (padrão 500)
+#   INSTRUMENTACAO_LIMITE_MS    requisições acima disso são "lentas" (padrão 500 ms)
+#   INSTRUMENTACAO_PROFILE_DIR  diretório dos perfis .prof; vazio desliga o profiler
+
+import cProfile
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+
+from flask import g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger('academia.requisicoes')
+
+
+def percentil(ordenados, p):
+    if not ordenados:
+        return 0.0
+    return ordenados[min(len(ordenados) - 1, int(round(p / 100 * (len(ordenados) - 1))))]
+
+
+class EstatisticasEndpoints:
+    """Janela deslizante das últimas medições de cada endpoint. Thread-safe."""
+
+    def __init__(self, janela=500):
+        self.janela = janela
+        self._medicoes = {}
+        self._lock = threading.Lock()
+
+    def registrar(self, endpoint, total_ms, db_ms, consultas):
+        with self._lock:
+            medicoes = self._medicoes.get(endpoint)
+            if medicoes is None:
+                medicoes = self._medicoes[endpoint] = deque(maxlen=self.janela)
+            medicoes.append((total_ms, db_ms, consultas))
+
+    def resumo(self):
+        """[{endpoint, requisicoes, p50_ms, p95_ms, p99_ms, db_p95_ms, consultas_media, consultas_max}]"""
+        with self._lock:
+            copia = {endpoint: list(medicoes) for endpoint, medicoes in self._medicoes.items()}
+        linhas = []
+        for endpoint, medicoes in copia.items():
+            totais = sorted(m[0] for m in medicoes)
+            bancos = sorted(m[1] for m in medicoes)
+            consultas = [m[2] for m in medicoes]
+            linhas.append({
+                'endpoint': endpoint,
+                'requisicoes': len(medicoes),
+                'p50_ms': round(percentil(totais, 50), 1),
+                'p95_ms': round(percentil(totais, 95), 1),
+                'p99_ms': round(percentil(totais, 99), 1),
+                'db_p95_ms': round(percentil(bancos, 95), 1),
+                'consultas_media': round(sum(consultas) / len(consultas), 1),
+                'consultas_max': max(consultas),
+            })
+        return sorted(linhas, key=lambda linha: linha['p95_ms'], reverse=True)
+
+    def limpar(self):
+        with self._lock:
+            self._medicoes.clear()
+
+
+class Instrumentacao:
+    """Registra os ganchos do Flask e do SQLAlchemy na aplicação."""
+
+    def __init__(self, app=None):
+        self.estatisticas = EstatisticasEndpoints()
+        self.limite_ms = 500
+        self.profile_dir = None
+        # Funções chamadas ao fim de cada requisição com (endpoint, metodo, status, total_ms, db_ms, consultas)
+        self.ouvintes = []
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.estatisticas.janela = int(app.config.get('INSTRUMENTACAO_JANELA', 500))
+        self.limite_ms = float(app.config.get('INSTRUMENTACAO_LIMITE_MS', 500))
+        self.profile_dir = app.config.get('INSTRUMENTACAO_PROFILE_DIR') or None
+        if self.profile_dir:
+            os.makedirs(self.profile_dir, exist_ok=True)
+
+        if not logger.handlers and not logging.getLogger().handlers:
+            handler = logging.StreamHandler()
+            handler.setFormatter(logging.Formatter('%(message)s'))
+            logger.addHandler(handler)
+        logger.setLevel(logging.INFO)
+
+        # Ouvindo a classe Engine, os eventos valem para todos os engines (app e rate limiter)
+        if not event.contains(Engine, 'before_cursor_execute', _antes_consulta):
+            event.listen(Engine, 'before_cursor_execute', _antes_consulta)
+            event.listen(Engine, 'after_cursor_execute', _depois_consulta)
+            event.listen(Engine, 'handle_error', _erro_consulta)
+
+        app.before_request(self._inicio_requisicao)
+        app.after_request(self._fim_requisicao)
+        app.extensions['instrumentacao'] = self
+
+    def _inicio_requisicao(self):
+        g._instr_inicio = time.perf_counter()
+        g._instr_consultas = 0
+        g._instr_db = 0.0
+        g._instr_profiler = None
+        if self.profile_dir:
+            profiler = cProfile.Profile()
+            try:
+                profiler.enable()
+                g._instr_profiler = profiler
+            except ValueError:
+                # Outro profiler já ativo (ex.: requisição concorrente sendo perfilada)
+                pass
+
+    def _fim_requisicao(self, response):
+        inicio = g.get('_instr_inicio')
+        if inicio is None:
+            return response
+        endpoint = request.endpoint or 'desconhecido'
+        perfil = self._parar_profiler(endpoint, (time.perf_counter() - inicio) * 1000)
+
+        if response.is_streamed:
+            metodo, caminho, status = request.method, request.path, response.status_code
+            cabecalho_ms = (time.perf_counter() - inicio) * 1000
+            if response.mimetype == 'text/event-stream':
+                # SSE fica aberto enquanto a página estiver aberta: vale só o tempo até os cabeçalhos,
+                # senão a duração da conexão entraria nos percentis e no histograma de latência
+                self._registrar(g, endpoint, metodo, caminho, status, perfil, cabecalho_ms)
+                return response
+            # O corpo (CSV) e as consultas dele só rodam depois daqui: a medição termina
+            # quando o servidor fecha a resposta, e o Server-Timing (já enviado) fica de fora
+            medicao = g._get_current_object()
+            response.call_on_close(
+                lambda: self._registrar(medicao, endpoint, metodo, caminho, status, perfil, cabecalho_ms)
+            )
+            return response
+
+        total_ms, db_ms, consultas = self._registrar(
+            g, endpoint, request.method, request.path, response.status_code, perfil
+        )
+        response.headers.add(
+            'Server-Timing',
+            f'db;dur={db_ms:.1f};desc="{consultas} consultas", app;dur={total_ms - db_ms:.1f}, total;dur={total_ms:.1f}'
+        )
+        return response
+
+    def _parar_profiler(self, endpoint, total_ms):
+        """Desliga o profiler da requisição; grava o perfil se ela passou do limite. Retorna o arquivo."""
+        profiler = g.pop('_instr_profiler', None)
+        if profiler is None:
+            return None
+        profiler.disable()
+        if total_ms < self.limite_ms:
+            return None
+        perfil = os.path.join(self.profile_dir, f'{endpoint}-{int(time.time() * 1000)}-{int(total_ms)}ms.prof')
+        profiler.dump_stats(perfil)
+        return perfil
+
+    def _registrar(self, medicao, endpoint, metodo, caminho, status, perfil, cabecalho_ms=None):
+        """Registra as medições de `medicao` (o `g` da requisição); retorna (total_ms, db_ms, consultas).
+
+        `cabecalho_ms` só existe nas respostas em streaming: o tempo até os cabeçalhos. É ele que
+        decide se a requisição foi lenta, pois a duração do corpo depende do cliente (download).
+        """
+        total_ms = (time.perf_counter() - medicao._instr_inicio) * 1000
+        db_ms = medicao._instr_db * 1000
+        consultas = medicao._instr_consultas
+
+        self.estatisticas.registrar(endpoint, total_ms, db_ms, consultas)
+        for ouvinte in self.ouvintes:
+            ouvinte(endpoint, metodo, status, total_ms, db_ms, consultas)
+
+        registro = {
+            'endpoint': endpoint,
+            'metodo': metodo,
+            'caminho': caminho,
+            'status': status,
+            'total_ms': round(total_ms, 1),
+            'db_ms': round(db_ms, 1),
+            'consultas': consultas,
+            'lenta': (total_ms if cabecalho_ms is None else cabecalho_ms) >= self.limite_ms,
+        }
+        if cabecalho_ms is not None:
+            registro['streaming'] = True
+            registro['cabecalho_ms'] = round(cabecalho_ms, 1)
+        if perfil:
+            registro['perfil'] = perfil
+        logger.log(logging.WARNING if registro['lenta'] else logging.INFO, json.dumps(registro))
+        return total_ms, db_ms, consultas
+
+
+def _antes_consulta(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('_instr_inicio_consulta', []).append(time.perf_counter())
+
+
+def _depois_consulta(conn, cursor, statement, parameters, context, executemany):
+    inicio = conn.info['_instr_inicio_consulta'].pop()
+    if has_request_context() and '_instr_inicio' in g:
+        g._instr_consultas += 1
+        g._instr_db += time.perf_counter() - inicio
+
+
+def _erro_consulta(contexto):
+    # Consulta com erro não dispara after_cursor_execute: descarta o início empilhado
+    # `cursor` só é preenchido quando o erro ocorre na execução (não na conexão)
+    if contexto.connection is not None and getattr(contexto, 'cursor', None) is not None:
+        inicios = contexto.connection.info.get('_instr_inicio_consulta')
+        if inicios:
+            inicios.pop()
@@ -0,0 +1,180 @@
+# metricas.py - Métricas no formato texto do Prometheus, sem dependências externas
+#
+# Tipos:
+#   - Contador: valor que só cresce (ex.: logins, pagamentos registrados)
+#   - Histograma: distribuição em faixas (ex.: latência das requisições)
+#   - Medidor: valor calculado na hora da coleta por uma função (ex.: conexões do pool)
+#
+# Contadores e histogramas guardam os valores em células por thread: quem registra
+# só escreve na célula da própria thread, sem lock; a coleta soma as células.
+# Os valores são por processo (cada worker do gunicorn expõe os seus).
+
+import bisect
+import threading
+
+LATENCIA_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escapar(valor):
+    return str(valor).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _formatar_rotulos(nomes, valores, extra=None):
+    pares = [f'{nome}="{_escapar(valor)}"' for nome, valor in zip(nomes, valores)]
+    if extra:
+        pares.append(extra)
+    return '{' + ','.join(pares) + '}' if pares else ''
+
+
+def _formatar_numero(valor):
+    if valor == float('inf'):
+        return '+Inf'
+    return repr(float(valor)) if isinstance(valor, float) else str(valor)
+
+
+class Metrica:
+    tipo = 'untyped'
+
+    def __init__(self, nome, descricao, rotulos=()):
+        self.nome = nome
+        self.descricao = descricao
+        self.rotulos = tuple(rotulos)
+
+    def _chave(self, rotulos):
+        return tuple(str(rotulos.get(nome, '')) for nome in self.rotulos)
+
+    def exportar(self):
+        linhas = [f'# HELP {self.nome} {self.descricao}', f'# TYPE {self.nome} {self.tipo}']
+        linhas.extend(self._amostras())
+        return linhas
+
+    def _amostras(self):
+        raise NotImplementedError
+
+
+class _MetricaPorThread(Metrica):
+    """Base dos tipos que acumulam valores em células por thread."""
+
+    def __init__(self, nome, descricao, rotulos=()):
+        super().__init__(nome, descricao, rotulos)
+        self._local = threading.local()
+        self._celulas = []
+        self._lock = threading.Lock()  # só usado quando uma thread registra sua célula
+
+    def _celula(self):
+        celula = getattr(self._local, 'celula', None)
+        if celula is None:
+            celula = self._local.celula = {}
+            with self._lock:
+                self._celulas.append(celula)
+        return celula
+
+    def _itens(self):
+        with self._lock:
+            celulas = list(self._celulas)
+        # list(dict.items()) é atômico no CPython, mesmo com a thread dona escrevendo
+        return [item for celula in celulas for item in list(celula.items())]
+
+
+class Contador(_MetricaPorThread):
+    tipo = 'counter'
+
+    def inc(self, valor=1, **rotulos):
+        celula = self._celula()
+        chave = self._chave(rotulos)
+        celula[chave] = celula.get(chave, 0) + valor
+
+    def valores(self):
+        totais = {}
+        for chave, valor in self._itens():
+            totais[chave] = totais.get(chave, 0) + valor
+        return totais
+
+    def _amostras(self):
+        return [
+            f'{self.nome}{_formatar_rotulos(self.rotulos, chave)} {_formatar_numero(valor)}'
+            for chave, valor in sorted(self.valores().items())
+        ]
+
+
+class Histograma(_MetricaPorThread):
+    tipo = 'histogram'
+
+    def __init__(self, nome, descricao, rotulos=(), buckets=LATENCIA_BUCKETS):
+        super().__init__(nome, descricao, rotulos)
+        self.buckets = tuple(sorted(buckets))
+
+    def observar(self, valor, **rotulos):
+        celula = self._celula()
+        chave = self._chave(rotulos)
+        dados = celula.get(chave)
+        if dados is None:
+            # [contagem por faixa (+Inf no fim), soma]
+            dados = celula[chave] = [[0] * (len(self.buckets) + 1), 0.0]
+        dados[0][bisect.bisect_left(self.buckets, valor)] += 1
+        dados[1] += valor
+
+    def _amostras(self):
+        totais = {}
+        for chave, (contagens, soma) in self._itens():
+            atual = totais.setdefault(chave, [[0] * (len(self.buckets) + 1), 0.0])
+            for i, contagem in enumerate(list(contagens)):
+                atual[0][i] += contagem
+            atual[1] += soma
+
+        linhas = []
+        for chave, (contagens, soma) in sorted(totais.items()):
+            acumulado = 0
+            for limite, contagem in zip(self.buckets + (float('inf'),), contagens):
+                acumulado += contagem
+                rotulos = _formatar_rotulos(self.rotulos, chave, f'le="{_formatar_numero(limite)}"')
+                linhas.append(f'{self.nome}_bucket{rotulos} {acumulado}')
+            rotulos = _formatar_rotulos(self.rotulos, chave)
+            linhas.append(f'{self.nome}_sum{rotulos} {_formatar_numero(soma)}')
+            linhas.append(f'{self.nome}_count{rotulos} {acumulado}')
+        return linhas
+
+
+class Medidor(Metrica):
+    """Valor obtido na coleta. `funcao` retorna um número ou {valores_dos_rotulos: número}."""
+    tipo = 'gauge'
+
+    def __init__(self, nome, descricao, funcao, rotulos=()):
+        super().__init__(nome, descricao, rotulos)
+        self.funcao = funcao
+
+    def _amostras(self):
+        valores = self.funcao()
+        if not isinstance(valores, dict):
+            valores = {(): valores}
+        return [
+            f'{self.nome}{_formatar_rotulos(self.rotulos, chave)} {_formatar_numero(valor)}'
+            for chave, valor in sorted(valores.items())
+        ]
+
+
+class RegistroMetricas:
+    """Conjunto de métricas expostas juntas no /metrics."""
+    CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+    def __init__(self):
+        self._metricas = []
+
+    def _registrar(self, metrica):
+        self._metricas.append(metrica)
+        return metrica
+
+    def contador(self, nome, descricao, rotulos=()):
+        return self._registrar(Contador(nome, descricao, rotulos))
+
+    def histograma(self, nome, descricao, rotulos=(), buckets=LATENCIA_BUCKETS):
+        return self._registrar(Histograma(nome, descricao, rotulos, buckets))
+
+    def medidor(self, nome, descricao, funcao, rotulos=()):
+        return self._registrar(Medidor(nome, descricao, funcao, rotulos))
+
+    def exportar(self):
+        linhas = []
+        for metrica in self._metricas:
+            linhas.extend(metrica.exportar())
+        return '\n'.join(linhas) + '\n'
@@ -13,7 +13,20 @@ sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 # Carrega as variáveis de ambiente
 load_dotenv()
 
-from app import app, db, Usuario, Cliente, Pagamento
+from sqlalchemy import Integer, func, inspect, text
+
+from app import (app, db, Usuario, Cliente, Pagamento, Mensalidade, SituacaoCliente,
+                 preencher_telefones_normalizados, sincronizar_mensalidades)
+from rate_limit import falhas_login
+
+# Colunas monetárias que passaram de FLOAT (reais) para INTEGER (centavos)
+COLUNAS_MONETARIAS = [
+    (Cliente, 'valor_mensalidade'),
+    (Pagamento, 'valor_pago'),
+    (Mensalidade, 'valor_devido'),
+    (Mensalidade, 'valor_pago'),
+    (SituacaoCliente, 'valor_devido'),
+]
 
 def criar_estrutura_banco():
     """Cria todas as tabelas no MySQL"""
@@ -34,6 +47,141 @@ def criar_estrutura_banco():
             print(f"Erro ao criar estrutura: {e}")
             return False
 
+def criar_colunas():
+    """Cria as tabelas novas e adiciona às existentes as colunas novas dos modelos (sempre como NULL)"""
+    print("Verificando tabelas e colunas novas...")
+
+    with app.app_context():
+        try:
+            # create_all() só cria o que ainda não existe
+            db.create_all()
+            inspector = inspect(db.engine)
+            for model in (Usuario, Cliente, Pagamento):
+                tabela = model.__table__
+                existentes = {coluna['name'] for coluna in inspector.get_columns(tabela.name)}
+                for coluna in tabela.columns:
+                    if coluna.name in existentes:
+                        continue
+                    tipo = coluna.type.compile(dialect=db.engine.dialect)
+                    with db.engine.begin() as conn:
+                        conn.execute(text(f'ALTER TABLE {tabela.name} ADD COLUMN {coluna.name} {tipo} NULL'))
+                    print(f"  {tabela.name}.{coluna.name}: criada.")
+
+            total = preencher_telefones_normalizados()
+            if total:
+                print(f"  {total} telefones normalizados.")
+            return True
+        except Exception as e:
+            print(f"Erro ao criar colunas: {e}")
+            return False
+
+def converter_valores_para_centavos():
+    """Converte as colunas monetárias em FLOAT para inteiros de centavos, sem apagar dados.
+
+    Cada coluna é copiada para `<coluna>_centavos` com ROUND(valor * 100); a
+    original só é removida depois da cópia, e a nova assume o nome dela. Se a
+    execução for interrompida, rodar de novo continua de onde parou.
+    """
+    print("Convertendo valores monetários para centavos...")
+
+    with app.app_context():
+        try:
+            inspector = inspect(db.engine)
+            tabelas = set(inspector.get_table_names())
+            mysql = db.engine.dialect.name == 'mysql'
+            for model, nome in COLUNAS_MONETARIAS:
+                tabela = model.__table__.name
+                if tabela not in tabelas:
+                    continue
+                colunas = {coluna['name']: coluna['type'] for coluna in inspector.get_columns(tabela)}
+                temporaria = f'{nome}_centavos'
+                if temporaria not in colunas and isinstance(colunas.get(nome), Integer):
+                    print(f"  {tabela}.{nome}: já em centavos.")
+                    continue
+
+                with db.engine.begin() as conn:
+                    if nome in colunas:
+                        if temporaria not in colunas:
+                            conn.execute(text(f'ALTER TABLE {tabela} ADD COLUMN {temporaria} INTEGER'))
+                        conn.execute(text(f'UPDATE {tabela} SET {temporaria} = ROUND({nome} * 100)'))
+                        # Frações de centavo (ex.: 99.999) não existem em dinheiro; avisa se houver
+                        arredondados = conn.execute(text(
+                            f'SELECT COUNT(*) FROM {tabela} WHERE ABS({temporaria} - {nome} * 100) > 0.01'
+                        )).scalar()
+                        if arredondados:
+                            print(f"  {tabela}.{nome}: {arredondados} valores com fração de centavo arredondados.")
+                    if mysql:
+                        remover = f'DROP COLUMN {nome}, ' if nome in colunas else ''
+                        conn.execute(text(f'ALTER TABLE {tabela} {remover}CHANGE {temporaria} {nome} INTEGER NOT NULL'))
+                    else:
+                        if nome in colunas:
+                            conn.execute(text(f'ALTER TABLE {tabela} DROP COLUMN {nome}'))
+                        conn.execute(text(f'ALTER TABLE {tabela} RENAME COLUMN {temporaria} TO {nome}'))
+                print(f"  {tabela}.{nome}: convertida para centavos.")
+            return True
+        except Exception as e:
+            print(f"Erro ao converter valores: {e}")
+            return False
+
+def pagamentos_duplicados():
+    """Retorna (cliente_id, ano, mes, quantidade) dos meses pagos mais de uma vez"""
+    return (
+        db.session.query(
+            Pagamento.cliente_id,
+            Pagamento.ano_referencia,
+            Pagamento.mes_referencia,
+            func.count(Pagamento.id)
+        )
+        .group_by(Pagamento.cliente_id, Pagamento.ano_referencia, Pagamento.mes_referencia)
+        .having(func.count(Pagamento.id) > 1)
+        .all()
+    )
+
+def criar_indices():
+    """Cria os índices dos modelos em um banco existente, sem apagar tabelas"""
+    print("Criando índices no banco de dados...")
+
+    with app.app_context():
+        try:
+            inspector = inspect(db.engine)
+            tabelas_existentes = set(inspector.get_table_names())
+            # falha_login só existe se o rate limiter 'database' já foi usado (é criada por ele)
+            for tabela in (Cliente.__table__, Pagamento.__table__, falhas_login):
+                if tabela.name not in tabelas_existentes:
+                    continue
+                existentes = {indice['name'] for indice in inspector.get_indexes(tabela.name)}
+                for indice in sorted(tabela.indexes, key=lambda i: i.name):
+                    if indice.name in existentes:
+                        print(f"  {indice.name}: já existe.")
+                        continue
+                    if indice.unique and tabela.name == Pagamento.__tablename__:
+                        duplicados = pagamentos_duplicados()
+                        if duplicados:
+                            print(f"  {indice.name}: existem {len(duplicados)} meses pagos em duplicidade. "
+                                  "Corrija-os antes de criar o índice único:")
+                            for cliente_id, ano, mes, quantidade in duplicados:
+                                print(f"    cliente {cliente_id} - {mes:02d}/{ano}: {quantidade} pagamentos")
+                            return False
+                    indice.create(bind=db.engine)
+                    print(f"  {indice.name}: criado.")
+            return True
+        except Exception as e:
+            print(f"Erro ao criar índices: {e}")
+            return False
+
+def gerar_mensalidades():
+    """Gera as mensalidades materializadas a partir dos clientes e pagamentos existentes"""
+    print("Gerando mensalidades...")
+
+    with app.app_context():
+        try:
+            total = sincronizar_mensalidades()
+            print(f"  {total} mensalidades geradas.")
+            return True
+        except Exception as e:
+            print(f"Erro ao gerar mensalidades: {e}")
+            return False
+
 def criar_usuario_admin():
     """Cria usuário administrador inicial"""
     print("Criando usuário administrador inicial...")
@@ -77,6 +225,12 @@ def main():
     print(f"Ambiente: {os.getenv('FLASK_ENV', 'development')}")
     print(f"Database: {app.config['SQLALCHEMY_DATABASE_URI']}")
     print()
+
+    # Banco já existente: apenas cria as colunas e índices que faltam, sem drop_all()
+    if '--atualizar' in sys.argv or '--indices' in sys.argv:
+        if converter_valores_para_centavos() and criar_colunas() and criar_indices() and gerar_mensalidades():
+            print("\n=== BANCO ATUALIZADO ===")
+        return
     
     # Confirmação
     resposta = input("Deseja continuar com a migração? (s/N): ")
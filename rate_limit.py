@@ -0,0 +1,172 @@
+# rate_limit.py - Limite de tentativas de login com janela deslizante
+#
+# Dois stores com a mesma interface:
+#   - MemoryRateLimitStore: em memória, por processo, com número máximo de chaves (LRU)
+#   - DatabaseRateLimitStore: tabela no banco da aplicação, compartilhada por todos os workers
+#
+# Regra: com `max_attempts` falhas dentro da janela de `window_seconds`, a chave fica
+# bloqueada até que a falha mais antiga entre as últimas `max_attempts` saia da janela.
+
+import threading
+import time
+from collections import OrderedDict, deque
+
+from sqlalchemy import Column, Float, Index, Integer, MetaData, String, Table, delete, func, insert, select
+
+
+def _bloqueado_ate(momentos, max_attempts, window_seconds, agora):
+    """Retorna até quando a chave fica bloqueada (ou None) dadas as falhas recentes, em ordem."""
+    recentes = [m for m in momentos if m > agora - window_seconds]
+    if len(recentes) < max_attempts:
+        return None
+    return recentes[-max_attempts] + window_seconds
+
+
+class RateLimitStore:
+    """Interface comum dos stores."""
+    nome = 'base'
+
+    def __init__(self, max_attempts=5, window_seconds=15 * 60):
+        self.max_attempts = max_attempts
+        self.window_seconds = window_seconds
+
+    def check(self, chave):
+        """Retorna (permitido, segundos_restantes)."""
+        agora = time.time()
+        bloqueado_ate = _bloqueado_ate(self._momentos(chave, agora), self.max_attempts, self.window_seconds, agora)
+        if bloqueado_ate and agora < bloqueado_ate:
+            return False, bloqueado_ate - agora
+        return True, 0
+
+    def record_failure(self, chave):
+        """Registra uma falha; retorna True se a chave passou a ficar bloqueada."""
+        agora = time.time()
+        self._registrar(chave, agora)
+        return not self.check(chave)[0]
+
+    def reset(self, chave):
+        raise NotImplementedError
+
+    def _momentos(self, chave, agora):
+        raise NotImplementedError
+
+    def _registrar(self, chave, agora):
+        raise NotImplementedError
+
+
+class MemoryRateLimitStore(RateLimitStore):
+    """Guarda apenas as últimas `max_attempts` falhas de até `max_keys` chaves. Thread-safe."""
+    nome = 'memory'
+
+    def __init__(self, max_attempts=5, window_seconds=15 * 60, max_keys=10000):
+        super().__init__(max_attempts, window_seconds)
+        self.max_keys = max_keys
+        self._falhas = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _momentos(self, chave, agora):
+        with self._lock:
+            momentos = self._falhas.get(chave)
+            if momentos is None:
+                return []
+            if momentos[-1] <= agora - self.window_seconds:
+                del self._falhas[chave]
+                return []
+            return list(momentos)
+
+    def _registrar(self, chave, agora):
+        with self._lock:
+            momentos = self._falhas.get(chave)
+            if momentos is None:
+                momentos = self._falhas[chave] = deque(maxlen=self.max_attempts)
+            momentos.append(agora)
+            self._falhas.move_to_end(chave)
+            # Remove primeiro as chaves menos recentes; sob rajada, o limite de chaves é respeitado
+            while len(self._falhas) > self.max_keys:
+                self._falhas.popitem(last=False)
+
+    def reset(self, chave):
+        with self._lock:
+            self._falhas.pop(chave, None)
+
+    def __len__(self):
+        return len(self._falhas)
+
+
+metadata = MetaData()
+
+falhas_login = Table(
+    'falha_login', metadata,
+    Column('id', Integer, primary_key=True),
+    Column('chave', String(255), nullable=False),
+    Column('momento', Float, nullable=False),
+    Index('ix_falha_login_chave_momento', 'chave', 'momento'),
+    Index('ix_falha_login_momento', 'momento'),
+)
+
+
+class DatabaseRateLimitStore(RateLimitStore):
+    """Falhas gravadas em uma tabela do banco, visíveis para todos os workers.
+
+    `engine` pode ser um Engine ou uma função que o retorna (útil quando o engine
+    só existe dentro do contexto da aplicação).
+    """
+    nome = 'database'
+
+    # Segundos entre as limpezas das falhas expiradas de todas as chaves (por processo)
+    INTERVALO_LIMPEZA = 60
+
+    def __init__(self, engine, max_attempts=5, window_seconds=15 * 60):
+        super().__init__(max_attempts, window_seconds)
+        self._engine = engine
+        self._tabela_criada = False
+        self._ultima_limpeza = 0
+
+    @property
+    def engine(self):
+        engine = self._engine() if callable(self._engine) else self._engine
+        if not self._tabela_criada:
+            metadata.create_all(engine, checkfirst=True)
+            self._tabela_criada = True
+        return engine
+
+    def _momentos(self, chave, agora):
+        with self.engine.connect() as conn:
+            return list(conn.execute(
+                select(falhas_login.c.momento)
+                .where(falhas_login.c.chave == chave, falhas_login.c.momento > agora - self.window_seconds)
+                .order_by(falhas_login.c.momento)
+            ).scalars())
+
+    def _registrar(self, chave, agora):
+        with self.engine.begin() as conn:
+            conn.execute(insert(falhas_login).values(chave=chave, momento=agora))
+            expiradas = falhas_login.c.momento <= agora - self.window_seconds
+            # As desta chave a cada falha, pelo índice (chave, momento)
+            conn.execute(delete(falhas_login).where(falhas_login.c.chave == chave, expiradas))
+            # As de todas as chaves no máximo a cada INTERVALO_LIMPEZA, pelo índice de momento
+            if agora - self._ultima_limpeza >= self.INTERVALO_LIMPEZA:
+                self._ultima_limpeza = agora
+                conn.execute(delete(falhas_login).where(expiradas))
+
+    def reset(self, chave):
+        with self.engine.begin() as conn:
+            conn.execute(delete(falhas_login).where(falhas_login.c.chave == chave))
+
+    def __len__(self):
+        with self.engine.connect() as conn:
+            return conn.execute(select(func.count(func.distinct(falhas_login.c.chave)))).scalar()
+
+
+def criar_rate_limiter(config, engine=None):
+    """Instancia o store configurado em RATE_LIMIT_BACKEND ('memory' ou 'database')."""
+    backend = config.get('RATE_LIMIT_BACKEND', 'memory')
+    max_attempts = int(config.get('RATE_LIMIT_MAX_ATTEMPTS', 5))
+    window_seconds = int(config.get('RATE_LIMIT_WINDOW', 15 * 60))
+    if backend == 'database':
+        return DatabaseRateLimitStore(engine, max_attempts, window_seconds)
+    if backend == 'memory':
+        return MemoryRateLimitStore(
+            max_attempts, window_seconds, max_keys=int(config.get('RATE_LIMIT_MAX_KEYS', 10000))
+        )
+    raise ValueError(f'RATE_LIMIT_BACKEND desconhecido: {backend}')
@@ -0,0 +1,108 @@
+# senhas.py - Hash de senhas com algoritmo/custo configuráveis e verificação em pool limitado
+#
+# O custo do hash domina o tempo de CPU do /login. Aqui ele é configurável e a
+# verificação roda em um pool de threads de tamanho fixo: hashlib.scrypt e
+# pbkdf2_hmac liberam o GIL, então as demais requisições continuam sendo
+# atendidas enquanto no máximo `workers` hashes são calculados ao mesmo tempo.
+# Acima de `fila` verificações pendentes, novas tentativas falham na hora
+# (SobrecargaSenhas) em vez de acumular threads esperando.
+#
+# Configuração (app.config):
+#   SENHA_HASH_METODO   formato do Werkzeug: 'scrypt:N:r:p' ou 'pbkdf2:sha256:iteracoes'
+#                       (padrão 'scrypt:32768:8:1', o mesmo do Werkzeug)
+#   SENHA_WORKERS       hashes calculados em paralelo (padrão: número de CPUs)
+#   SENHA_FILA          verificações pendentes aceitas (padrão: 4 x workers)
+#   SENHA_TIMEOUT       segundos de espera pelo resultado, já com vaga na fila (padrão 10)
+#
+# Hashes gravados com outro método ou custo continuam válidos; `precisa_rehash`
+# indica quando regravá-los (feito no login bem-sucedido).
+
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as TempoEsgotado
+
+from werkzeug.security import DEFAULT_PBKDF2_ITERATIONS, check_password_hash, generate_password_hash
+
+METODO_PADRAO = 'scrypt:32768:8:1'
+
+
+class SobrecargaSenhas(Exception):
+    """Fila de verificação cheia: o login deve ser tentado de novo em instantes."""
+
+
+def normalizar_metodo(metodo):
+    """Completa o método com os parâmetros padrão do Werkzeug ('scrypt' -> 'scrypt:32768:8:1')."""
+    nome, *args = metodo.split(':')
+    if nome == 'scrypt':
+        if not args:
+            args = ['32768', '8', '1']
+        if len(args) != 3:
+            raise ValueError("'scrypt' recebe 3 parâmetros: scrypt:N:r:p")
+        return ':'.join([nome] + [str(int(a)) for a in args])
+    if nome == 'pbkdf2':
+        if len(args) > 2:
+            raise ValueError("'pbkdf2' recebe 2 parâmetros: pbkdf2:hash:iteracoes")
+        hash_name = args[0] if args else 'sha256'
+        iteracoes = int(args[1]) if len(args) == 2 else DEFAULT_PBKDF2_ITERATIONS
+        return f'{nome}:{hash_name}:{iteracoes}'
+    raise ValueError(f'SENHA_HASH_METODO desconhecido: {metodo}')
+
+
+class HasherSenhas:
+    """Gera e verifica hashes no pool limitado. Thread-safe."""
+
+    def __init__(self, metodo=METODO_PADRAO, workers=None, fila=None, timeout=10):
+        self.metodo = normalizar_metodo(metodo)
+        self.workers = workers or os.cpu_count() or 1
+        self.timeout = timeout
+        self._vagas = threading.BoundedSemaphore(fila or self.workers * 4)
+        self._pool = None
+        self._lock = threading.Lock()
+
+    def _executor(self):
+        # Criado no primeiro uso: importar o módulo não abre threads (nem antes do fork do gunicorn)
+        if self._pool is None:
+            with self._lock:
+                if self._pool is None:
+                    self._pool = ThreadPoolExecutor(self.workers, thread_name_prefix='senhas')
+        return self._pool
+
+    def _executar(self, funcao, *args):
+        # Sem vaga, falha na hora: esperar só prenderia mais uma thread do servidor
+        if not self._vagas.acquire(blocking=False):
+            raise SobrecargaSenhas()
+        try:
+            futuro = self._executor().submit(funcao, *args)
+        except BaseException:
+            self._vagas.release()
+            raise
+        # A vaga só é devolvida quando o hash termina, mesmo que quem pediu desista antes
+        futuro.add_done_callback(lambda _: self._vagas.release())
+        try:
+            return futuro.result(timeout=self.timeout)
+        except TempoEsgotado:
+            raise SobrecargaSenhas() from None
+
+    def gerar(self, senha):
+        return self._executar(generate_password_hash, senha, self.metodo)
+
+    def verificar(self, senha_hash, senha):
+        return self._executar(check_password_hash, senha_hash, senha)
+
+    def precisa_rehash(self, senha_hash):
+        """True se o hash foi gerado com método ou custo diferentes do configurado."""
+        metodo = senha_hash.split('$', 1)[0]
+        try:
+            return normalizar_metodo(metodo) != self.metodo
+        except ValueError:
+            return True
+
+
+def criar_hasher(config):
+    """Instancia o HasherSenhas com SENHA_HASH_METODO, SENHA_WORKERS, SENHA_FILA e SENHA_TIMEOUT."""
+    return HasherSenhas(
+        metodo=config.get('SENHA_HASH_METODO') or METODO_PADRAO,
+        workers=config.get('SENHA_WORKERS') or None,
+        fila=config.get('SENHA_FILA') or None,
+        timeout=float(config.get('SENHA_TIMEOUT', 10)),
+    )
@@ -1,3 +1,9 @@
 #!/bin/sh
-echo "📦 Iniciando app.py via start.sh..."
-python app.py
+echo "📦 Inicializando o banco..."
+flask --app app inicializar-banco
+# Backends usados pelos vários workers do gunicorn (ver README, Servidor de Produção)
+export CACHE_BACKEND="${CACHE_BACKEND:-memory}"
+export RATE_LIMIT_BACKEND="${RATE_LIMIT_BACKEND:-database}"
+export EVENTOS_BACKEND="${EVENTOS_BACKEND:-database}"
+echo "🚀 Iniciando gunicorn via start.sh..."
+exec gunicorn -c gunicorn.conf.py wsgi:app
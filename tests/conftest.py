@@ -0,0 +1,81 @@
+# conftest.py - Fixtures dos testes: aplicação sobre um banco SQLite temporário
+#
+# Uso: python -m pytest -q (na raiz do projeto)
+#
+# DATABASE_URI precisa apontar para o banco de teste antes de `import app`: o
+# engine é configurado na importação. Cada teste recebe um banco vazio.
+
+import os
+import sys
+import tempfile
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+sys.path.insert(0, os.path.join(BASE_DIR, 'benchmarks'))
+
+os.environ['DATABASE_URI'] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'testes.db')}"
+
+import pytest
+from flask.testing import FlaskClient
+
+import app as modulo_app
+
+
+class ClienteDeTeste(FlaskClient):
+    """Test client em que cada requisição tem o próprio app context (e `g`), como no servidor.
+
+    As fixtures deixam um app context aberto para o teste usar o banco; sem isto, as
+    requisições o reaproveitariam e o `g` de uma passaria para a seguinte.
+    """
+
+    def open(self, *args, **kwargs):
+        with self.application.app_context():
+            return super().open(*args, **kwargs)
+
+
+@pytest.fixture
+def app():
+    aplicacao = modulo_app.app
+    aplicacao.config.update(TESTING=True, WTF_CSRF_ENABLED=False)
+    aplicacao.test_client_class = ClienteDeTeste
+    with aplicacao.app_context():
+        modulo_app.db.create_all()
+        yield aplicacao
+        modulo_app.db.session.remove()
+        modulo_app.db.drop_all()
+    # Estado por processo que sobreviveria ao banco recriado
+    modulo_app.cache.clear()
+    modulo_app._situacoes_verificadas_em = None
+
+
+@pytest.fixture
+def db(app):
+    return modulo_app.db
+
+
+def logar(app, db, username, tipo_permissao):
+    """Cria o usuário e devolve um test client já com a sessão dele"""
+    usuario = modulo_app.Usuario(username=username, nome_completo=username.title(),
+                                 email=f'{username}@academia.com', tipo_permissao=tipo_permissao,
+                                 session_token=username)
+    usuario.set_password('Teste@12345')
+    db.session.add(usuario)
+    db.session.commit()
+
+    cliente = app.test_client()
+    with cliente.session_transaction() as sessao:
+        sessao['user_id'] = usuario.id
+        sessao['session_token'] = username
+    return cliente
+
+
+@pytest.fixture
+def cliente_admin(app, db):
+    """Test client com a sessão de um administrador"""
+    return logar(app, db, 'teste', 'admin')
+
+
+@pytest.fixture
+def cliente_colaborador(app, db):
+    """Test client com a sessão de um colaborador (sem acesso às telas de administração)"""
+    return logar(app, db, 'colaborador', 'colaborador')
@@ -0,0 +1,142 @@
+# test_atraso.py - calcular_atraso (em memória), mensalidades e situações gravadas contra os algoritmos originais
+
+import random
+from datetime import date, timedelta
+
+import pytest
+from dateutil.relativedelta import relativedelta
+
+from app import (Cliente, Pagamento, SituacaoCliente, _calcular_status, atrasos_mensalidades, calcular_atraso,
+                 calcular_meses_atraso_clientes, sincronizar_mensalidades)
+
+
+def atraso_original(cliente, hoje):
+    """Cliente.calcular_meses_atraso antes do cálculo em memória, com `hoje` como parâmetro."""
+    ultimo_pagamento = Pagamento.query.filter_by(cliente_id=cliente.id).order_by(Pagamento.data_pagamento.desc()).first()
+    data_referencia = cliente.data_matricula
+    if ultimo_pagamento:
+        data_referencia = ultimo_pagamento.data_pagamento
+    meses_atraso = 0
+    valor_devido = 0
+    data_verificacao = data_referencia + relativedelta(months=1)
+    while data_verificacao.year < hoje.year or (data_verificacao.year == hoje.year and data_verificacao.month <= hoje.month):
+        data_verificacao_ajustada = date(data_verificacao.year, data_verificacao.month, min(cliente.dia_vencimento, 28))
+        if data_verificacao.year == hoje.year and data_verificacao.month == hoje.month and hoje < data_verificacao_ajustada:
+            break
+        pagamento_existente = Pagamento.query.filter_by(
+            cliente_id=cliente.id,
+            mes_referencia=data_verificacao.month,
+            ano_referencia=data_verificacao.year
+        ).first()
+        if not pagamento_existente:
+            meses_atraso += 1
+            valor_devido += cliente.valor_mensalidade
+        data_verificacao += relativedelta(months=1)
+    return meses_atraso, valor_devido
+
+
+def status_original(cliente, hoje):
+    """calcular_status_cliente antes das mensalidades, com `hoje` como parâmetro."""
+    if not cliente.ativo:
+        return "Inativo"
+    if not Pagamento.query.filter_by(cliente_id=cliente.id).first():
+        return "Aguardando"
+    if Pagamento.query.filter_by(cliente_id=cliente.id, mes_referencia=hoje.month, ano_referencia=hoje.year).first():
+        return "Em dia"
+    return "Em atraso"
+
+
+def gerar_historicos(db, sorteio, hoje, quantidade):
+    """Clientes com pagamentos esparsos (buracos), atrasados ou adiantados, atravessando viradas de ano."""
+    clientes = []
+    for i in range(quantidade):
+        matricula = hoje - timedelta(days=sorteio.randint(0, 800))
+        cliente = Cliente(nome=f'Cliente {i}', telefone=f'81999{i:06d}', data_matricula=matricula,
+                          valor_mensalidade=sorteio.choice(['89.90', '100.00', '149.50']),
+                          dia_vencimento=sorteio.randint(1, 31), ativo=True)
+        db.session.add(cliente)
+        db.session.flush()
+
+        inicio = matricula.year * 12 + matricula.month - 1
+        fim = hoje.year * 12 + hoje.month - 1 + sorteio.choice([0, 0, 1, 2])  # às vezes pagos adiantado
+        pagos = sorted(sorteio.sample(range(inicio, fim + 1), sorteio.randint(0, fim - inicio + 1)))
+        for indice in pagos:
+            ano, mes = indice // 12, indice % 12 + 1
+            # Pago entre um mês antes e dois depois do mês de referência
+            data_pagamento = date(ano, mes, 1) + timedelta(days=sorteio.randint(-30, 60))
+            db.session.add(Pagamento(cliente_id=cliente.id, data_pagamento=data_pagamento,
+                                     valor_pago=cliente.valor_mensalidade, mes_referencia=mes, ano_referencia=ano))
+        clientes.append(cliente)
+    db.session.commit()
+    return clientes
+
+
+def desativar_alguns(db, clientes):
+    for cliente in clientes[::10]:
+        cliente.ativo = False
+    db.session.commit()
+
+
+@pytest.mark.parametrize('semente', range(8))
+def test_historicos_aleatorios(db, semente):
+    sorteio = random.Random(semente)
+    # Datas perto da virada do ano e de todos os dias de vencimento possíveis
+    hoje = date(2024 + semente % 2, sorteio.choice([1, 2, 12]), sorteio.randint(1, 28))
+    clientes = gerar_historicos(db, sorteio, hoje, 40)
+
+    calculado = calcular_meses_atraso_clientes(clientes, hoje)
+    for cliente in clientes:
+        assert calculado[cliente.id] == atraso_original(cliente, hoje), cliente
+
+
+@pytest.mark.parametrize('semente', range(4))
+def test_mensalidades_equivalem_aos_pagamentos(db, semente):
+    sorteio = random.Random(100 + semente)
+    hoje = date(2024 + semente % 2, sorteio.choice([1, 2, 12]), sorteio.randint(1, 28))
+    clientes = gerar_historicos(db, sorteio, hoje, 40)
+    desativar_alguns(db, clientes)
+    sincronizar_mensalidades(hoje=hoje)
+
+    status = _calcular_status(hoje=hoje)
+    atrasos = atrasos_mensalidades(hoje=hoje)
+    for cliente in clientes:
+        assert status[cliente.id] == status_original(cliente, hoje), cliente
+        esperado = atraso_original(cliente, hoje) if cliente.ativo else (0, 0)
+        assert atrasos.get(cliente.id, (0, 0)) == esperado, cliente
+
+
+@pytest.mark.parametrize('semente', range(4))
+def test_situacoes_gravadas_equivalem_aos_pagamentos(db, semente):
+    sorteio = random.Random(200 + semente)
+    hoje = date(2024 + semente % 2, sorteio.choice([1, 2, 12]), sorteio.randint(1, 28))
+    clientes = gerar_historicos(db, sorteio, hoje, 40)
+    desativar_alguns(db, clientes)
+    sincronizar_mensalidades(hoje=hoje)  # grava as situações de todos os clientes
+
+    situacoes = {situacao.cliente_id: situacao for situacao in SituacaoCliente.query}
+    for cliente in clientes:
+        situacao = situacoes[cliente.id]
+        esperado = atraso_original(cliente, hoje) if cliente.ativo else (0, 0)
+        assert situacao.status == status_original(cliente, hoje), cliente
+        assert (situacao.meses_atraso, situacao.valor_devido) == esperado, cliente
+        assert situacao.calculado_em == hoje
+
+
+@pytest.mark.parametrize('hoje, esperado', [
+    (date(2024, 3, 9), (1, 100)),   # antes do vencimento: março ainda não conta
+    (date(2024, 3, 10), (2, 200)),  # no dia do vencimento já conta
+    (date(2024, 3, 31), (2, 200)),
+])
+def test_mes_atual_so_conta_a_partir_do_vencimento(hoje, esperado):
+    assert calcular_atraso(date(2024, 1, 5), 10, 100, set(), hoje) == esperado
+
+
+def test_virada_de_ano_com_buracos():
+    pagos = {(2023, 12), (2024, 2)}
+    # Referência em novembro/2023: dez pago, jan não, fev pago, mar não (vencimento dia 5 já passou)
+    assert calcular_atraso(date(2023, 11, 20), 5, 100, pagos, date(2024, 3, 6)) == (2, 200)
+
+
+def test_vencimento_depois_do_dia_28_vence_no_dia_28():
+    assert calcular_atraso(date(2024, 1, 31), 31, 100, set(), date(2024, 2, 27)) == (0, 0)
+    assert calcular_atraso(date(2024, 1, 31), 31, 100, set(), date(2024, 2, 28)) == (1, 100)
@@ -0,0 +1,85 @@
+# test_compressao.py - Compressão das páginas, estáticos versionados e bytes por visualização
+
+import gzip
+import re
+
+import pytest
+
+from bench_bytes import PAGINAS, visitar
+from dados_sinteticos import gerar_base
+
+# Tetos de bytes (cabeçalhos + corpo) com gzip/brotli e base de 200 clientes: (1ª visita, visita repetida).
+# Medidos: 1ª visita de 91 KB a 172 KB (quase tudo CSS e fontes de ícones; o relatório usa duas),
+# visitas repetidas de 0,8 KB (/login) a 4,9 KB (/todos_clientes). Sem compressão, /todos_clientes passa de 115 KB.
+TETOS = {
+    '/login': (110_000, 1_500),
+    '/': (110_000, 3_500),
+    '/todos_clientes': (115_000, 8_000),
+    '/relatorio_inadimplentes': (200_000, 8_000),
+}
+
+_URL_ESTATICO = re.compile(r'href="(/static/v/([0-9a-f]{12})/[^"]+)"')
+
+
+@pytest.fixture
+def clientes(app, db, cliente_admin):
+    """{logado: test client} com uma base sintética de 200 clientes"""
+    gerar_base(200, meses=12)
+    return {True: cliente_admin, False: app.test_client()}
+
+
+@pytest.mark.parametrize('pagina, logado', PAGINAS)
+def test_paginas_comprimidas_com_gzip(clientes, pagina, logado):
+    cliente = clientes[logado]
+    original = cliente.get(pagina, headers={'Accept-Encoding': 'identity'})
+    resposta = cliente.get(pagina, headers={'Accept-Encoding': 'gzip'})
+
+    assert resposta.status_code == 200
+    assert resposta.headers['Content-Encoding'] == 'gzip'
+    assert 'Accept-Encoding' in resposta.vary
+    assert 'Content-Encoding' not in original.headers
+    assert 'Accept-Encoding' in original.vary
+    assert gzip.decompress(resposta.get_data()) == original.get_data()
+
+
+def test_paginas_comprimidas_com_brotli(clientes):
+    brotli = pytest.importorskip('brotli')
+    resposta = clientes[True].get('/', headers={'Accept-Encoding': 'gzip, deflate, br'})
+    assert resposta.headers['Content-Encoding'] == 'br'
+    assert 'Accept-Encoding' in resposta.vary
+    assert b'</html>' in brotli.decompress(resposta.get_data())
+
+
+def test_estaticos_versionados_sao_imutaveis(clientes):
+    cliente = clientes[False]
+    html = cliente.get('/login').get_data(as_text=True)
+    urls = _URL_ESTATICO.findall(html)
+    assert urls, 'a página deveria usar estatico() para o CSS'
+
+    for url, versao in urls:
+        resposta = cliente.get(url, headers={'Accept-Encoding': 'gzip'})
+        assert resposta.status_code == 200
+        assert resposta.headers['Cache-Control'] == 'public, max-age=31536000, immutable'
+        assert resposta.headers['Content-Encoding'] == 'gzip'
+        assert 'Accept-Encoding' in resposta.vary
+        assert resposta.headers['ETag'] == f'"{versao}-gzip"'
+        revalidada = cliente.get(url, headers={'Accept-Encoding': 'gzip', 'If-None-Match': resposta.headers['ETag']})
+        assert revalidada.status_code == 304
+
+        # Hash antigo (HTML em cache de antes do deploy): conteúdo atual, sem cache permanente
+        antiga = cliente.get(url.replace(versao, '0' * 12))
+        assert antiga.status_code == 200
+        assert antiga.headers['Cache-Control'] == 'no-cache'
+
+
+@pytest.mark.parametrize('pagina, logado', PAGINAS)
+def test_bytes_por_visualizacao(clientes, pagina, logado):
+    cache_navegador = {}
+    html, recursos, _ = visitar(clientes[logado], pagina, 'gzip, deflate, br', cache_navegador)
+    html_repetida, recursos_repetida, _ = visitar(clientes[logado], pagina, 'gzip, deflate, br', cache_navegador)
+
+    teto_primeira, teto_repetida = TETOS[pagina]
+    assert html + recursos <= teto_primeira
+    # Na visita repetida CSS e fontes vêm do cache do navegador (immutable): só o HTML trafega
+    assert recursos_repetida == 0
+    assert html_repetida <= teto_repetida
@@ -0,0 +1,51 @@
+# test_exportacao.py - Exportação CSV em streaming: memória limitada com ~100 mil pagamentos
+
+import tracemalloc
+from datetime import date
+
+from sqlalchemy import insert
+
+from app import Cliente, Pagamento, dinheiro
+
+CLIENTES = 2000
+MESES = 50  # 2000 clientes x 50 meses = 100 mil pagamentos
+
+
+def popular_pagamentos(db):
+    valor = dinheiro('129.90')
+    db.session.execute(insert(Cliente), [
+        {'id': cliente_id, 'nome': f'Cliente {cliente_id:06d}', 'telefone': f'(81) 9{cliente_id:08d}',
+         'data_matricula': date(2020, 1, 1), 'valor_mensalidade': valor, 'dia_vencimento': 10, 'ativo': True}
+        for cliente_id in range(1, CLIENTES + 1)
+    ])
+    for mes_indice in range(MESES):
+        ano, mes = 2020 + mes_indice // 12, mes_indice % 12 + 1
+        db.session.execute(insert(Pagamento), [
+            {'cliente_id': cliente_id, 'data_pagamento': date(ano, mes, 5), 'valor_pago': valor,
+             'mes_referencia': mes, 'ano_referencia': ano, 'observacoes': 'Pagamento em dinheiro'}
+            for cliente_id in range(1, CLIENTES + 1)
+        ])
+    db.session.commit()
+
+
+def test_exportar_pagamentos_em_streaming_com_memoria_limitada(db, cliente_admin):
+    popular_pagamentos(db)
+
+    tracemalloc.start()
+    try:
+        resposta = cliente_admin.get('/exportar/pagamentos.csv', buffered=False)
+        assert resposta.status_code == 200
+        assert resposta.is_streamed
+        total_bytes = linhas = 0
+        for pedaco in resposta.response:
+            total_bytes += len(pedaco)
+            linhas += pedaco.count(b'\n')
+        resposta.close()
+        _, pico = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    assert linhas == CLIENTES * MESES + 1  # + cabeçalho
+    # O arquivo inteiro passa de 6 MB; em streaming o pico fica em uma fração disso
+    assert total_bytes > 6 * 1024 * 1024
+    assert pico < 4 * 1024 * 1024, f'pico de {pico / 1024 / 1024:.1f} MB para {total_bytes / 1024 / 1024:.1f} MB de CSV'
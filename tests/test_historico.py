@@ -0,0 +1,78 @@
+# test_historico.py - Histórico de pagamentos paginado por cursor (data_pagamento, id)
+
+from datetime import date, timedelta
+
+import pytest
+
+from app import Cliente, Pagamento, pagina_pagamentos
+
+
+def criar_cliente(db, pagamentos):
+    """Cliente com `pagamentos` pagamentos, dois a dois na mesma data (empates desfeitos pelo id)."""
+    cliente = Cliente(nome='Cliente', telefone='81999990000', data_matricula=date(2015, 1, 1),
+                      valor_mensalidade='100.00', dia_vencimento=10)
+    db.session.add(cliente)
+    db.session.flush()
+    for i in range(pagamentos):
+        ano, mes = 2015 + i // 12, i % 12 + 1
+        db.session.add(Pagamento(cliente_id=cliente.id, data_pagamento=date(2015, 1, 1) + timedelta(days=i // 2),
+                                 valor_pago='100.00', mes_referencia=mes, ano_referencia=ano))
+    db.session.commit()
+    return cliente
+
+
+def percorrer(cliente, por_pagina):
+    """Páginas indo para os mais antigos e depois voltando pelos cursores; retorna as duas listas."""
+    ida = []
+    pagamentos, anterior, proximo = pagina_pagamentos(cliente, por_pagina=por_pagina)
+    ida.append(pagamentos)
+    while proximo:
+        pagamentos, anterior, proximo = pagina_pagamentos(cliente, apos=_cursor(proximo), por_pagina=por_pagina)
+        ida.append(pagamentos)
+
+    volta = [pagamentos]
+    while anterior:
+        pagamentos, anterior, _ = pagina_pagamentos(cliente, antes=_cursor(anterior), por_pagina=por_pagina)
+        volta.append(pagamentos)
+    return ida, volta[::-1]
+
+
+def _cursor(texto):
+    data, pagamento_id = texto.split('_')
+    return date.fromisoformat(data), int(pagamento_id)
+
+
+@pytest.mark.parametrize('total, por_pagina', [
+    (0, 5),
+    (4, 5),    # uma página incompleta
+    (5, 5),    # exatamente uma página: sem "próximo"
+    (10, 5),   # a última página cheia não aponta para uma vazia
+    (11, 5),   # a última página com um só pagamento
+    (23, 4),
+])
+def test_paginas_cobrem_o_historico_sem_repetir(db, total, por_pagina):
+    cliente = criar_cliente(db, total)
+    esperado = [p.id for p in cliente.pagamentos.order_by(Pagamento.data_pagamento.desc(), Pagamento.id.desc())]
+
+    ida, volta = percorrer(cliente, por_pagina)
+
+    assert [p.id for pagina in ida for p in pagina] == esperado
+    assert len(ida) == max(1, -(-total // por_pagina))
+    assert all(len(pagina) == por_pagina for pagina in ida[:-1])
+    # Voltando pelos cursores "anterior" as páginas são as mesmas
+    assert [[p.id for p in pagina] for pagina in volta] == [[p.id for p in pagina] for pagina in ida]
+
+
+def test_primeira_pagina_sem_anterior_e_ultima_sem_proximo(db):
+    cliente = criar_cliente(db, 6)
+    _, anterior, proximo = pagina_pagamentos(cliente, por_pagina=3)
+    assert anterior is None and proximo is not None
+    _, anterior, proximo = pagina_pagamentos(cliente, apos=_cursor(proximo), por_pagina=3)
+    assert anterior is not None and proximo is None
+
+
+def test_cursor_invalido_volta_para_a_primeira_pagina(cliente_admin, db):
+    cliente = criar_cliente(db, 3)
+    for parametros in ('apos=lixo', 'antes=2024-13-01_1', 'apos=2024-01-01_x'):
+        resposta = cliente_admin.get(f'/historico_pagamento/{cliente.id}?{parametros}')
+        assert resposta.status_code == 200
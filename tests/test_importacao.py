@@ -0,0 +1,82 @@
+# test_importacao.py - Importação de pagamentos em lote: relatório por linha e permissões
+
+from datetime import date
+
+import pytest
+
+from app import Cliente, Pagamento, importar_pagamentos, ler_linhas_importacao
+
+
+@pytest.fixture
+def clientes(db):
+    clientes = [Cliente(nome=f'Cliente {i}', telefone=f'8199900000{i}', data_matricula=date(2024, 1, 10),
+                        valor_mensalidade='100.00', dia_vencimento=10) for i in range(2)]
+    db.session.add_all(clientes)
+    db.session.flush()
+    db.session.add(Pagamento(cliente_id=clientes[1].id, data_pagamento=date(2024, 2, 10), valor_pago='100.00',
+                             mes_referencia=2, ano_referencia=2024))
+    db.session.commit()
+    return clientes
+
+
+def test_relatorio_por_linha(cliente_admin, clientes):
+    um, dois = (cliente.id for cliente in clientes)
+    linhas = [
+        {'cliente_id': um, 'valor_pago': '100.00', 'data_pagamento': '2024-02-10'},
+        {'cliente_id': 999, 'valor_pago': '100.00', 'data_pagamento': '2024-02-10'},
+        {'cliente_id': 'abc', 'valor_pago': '100.00', 'data_pagamento': '2024-02-10'},
+        {'cliente_id': um, 'valor_pago': 'cem', 'data_pagamento': '2024-03-10'},
+        {'cliente_id': um, 'valor_pago': '-5', 'data_pagamento': '2024-03-10'},
+        {'cliente_id': um, 'valor_pago': '100.00', 'data_pagamento': '10/03/2024'},
+        {'cliente_id': um, 'valor_pago': '100.00', 'data_pagamento': '2024-03-10', 'mes_referencia': 13},
+        {'cliente_id': um, 'valor_pago': '100.00', 'data_pagamento': '2024-02-20'},  # repetida no arquivo
+        {'cliente_id': dois, 'valor_pago': '100.00', 'data_pagamento': '2024-02-10'},  # já no banco
+        [dois, '100.00', '2024-03-10'],
+        {'cliente_id': dois, 'valor_pago': '90.50', 'data_pagamento': '2024-04-05', 'mes_referencia': 3,
+         'observacoes': 'Pix'},
+    ]
+    resposta = cliente_admin.post('/importar_pagamentos', json=linhas)
+    assert resposta.status_code == 200
+    relatorio = resposta.get_json()
+
+    assert (relatorio['importados'], relatorio['rejeitados']) == (2, 9)
+    assert [(item['linha'], item['status'], item['mensagem']) for item in relatorio['linhas']] == [
+        (1, 'ok', ''),
+        (2, 'erro', 'Cliente não encontrado.'),
+        (3, 'erro', 'cliente_id inválido.'),
+        (4, 'erro', 'valor_pago inválido.'),
+        (5, 'erro', 'valor_pago não pode ser negativo.'),
+        (6, 'erro', 'data_pagamento deve estar no formato AAAA-MM-DD.'),
+        (7, 'erro', 'Mês/ano de referência fora do intervalo.'),
+        (8, 'erro', 'Pagamento de 02/2024 já registrado.'),
+        (9, 'erro', 'Pagamento de 02/2024 já registrado.'),
+        (10, 'erro', 'Linha inválida: esperado um objeto com os campos do pagamento.'),
+        (11, 'ok', ''),
+    ]
+    importado = Pagamento.query.filter_by(cliente_id=dois, mes_referencia=3, ano_referencia=2024).one()
+    assert importado.data_pagamento == date(2024, 4, 5)
+    assert importado.observacoes == 'Pix'
+    assert Pagamento.query.count() == 3
+
+
+def test_csv_com_ponto_e_virgula_em_lotes(db, clientes):
+    um, dois = (cliente.id for cliente in clientes)
+    conteudo = (
+        'cliente_id;valor_pago;data_pagamento;mes_referencia;ano_referencia\n'
+        f'{um};100.00;2024-01-10;;\n'
+        f'{um};100.00;2024-02-10;;\n'
+        f'{dois};100.00;2024-03-10;;\n'
+        f'{dois};100.00;2024-03-11;3;2024\n'
+    )
+    relatorio = importar_pagamentos(ler_linhas_importacao(conteudo, 'csv'), tamanho_lote=2)
+
+    assert [item['status'] for item in relatorio['linhas']] == ['ok', 'ok', 'ok', 'erro']
+    assert Pagamento.query.count() == 4
+
+
+def test_importacao_restrita_a_administradores(cliente_colaborador, clientes):
+    resposta = cliente_colaborador.post('/importar_pagamentos', json=[
+        {'cliente_id': clientes[0].id, 'valor_pago': '100.00', 'data_pagamento': '2024-02-10'},
+    ])
+    assert resposta.status_code == 302
+    assert Pagamento.query.count() == 1
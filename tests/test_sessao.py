@@ -0,0 +1,100 @@
+# test_sessao.py - Sessão assinada sem consulta (SESSAO_STATELESS) e revogação pela versão do usuário
+
+import pytest
+
+import app as modulo_app
+from app import Usuario
+
+SENHA = 'Teste@12345'
+
+
+@pytest.fixture
+def stateless(app):
+    anteriores = {chave: app.config[chave] for chave in ('SESSAO_STATELESS', 'SESSAO_REVALIDAR_SEGUNDOS')}
+    app.config.update(SESSAO_STATELESS=True, SESSAO_REVALIDAR_SEGUNDOS=60)
+    yield
+    app.config.update(anteriores)
+
+
+@pytest.fixture
+def usuario(db):
+    usuario = Usuario(username='recepcao', nome_completo='Recepção', email='recepcao@academia.com',
+                      tipo_permissao='colaborador')
+    usuario.set_password(SENHA)
+    db.session.add(usuario)
+    db.session.commit()
+    return usuario
+
+
+def logar(app, username=None):
+    cliente = app.test_client()
+    resposta = cliente.post('/login', data={'username': username or 'recepcao', 'senha': SENHA})
+    assert resposta.status_code == 302
+    return cliente
+
+
+def copiar_sessao(app, origem):
+    """Outro navegador com o mesmo cookie de sessão (ex.: cookie copiado)"""
+    copia = app.test_client()
+    copia.set_cookie('session', origem.get_cookie('session').value)
+    return copia
+
+
+def expirar_claim(cliente):
+    with cliente.session_transaction() as sessao:
+        claim = sessao['claim']
+        claim['expira'] = 0
+        sessao['claim'] = claim
+
+
+def test_claim_dispensa_a_consulta_do_usuario(app, stateless, usuario, monkeypatch):
+    cliente = logar(app)
+
+    def sem_banco():
+        raise AssertionError('usuário buscado no banco com a claim válida')
+    monkeypatch.setattr(modulo_app, 'carregar_usuario_sessao', sem_banco)
+
+    assert cliente.get('/todos_clientes').status_code == 200
+
+
+def test_logout_revoga_as_copias_da_sessao_na_revalidacao(app, stateless, usuario):
+    cliente = logar(app)
+    copia = copiar_sessao(app, cliente)
+    assert copia.get('/todos_clientes').status_code == 200
+
+    cliente.get('/logout')
+    # Até a claim expirar a cópia ainda vale (no máximo SESSAO_REVALIDAR_SEGUNDOS)...
+    assert copia.get('/todos_clientes').status_code == 200
+    # ...e na revalidação a versão do usuário não confere mais
+    expirar_claim(copia)
+    resposta = copia.get('/todos_clientes')
+    assert resposta.status_code == 302
+    assert resposta.headers['Location'].endswith('/login')
+
+
+def test_revalidacao_renova_a_claim_se_nada_mudou(app, stateless, usuario):
+    cliente = logar(app)
+    expirar_claim(cliente)
+    assert cliente.get('/todos_clientes').status_code == 200
+    with cliente.session_transaction() as sessao:
+        assert sessao['claim']['expira'] > 0
+
+
+def test_desativacao_revoga_a_sessao(app, db, stateless, usuario):
+    cliente = logar(app)
+    usuario.ativo = False
+    usuario.session_token = None
+    usuario.revogar_sessoes()
+    db.session.commit()
+
+    expirar_claim(cliente)
+    assert cliente.get('/todos_clientes').status_code == 302
+
+
+def test_sem_stateless_a_revogacao_vale_na_hora(app, db, usuario):
+    cliente = logar(app)
+    usuario.session_token = None
+    usuario.revogar_sessoes()
+    db.session.commit()
+
+    assert cliente.get('/todos_clientes').status_code == 302
@@ -0,0 +1,8 @@
+# wsgi.py - Ponto de entrada para servidores WSGI de produção
+#
+# Uso: gunicorn -c gunicorn.conf.py wsgi:app
+# Antes de subir o servidor, crie as tabelas: flask --app app inicializar-banco
+
+from app import create_app
+
+app = create_app()